@@ -9,10 +9,68 @@ class Settings(BaseSettings):
     PDF_DIR: Path = DATA_DIR / "pdfs"
     DB_PATH: Path = DATA_DIR / "njdot_knowledgehub.sqlite3"
     INDEX_DIR: Path = DATA_DIR / "indexes"
+    # Parallel ingestion (scripts/ingest_docs.py --workers N) splits PDFs into
+    # page ranges of this size so one large manual spreads across cores.
+    INGEST_PAGES_PER_TASK: int = 64
+
+    # SQLite connection pools (per process). Read connections are query_only.
+    DB_READ_POOL_SIZE: int = 8
+    DB_WRITE_POOL_SIZE: int = 2
+    # Seconds to wait for a free pooled connection before failing.
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0
+    # WAL lets readers run alongside a writer.
+    DB_WAL: bool = True
+    DB_BUSY_TIMEOUT_MS: int = 5000
+    DB_MMAP_SIZE_BYTES: int = 256 * 1024 * 1024
+    DB_CACHE_SIZE_KIB: int = 64 * 1024
+
     BM25_PATH: Path = INDEX_DIR / "bm25.pkl"
+    # Lexical engine for chunk search: bm25 (pickled index, scripts/build_bm25_chunks.py)
+    # | fts5 (chunks_fts in SQLite, kept in sync with chunks by triggers; bm25_chunks is not loaded).
+    CHUNKS_LEXICAL_ENGINE: str = "bm25"
     FAISS_INDEX_PATH: Path = INDEX_DIR / "faiss.index"
     FAISS_META_PATH: Path = INDEX_DIR / "faiss_meta.pkl"
     EMBED_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
+    # Query embedding LRU cache (0 disables).
+    EMBED_CACHE_SIZE: int = 2048
+    EMBED_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Vector index type for FAISS builds: flat | hnsw | ivf_flat | ivf_pq.
+    # Build params are saved next to each index (<name>.index.json).
+    FAISS_INDEX_TYPE: str = "flat"
+    FAISS_HNSW_M: int = 32
+    FAISS_HNSW_EF_CONSTRUCTION: int = 200
+    # Search-time knobs, applied when an index is loaded.
+    FAISS_HNSW_EF_SEARCH: int = 128
+    # 0 = auto (~4*sqrt(N), capped by training set size).
+    FAISS_IVF_NLIST: int = 0
+    FAISS_IVF_NPROBE: int = 16
+    FAISS_PQ_M: int = 16
+    FAISS_PQ_NBITS: int = 8
+
+    # Answer cache in front of ask_question (0 disables). Invalidated on index rebuilds.
+    ANSWER_CACHE_SIZE: int = 512
+    ANSWER_CACHE_TTL_SECONDS: float = 6 * 3600.0
+    # Reuse an answer for a different wording when query embeddings have at
+    # least this cosine similarity (0 disables; ~0.95 is conservative).
+    ANSWER_CACHE_SEMANTIC_THRESHOLD: float = 0.0
+    # Optional SQLite tier shared by workers and kept across restarts.
+    ANSWER_CACHE_PERSIST: bool = False
+    ANSWER_CACHE_DB_PATH: Path = DATA_DIR / "answer_cache.sqlite3"
+
+    # Threads for /chat/ask retrieval (the LLM call itself is awaited, not threaded).
+    ASK_RETRIEVAL_WORKERS: int = 4
+
+    # Load search indexes into memory at startup (otherwise on first query).
+    INDEX_PRELOAD: bool = True
+    # Poll INDEX_DIR and hot-swap rebuilt indexes; 0 disables the watcher.
+    INDEX_WATCH_INTERVAL_SECONDS: float = 15.0
+    # Memory-map FAISS indexes and .npy artifacts instead of reading them into
+    # each worker's heap (workers then share the OS page cache).
+    INDEX_MMAP: bool = True
+    # Comma-separated Supabase user ids (JWT "sub") allowed to call POST /admin/indexes/reload;
+    # empty disables the endpoint (the watcher still picks up rebuilt indexes).
+    ADMIN_USER_IDS: str = ""
 
     class Config:
         env_file = ".env"
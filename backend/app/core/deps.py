@@ -5,6 +5,7 @@ from typing import Any, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from app.core.config import settings
 from app.services.auth import verify_jwt
 
 bearer = HTTPBearer(auto_error=False)
@@ -30,3 +31,14 @@ def require_user(
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication required")
     return user
+
+
+def require_admin(user: dict[str, Any] = Depends(require_user)) -> dict[str, Any]:
+    """
+    Admin-only auth: the user's id must be listed in ADMIN_USER_IDS (403 otherwise,
+    and for everyone while the list is empty).
+    """
+    admins = {u.strip() for u in settings.ADMIN_USER_IDS.split(",") if u.strip()}
+    if user.get("sub") not in admins:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user
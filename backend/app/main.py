@@ -4,18 +4,42 @@ load_dotenv(override=False)
 
 import logging
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.routers import chat, documents, tables
+from app.routers import admin, chat, documents, tables
+from app.services.answer_cache import answer_cache_stats
+from app.services.ask import shutdown_retrieval_executor
+from app.services.db import db_pool_stats
+from app.services.embeddings import embedding_cache_stats
+from app.services.index_registry import get_registry
+from app.services.llm import llm_cache_stats, llm_latency_stats, shutdown_llm
 
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Deserialize search indexes once per process instead of once per query.
+    registry = get_registry()
+    if settings.INDEX_PRELOAD:
+        registry.load_all()
+    registry.start_watcher(settings.INDEX_WATCH_INTERVAL_SECONDS)
+    try:
+        yield
+    finally:
+        registry.stop_watcher()
+        shutdown_retrieval_executor()
+        await shutdown_llm()
+
+
 app = FastAPI(
     title="NJDOT Assistant API",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
 def _cors_origins() -> list[str]:
@@ -55,19 +79,30 @@ def health():
         settings.BM25_PATH,
         settings.FAISS_INDEX_PATH,
         settings.FAISS_META_PATH,
-        settings.INDEX_DIR / "bm25_chunks.pkl",
         settings.INDEX_DIR / "faiss_chunks.index",
         settings.INDEX_DIR / "faiss_chunks_meta.pkl",
     ]
+    # fts5 ranks chunks in SQLite; the pickled chunk index is not used
+    if settings.CHUNKS_LEXICAL_ENGINE != "fts5":
+        expected.append(settings.INDEX_DIR / "bm25_chunks.pkl")
     for p in expected:
         if not p.exists():
             warnings.append(f"index_missing:{p}")
 
-    payload = {"status": "ok"}
+    payload = {
+        "status": "ok",
+        "index_registry": get_registry().stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "answer_cache": answer_cache_stats(),
+        "db_pool": db_pool_stats(),
+        "llm_latency": llm_latency_stats(),
+        "llm_cache": llm_cache_stats(),
+    }
     if warnings:
         payload["warnings"] = warnings
     return payload
 
+app.include_router(admin.router)
 app.include_router(chat.router)
 app.include_router(documents.router)
 app.include_router(tables.router)
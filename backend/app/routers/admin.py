@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, BackgroundTasks, Depends
+
+from app.core.deps import require_admin, require_user
+from app.services.index_registry import get_registry
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_user)])
+
+
+@router.get("/indexes")
+def index_status():
+    return get_registry().stats()
+
+
+@router.post("/indexes/reload", status_code=202, dependencies=[Depends(require_admin)])
+def reload_indexes(background_tasks: BackgroundTasks, force: bool = False):
+    """
+    Load rebuilt index artifacts in the background and swap them in.
+    In-flight requests finish on the generation they started with.
+    Restricted to ADMIN_USER_IDS: force=true reloads every index from disk.
+    """
+    registry = get_registry()
+    background_tasks.add_task(registry.reload, force=force)
+    return {"status": "reloading", "generation": registry.stats()["generation"]}
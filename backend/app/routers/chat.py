@@ -1,10 +1,13 @@
+import json
 import re
 from urllib.parse import quote
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 
 from app.schemas.retrieval import RetrievalRequest, RetrievalResponse
-from app.services.retrieval import retrieve, chat_retrieve as chat_ask_retrieve
+from app.services.ask import ask_question_stream
+from app.services.retrieval import retrieve, chat_retrieve_async
 
 from app.schemas.hybrid import (
     HybridRetrieveRequest,
@@ -157,37 +160,31 @@ def chat_hybrid_retrieve_chunks(req: HybridChunksRequest):
     )
 
 
-@router.post("/ask", response_model=AskResponse)
-def chat_ask(req: AskRequest, user=Depends(require_user)):
-    out = chat_ask_retrieve(
-        query=req.query,
-        scope=req.scope,
-        mp_ids=req.mp_ids,
-        k=req.k,
-        mode=req.mode,
-    )
-
-    hits = out.get("hits", [])
-    citations = [
-            AskCitation(
-                chunk_id=h.chunk_id,
-                display_name=h.display_name,
-                filename=h.filename,
-                doc_type=h.doc_type,
+def ask_citations(hits: list) -> list[AskCitation]:
+    return [
+        AskCitation(
+            chunk_id=h.chunk_id,
+            display_name=h.display_name,
+            filename=h.filename,
+            doc_type=h.doc_type,
             mp_id=h.mp_id,
             section_id=h.section_id,
             heading=h.heading,
             page_start=h.page_start,
-                page_end=h.page_end,
-                snippet=h.snippet,
-                open_url=f"/documents/open?filename={quote(h.filename)}&page={h.page_start}",
-                chunk_kind=getattr(h, "chunk_kind", None),
-                table_uid=getattr(h, "table_uid", None),
-                table_label=getattr(h, "table_label", None),
-                table_row_index=getattr(h, "table_row_index", None),
-            )
-            for h in hits
-        ]
+            page_end=h.page_end,
+            snippet=h.snippet,
+            open_url=f"/documents/open?filename={quote(h.filename)}&page={h.page_start}",
+            chunk_kind=getattr(h, "chunk_kind", None),
+            table_uid=getattr(h, "table_uid", None),
+            table_label=getattr(h, "table_label", None),
+            table_row_index=getattr(h, "table_row_index", None),
+        )
+        for h in hits
+    ]
+
+
+def build_ask_response(req: AskRequest, out: dict) -> AskResponse:
+    citations = ask_citations(out.get("hits", []))
 
     original_citations = citations
     if req.mode == "answer":
@@ -214,3 +211,56 @@ def chat_ask(req: AskRequest, user=Depends(require_user)):
         citations=citations,
         table=out.get("table"),
     )
+
+
+@router.post("/ask", response_model=AskResponse)
+async def chat_ask(req: AskRequest, user=Depends(require_user)):
+    # Async so a slow LLM call does not hold a threadpool worker that
+    # /documents and /tables requests need; retrieval runs on its own executor.
+    out = await chat_retrieve_async(
+        query=req.query,
+        scope=req.scope,
+        mp_ids=req.mp_ids,
+        k=req.k,
+        mode=req.mode,
+    )
+    return build_ask_response(req, out)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/ask/stream")
+async def chat_ask_stream(req: AskRequest, user=Depends(require_user)):
+    """
+    /chat/ask as Server-Sent Events:
+      citations -> {confidence, citations} once retrieval finishes
+      token     -> {text} per LLM delta
+      final     -> the full AskResponse (sanitized answer, filtered citations)
+    """
+
+    async def events():
+        async for event, payload in ask_question_stream(
+            query=req.query,
+            scope=req.scope,
+            mp_ids=req.mp_ids,
+            k=req.k,
+            mode=req.mode,
+        ):
+            if event == "citations":
+                data = {
+                    "confidence": payload.get("confidence"),
+                    "citations": [c.model_dump() for c in ask_citations(payload.get("hits", []))],
+                }
+            elif event == "final":
+                data = build_ask_response(req, payload).model_dump()
+            else:
+                data = payload
+            yield _sse(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
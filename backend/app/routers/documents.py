@@ -76,7 +76,7 @@ async def list_documents(_user=Depends(require_user)):
     Real document list from SQLite `documents` table.
     pages is computed from the pages table to avoid relying on a documents.pages column.
     """
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         rows = conn.execute(
             """
             SELECT
@@ -131,7 +131,7 @@ async def get_document_file(
     """
     safe_filename = _normalize_filename(filename)
     # Validate exists in DB
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         row = _get_document_row(conn, safe_filename)
 
     if not row:
@@ -159,7 +159,7 @@ async def open_document(
     # Pages are 1-based in URLs and UI.
     safe_filename = _normalize_filename(filename)
     try:
-        with get_conn() as conn:
+        with get_conn(readonly=True) as conn:
             row = _get_document_row(conn, safe_filename)
     except Exception:
         logger.exception("Document lookup failed for open_document; filename=%s page=%s", safe_filename, page)
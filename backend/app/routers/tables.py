@@ -16,7 +16,7 @@ router = APIRouter(prefix="/tables", tags=["tables"], dependencies=[Depends(requ
 
 @router.get("/meta")
 async def table_meta(table_uid: str = Query(..., min_length=5)):
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         t = conn.execute(
             "SELECT * FROM tables WHERE table_uid = ?",
             (table_uid,),
@@ -34,7 +34,7 @@ async def table_rows(
     include_cells: bool = Query(False),
 ):
     """Offset is the count of rows already fetched; row_index is not contiguous."""
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         rows = conn.execute(
             """
             SELECT row_index, row_text
@@ -103,7 +103,7 @@ async def table_cells(table_uid: str = Query(..., min_length=5)):
 
 @router.get("/csv")
 async def table_csv(table_uid: str = Query(..., min_length=5)):
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         rows = conn.execute(
             """
             SELECT row_index, row_text
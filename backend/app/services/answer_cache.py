@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import copy
+import dataclasses
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.index_registry import IndexGeneration, get_registry
+
+logger = logging.getLogger(__name__)
+
+# Set on a result that must not be cached (e.g. an LLM-failure fallback).
+NO_CACHE_KEY = "_no_cache"
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)*")
+
+# (scope, mp_ids, k, mode, generation)
+_Context = tuple[str, tuple[str, ...], int, str, str]
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+def generation_key(gen: IndexGeneration) -> str:
+    """
+    Content identity of a generation: stable across processes and restarts,
+    and different after any index rebuild.
+    """
+    h = hashlib.sha1()
+    for name in sorted(gen.indexes):
+        h.update(f"{name}={gen.indexes[name].fingerprint}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+@dataclass
+class _Entry:
+    created: float
+    query: str
+    numbers: frozenset[str]
+    result: dict
+    vec: Optional[np.ndarray]
+
+
+def _json_default(obj: Any) -> Any:
+    # hit dataclasses round-trip as attribute objects (routes read h.chunk_id, ...)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {"__hit__": dataclasses.asdict(obj)}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"not JSON serializable: {type(obj).__name__}")
+
+
+def _json_object_hook(d: dict) -> Any:
+    return SimpleNamespace(**d["__hit__"]) if "__hit__" in d else d
+
+
+def _encode_result(result: dict) -> bytes:
+    return json.dumps(result, default=_json_default, ensure_ascii=False).encode("utf-8")
+
+
+def _decode_result(payload: bytes) -> dict:
+    return json.loads(payload, object_hook=_json_object_hook)
+
+
+class _PersistentTier:
+    """
+    Exact-key answers in their own SQLite file, so repeats survive restarts
+    and are shared by workers. Payloads are JSON, so the file holds data only.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                generation TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                payload BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, ttl_s: float) -> Optional[tuple[float, dict]]:
+        """
+        (created_at wall-clock time, result) for a fresh row, else None.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT created_at, payload FROM answers WHERE key = ?", (key,)).fetchone()
+        if row is None or (ttl_s > 0 and time.time() - row[0] >= ttl_s):
+            return None
+        try:
+            return float(row[0]), _decode_result(row[1])
+        except ValueError:
+            # unreadable row (e.g. a pickled payload from an older version): a miss
+            return None
+
+    def put(self, key: str, generation: str, result: dict) -> None:
+        payload = _encode_result(result)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, generation, created_at, payload) VALUES (?, ?, ?, ?)",
+                (key, generation, time.time(), payload),
+            )
+            self._conn.commit()
+
+    def drop_other_generations(self, generation: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answers WHERE generation != ?", (generation,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+
+class AnswerCache:
+    """
+    Cache in front of ask_question.
+
+    - exact tier: LRU + TTL keyed on (normalized query, scope, mp_ids, k, mode,
+      index generation), optionally backed by a SQLite file
+    - semantic tier (threshold > 0): a miss reuses a cached answer for the same
+      scope/mp_ids/k/mode whose query embedding is within the cosine threshold,
+      provided both queries mention the same numbers ("Section 701.03" and
+      "Section 701.04" embed almost identically but are different questions)
+
+    Entries are keyed on the generation's index fingerprints; when indexes are
+    rebuilt the memory tier is cleared and older persistent rows are deleted.
+    The memory tier keeps its own copy of each result and hands out copies, so
+    callers may modify what get() returns.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl_s: float,
+        semantic_threshold: float = 0.0,
+        persist_path: Optional[Path] = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.semantic_threshold = semantic_threshold
+        self._data: OrderedDict[tuple[str, _Context], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation: Optional[str] = None
+        self._persist_path = persist_path
+        self._persistent: Optional[_PersistentTier] = None
+        self.hits = 0
+        self.semantic_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    # ---- helpers ----
+
+    def _persistent_tier(self) -> Optional[_PersistentTier]:
+        if self._persist_path is None:
+            return None
+        if self._persistent is None:
+            try:
+                self._persistent = _PersistentTier(self._persist_path)
+            except sqlite3.Error:
+                logger.exception("answer cache persistence disabled; path=%s", self._persist_path)
+                self._persist_path = None
+        return self._persistent
+
+    def _context(self, scope: str, mp_ids: Optional[list[str]], k: int, mode: str) -> _Context:
+        gen = generation_key(get_registry().current())
+        if gen != self._generation:
+            with self._lock:
+                if gen != self._generation:
+                    if self._generation is not None:
+                        logger.info("answer cache invalidated; index generation changed")
+                    self._data.clear()
+                    self._generation = gen
+                    tier = self._persistent_tier()
+                    if tier is not None:
+                        tier.drop_other_generations(gen)
+        mp_key = tuple(sorted({m.upper() for m in (mp_ids or [])}))
+        return (scope, mp_key, int(k), mode, gen)
+
+    @staticmethod
+    def _persist_key(query: str, ctx: _Context) -> str:
+        return hashlib.sha1(repr((query, ctx)).encode("utf-8")).hexdigest()
+
+    def _fresh(self, entry: _Entry, now: float) -> bool:
+        return self.ttl_s <= 0 or now - entry.created < self.ttl_s
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        if self.semantic_threshold <= 0:
+            return None
+        from app.services.embeddings import embed_texts
+
+        return embed_texts([query])[0]
+
+    def _store(self, key: tuple[str, _Context], entry: _Entry) -> None:
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    # ---- public ----
+
+    def get(self, query: str, *, scope: str, mp_ids: Optional[list[str]], k: int, mode: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        norm = _normalize_query(query)
+        ctx = self._context(scope, mp_ids, k, mode)
+        key = (norm, ctx)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._fresh(entry, now):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry.result)
+            if entry is not None:
+                del self._data[key]
+
+        tier = self._persistent_tier()
+        if tier is not None:
+            found = tier.get(self._persist_key(norm, ctx), self.ttl_s)
+            if found is not None:
+                created_at, result = found
+                # keep the row's age so promotion does not restart its TTL
+                created = now - max(0.0, time.time() - created_at)
+                entry = _Entry(created, norm, frozenset(_NUMBER_RE.findall(norm)), copy.deepcopy(result), self._embed(query))
+                self._store(key, entry)
+                with self._lock:
+                    self.hits += 1
+                    self.persistent_hits += 1
+                return result
+
+        vec = self._embed(query)
+        if vec is not None:
+            numbers = frozenset(_NUMBER_RE.findall(norm))
+            with self._lock:
+                candidates = [
+                    (k_, e)
+                    for k_, e in self._data.items()
+                    if k_[1] == ctx and e.vec is not None and e.numbers == numbers and self._fresh(e, now)
+                ]
+            if candidates:
+                sims = np.stack([e.vec for _, e in candidates]) @ vec
+                best = int(np.argmax(sims))
+                if float(sims[best]) >= self.semantic_threshold:
+                    best_key, best_entry = candidates[best]
+                    with self._lock:
+                        if best_key in self._data:
+                            self._data.move_to_end(best_key)
+                        self.hits += 1
+                        self.semantic_hits += 1
+                    logger.debug("answer cache semantic hit; sim=%.4f cached_query=%s", sims[best], best_entry.query)
+                    return copy.deepcopy(best_entry.result)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, query: str, result: dict, *, scope: str, mp_ids: Optional[list[str]], k: int, mode: str) -> None:
+        if result.pop(NO_CACHE_KEY, False) or not self.enabled:
+            return
+        norm = _normalize_query(query)
+        ctx = self._context(scope, mp_ids, k, mode)
+        entry = _Entry(time.monotonic(), norm, frozenset(_NUMBER_RE.findall(norm)), copy.deepcopy(result), self._embed(query))
+        self._store((norm, ctx), entry)
+        tier = self._persistent_tier()
+        if tier is not None:
+            try:
+                tier.put(self._persist_key(norm, ctx), ctx[-1], result)
+            except (sqlite3.Error, TypeError, ValueError):
+                logger.exception("answer cache persistent write failed")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.semantic_hits = self.persistent_hits = self.misses = 0
+        tier = self._persistent_tier()
+        if tier is not None:
+            tier.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "persistent": self._persist_path is not None,
+            }
+
+
+_cache = AnswerCache(
+    settings.ANSWER_CACHE_SIZE,
+    settings.ANSWER_CACHE_TTL_SECONDS,
+    settings.ANSWER_CACHE_SEMANTIC_THRESHOLD,
+    settings.ANSWER_CACHE_DB_PATH if settings.ANSWER_CACHE_PERSIST else None,
+)
+
+
+def get_answer_cache() -> AnswerCache:
+    return _cache
+
+
+def answer_cache_stats() -> dict[str, Any]:
+    return _cache.stats()
@@ -1,17 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 from dataclasses import dataclass
-from typing import Optional, Iterable
+from typing import AsyncIterator, Optional, Iterable
 
 from rank_bm25 import BM25Okapi
 
+from app.core.config import settings
+from app.services.answer_cache import NO_CACHE_KEY, get_answer_cache
+from app.services.chunk_ingestion import chunk_builds_recorded, table_tokens_in
+from app.services.chunk_store import chunk_texts
 from app.services.db import get_conn
-from app.services.hybrid_chunks import hybrid_chunks_search
-from app.services.llm import get_llm, LLMMessage, LLMError
-from app.services.rerank import is_section_intent
+from app.services.hybrid_chunks import hybrid_chunks_search, table_row_count
+from app.services.index_registry import get_registry
+from app.services.llm import get_llm, LLMMessage
+from app.services.query_analysis import (
+    QueryAnalysis,
+    analyze_query,
+    asks_for_section_or_page,
+    focus_patterns,
+    looks_like_table_query,
+    plan_query,
+)
+from app.services.sections import section_state
 from app.services.tables import get_table_meta, get_table_rows
 
 
@@ -59,38 +76,24 @@ logger = logging.getLogger(__name__)
 # Utilities
 # -----------------------------
 
-def _make_query_focused_snippet(text: str, query: str, *, window: int = 240, max_len: int = 450) -> str:
+def _make_query_focused_snippet(
+    text: str,
+    query: str,
+    *,
+    window: int = 240,
+    max_len: int = 450,
+    focus: tuple[re.Pattern[str], ...] | None = None,
+) -> str:
     """
     Build a snippet centered around the best match of query terms (or numbers).
     Falls back to start-of-text if no match.
+    `focus` is QueryAnalysis.focus when the query was already analyzed.
     """
     t = (text or "").replace("\n", " ").strip()
     if not t:
         return ""
 
-    q = (query or "").lower()
-
-    patterns = []
-
-    # exact phrases we commonly care about
-    for ph in [" days", " day", " within ", " interest", " subcontractor", " supplier", " receipt", " prime rate"]:
-        if ph.strip() in q:
-            patterns.append(re.escape(ph.strip()))
-
-    # statute patterns like "52:32-40"
-    m_stat = re.findall(r"\b\d{1,3}:\d{1,3}-\d+\b", q)
-    for s in m_stat:
-        patterns.append(re.escape(s))
-
-    # any plain numbers
-    m_nums = re.findall(r"\b\d+\b", q)
-    for n in m_nums:
-        patterns.append(rf"\b{re.escape(n)}\b")
-
-    # keywords
-    q_terms = [w for w in re.findall(r"[a-z0-9]+", q) if len(w) >= 4]
-    for w in q_terms[:12]:
-        patterns.append(rf"\b{re.escape(w)}\b")
+    patterns = focus_patterns(query) if focus is None else focus
 
     # Find best match position (prefer proximity to receipt/payment language).
     anchors = ["receipt", "receiving", "payment", "paid", "interest", "prime rate"]
@@ -109,7 +112,7 @@ def _make_query_focused_snippet(text: str, query: str, *, window: int = 240, max
     best_pos = None
     best_score = None
     for pat in patterns:
-        for m in re.finditer(pat, t, flags=re.I):
+        for m in pat.finditer(t):
             pos = m.start()
             score = _score(pos)
             if best_score is None or score > best_score:
@@ -155,13 +158,20 @@ def _hydrate_text_for_hits(hits) -> dict[int, str]:
     ids = [int(getattr(h, "chunk_id")) for h in hits if getattr(h, "chunk_id", None) is not None]
     if not ids:
         return {}
-    placeholders = ",".join("?" for _ in ids)
-    with get_conn() as conn:
+    # Chunk text is already memory-mapped by the chunk store; only go to SQLite
+    # for chunks newer than the loaded indexes.
+    text_map = chunk_texts(ids)
+    missing = [cid for cid in ids if cid not in text_map]
+    if not missing:
+        return text_map
+    placeholders = ",".join("?" for _ in missing)
+    with get_conn(readonly=True) as conn:
         rows = conn.execute(
             f"SELECT id, text FROM chunks WHERE id IN ({placeholders})",
-            ids,
+            missing,
         ).fetchall()
-    return {int(r["id"]): (r["text"] or "") for r in rows}
+    text_map.update({int(r["id"]): (r["text"] or "") for r in rows})
+    return text_map
 
 def _format_sources(hits) -> str:
     blocks = []
@@ -273,38 +283,6 @@ def _dominant_section_in_text(text: str) -> str | None:
     return m.group(1) if m else None
 
 
-# Exact section IDs like:
-# 701.02
-# 701.02.01
-# 105.01.02
-def _extract_exact_section_id(query: str) -> str | None:
-    q = (query or "").strip()
-    if re.fullmatch(r"\d{3}\.\d{2}(?:\.\d{2})?", q):
-        return q
-    m = re.match(r"^\s*(\d{3}\.\d{2}(?:\.\d{2})?)\b", q)
-    return m.group(1) if m else None
-
-
-# Section prefix ONLY when user explicitly signals it:
-# "Section 701" or "§701"
-# (NOT any random 3 digits in the sentence)
-def _extract_section_prefix(query: str) -> str | None:
-    q = query or ""
-    m = re.search(r"\bsection\s*(\d{3})\b", q, re.I)
-    if m:
-        return m.group(1)
-    m = re.search(r"\b§\s*(\d{3})\b", q)
-    if m:
-        return m.group(1)
-
-    # Allow bare "701" ONLY if the query is basically just that token
-    # (prevents accidental prefix extraction in normal sentences)
-    if re.fullmatch(r"\s*\d{3}\s*", q.strip()):
-        return q.strip()
-
-    return None
-
-
 def _select_section_hits(hits: list, min_hits: int = 4, max_hits: int = 6) -> list:
     if not hits:
         return []
@@ -459,46 +437,26 @@ def _make_snippet(text: str, n: int = 450) -> str:
     return t[:n].rstrip() + "…"
 
 
-def _db_fetch_exact_section(
-    section_id: str,
-    *,
-    scope: str,
-    mp_ids: list[str] | None,
-    limit: int,
-) -> list[_DBHit]:
-    where = [
-        "c.section_id IS NOT NULL",
-        "c.section_id = ?",
-        "(c.chunk_kind IS NULL OR c.chunk_kind NOT IN ('toc','front_matter'))",
-    ]
-    params: list[object] = [section_id]
-    _apply_scope_filters(where, params, scope, mp_ids)
-
-    sql = f"""
-        SELECT
-            c.id AS chunk_id,
-            c.document_id,
-            d.filename,
-            d.display_name,
-            d.doc_type,
-            d.mp_id,
-            c.section_id,
-            c.heading,
-            c.page_start,
-            c.page_end,
-            c.chunk_kind,
-            c.text
-        FROM chunks c
-        JOIN documents d ON d.id = c.document_id
-        WHERE {" AND ".join(where)}
-        ORDER BY c.page_start ASC, c.id ASC
-        LIMIT ?
-    """
-    params.append(limit)
+_DB_HIT_SELECT = """
+    SELECT
+        c.id AS chunk_id,
+        c.document_id,
+        d.filename,
+        d.display_name,
+        d.doc_type,
+        d.mp_id,
+        c.section_id,
+        c.heading,
+        c.page_start,
+        c.page_end,
+        c.chunk_kind,
+        c.text
+    FROM chunks c
+    JOIN documents d ON d.id = c.document_id
+"""
 
-    with get_conn() as conn:
-        rows = conn.execute(sql, params).fetchall()
 
+def _db_hits_from_rows(rows) -> list[_DBHit]:
     hits: list[_DBHit] = []
     for r in rows:
         text = r["text"] or ""
@@ -522,67 +480,113 @@ def _db_fetch_exact_section(
     return hits
 
 
-def _db_fetch_exact_or_children(
+def _scope_document_ids(scope: str, mp_ids: list[str] | None) -> set[int] | None:
+    """
+    Document ids allowed by the scope filters; None when every document is.
+    """
+    where: list[str] = []
+    params: list[object] = []
+    _apply_scope_filters(where, params, scope, mp_ids)
+    if not where:
+        return None
+    with get_conn(readonly=True) as conn:
+        rows = conn.execute(f"SELECT d.id FROM documents d WHERE {' AND '.join(where)}", params).fetchall()
+    return {int(r["id"]) for r in rows}
+
+
+def _section_map_hits(
     section_id: str,
     *,
+    children: bool,
+    scope: str,
+    mp_ids: list[str] | None,
+    limit: int,
+) -> list[_DBHit] | None:
+    """
+    Section lookup through the registry's in-memory section map: one range
+    lookup resolves the ordered chunk ids, and only the first `limit` are read.
+    None when the map is unavailable, out of step with SQLite, or not built yet.
+    """
+    try:
+        smap = get_registry().current().get("section_map")
+    except RuntimeError:
+        return None
+    document_ids = _scope_document_ids(scope, mp_ids)
+
+    with get_conn(readonly=True) as conn:
+        if section_state(conn) != smap.state:
+            # chunks were rebuilt after the map was loaded; the watcher will reload it
+            return None
+        if not chunk_builds_recorded(conn):
+            # chunks predate the sections table; it is empty until build_chunks runs
+            return None
+        ids = smap.chunk_ids(section_id, children=children, document_ids=document_ids, limit=limit)
+        if not ids:
+            return []
+        rows = conn.execute(
+            f"{_DB_HIT_SELECT} WHERE c.id IN ({','.join('?' for _ in ids)})",
+            ids,
+        ).fetchall()
+    by_id = {int(r["chunk_id"]): r for r in rows}
+    return _db_hits_from_rows(by_id[cid] for cid in ids)
+
+
+def _db_fetch_section_chunks(
+    section_id: str,
+    *,
+    children: bool,
     scope: str,
     mp_ids: list[str] | None,
     limit: int,
 ) -> list[_DBHit]:
+    """
+    Content chunks of `section_id` (plus its subsections when children=True),
+    ordered by page then chunk id.
+    """
+    hits = _section_map_hits(section_id, children=children, scope=scope, mp_ids=mp_ids, limit=limit)
+    if hits is not None:
+        return hits
+
+    # SQL fallback (sections table not built yet, or the map is stale)
     where = [
         "c.section_id IS NOT NULL",
-        "(c.section_id = ? OR c.section_id LIKE ?)",
+        "(c.section_id = ? OR c.section_id LIKE ?)" if children else "c.section_id = ?",
         "(c.chunk_kind IS NULL OR c.chunk_kind NOT IN ('toc','front_matter'))",
     ]
-    params: list[object] = [section_id, f"{section_id}.%"]
+    params: list[object] = [section_id, f"{section_id}.%"] if children else [section_id]
     _apply_scope_filters(where, params, scope, mp_ids)
 
     sql = f"""
-        SELECT
-            c.id AS chunk_id,
-            c.document_id,
-            d.filename,
-            d.display_name,
-            d.doc_type,
-            d.mp_id,
-            c.section_id,
-            c.heading,
-            c.page_start,
-            c.page_end,
-            c.chunk_kind,
-            c.text
-        FROM chunks c
-        JOIN documents d ON d.id = c.document_id
+        {_DB_HIT_SELECT}
         WHERE {" AND ".join(where)}
         ORDER BY c.page_start ASC, c.id ASC
         LIMIT ?
     """
     params.append(limit)
 
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         rows = conn.execute(sql, params).fetchall()
+    return _db_hits_from_rows(rows)
 
-    hits: list[_DBHit] = []
-    for r in rows:
-        text = r["text"] or ""
-        hits.append(
-            _DBHit(
-                chunk_id=int(r["chunk_id"]),
-                document_id=int(r["document_id"]),
-                filename=r["filename"],
-                display_name=r["display_name"],
-                doc_type=r["doc_type"],
-                mp_id=r["mp_id"],
-                section_id=r["section_id"],
-                heading=r["heading"],
-                page_start=int(r["page_start"]),
-                page_end=int(r["page_end"]),
-                snippet=_make_snippet(text),
-                chunk_kind=r["chunk_kind"],
-                text=text,
-            )
-        )
-    return hits
+
+def _db_fetch_exact_section(
+    section_id: str,
+    *,
+    scope: str,
+    mp_ids: list[str] | None,
+    limit: int,
+) -> list[_DBHit]:
+    return _db_fetch_section_chunks(section_id, children=False, scope=scope, mp_ids=mp_ids, limit=limit)
+
+
+def _db_fetch_exact_or_children(
+    section_id: str,
+    *,
+    scope: str,
+    mp_ids: list[str] | None,
+    limit: int,
+) -> list[_DBHit]:
+    return _db_fetch_section_chunks(section_id, children=True, scope=scope, mp_ids=mp_ids, limit=limit)
 
 
 def _db_fetch_prefix_sections(
@@ -593,14 +597,24 @@ def _db_fetch_prefix_sections(
     limit: int,
 ) -> list[_DBHit]:
     # matches 701, 701.*, etc.
-    where = [
-        "c.section_id IS NOT NULL",
-        "(c.section_id = ? OR c.section_id LIKE ?)",
-        "(c.chunk_kind IS NULL OR c.chunk_kind NOT IN ('toc','front_matter'))",
-    ]
-    params: list[object] = [prefix3, f"{prefix3}.%"]
-    _apply_scope_filters(where, params, scope, mp_ids)
+    return _db_fetch_section_chunks(prefix3, children=True, scope=scope, mp_ids=mp_ids, limit=limit)
+
 
+def _db_fetch_table_token_hits(
+    table_token: str,
+    *,
+    scope: str,
+    mp_ids: list[str] | None,
+    limit: int,
+) -> list[_DBHit]:
+    """
+    Table-row chunks carrying `table_token`: an index seek on table_tokens,
+    or a LIKE scan on databases where build_chunks has not filled it yet.
+    """
+    normalized = _normalize_table_text(table_token)
+    where = ["t.token = ?"]
+    params: list[object] = [normalized]
+    _apply_scope_filters(where, params, scope, mp_ids)
     sql = f"""
         SELECT
             c.id AS chunk_id,
@@ -614,8 +628,11 @@ def _db_fetch_prefix_sections(
             c.page_start,
             c.page_end,
             c.chunk_kind,
-            c.text
-        FROM chunks c
+            c.text,
+            c.table_uid,
+            c.table_label
+        FROM table_tokens t
+        JOIN chunks c ON c.id = t.chunk_id
         JOIN documents d ON d.id = c.document_id
         WHERE {" AND ".join(where)}
         ORDER BY c.page_start ASC, c.id ASC
@@ -623,40 +640,25 @@ def _db_fetch_prefix_sections(
     """
     params.append(limit)
 
-    with get_conn() as conn:
-        rows = conn.execute(sql, params).fetchall()
+    with get_conn(readonly=True) as conn:
+        if chunk_builds_recorded(conn):
+            rows = conn.execute(sql, params).fetchall()
+        else:
+            # table_tokens is missing, or empty until build_chunks runs after the upgrade
+            rows = _db_scan_table_token_rows(conn, normalized, scope=scope, mp_ids=mp_ids, limit=limit)
 
-    hits: list[_DBHit] = []
-    for r in rows:
-        text = r["text"] or ""
-        hits.append(
-            _DBHit(
-                chunk_id=int(r["chunk_id"]),
-                document_id=int(r["document_id"]),
-                filename=r["filename"],
-                display_name=r["display_name"],
-                doc_type=r["doc_type"],
-                mp_id=r["mp_id"],
-                section_id=r["section_id"],
-                heading=r["heading"],
-                page_start=int(r["page_start"]),
-                page_end=int(r["page_end"]),
-                snippet=_make_snippet(text),
-                chunk_kind=r["chunk_kind"],
-                text=text,
-            )
-        )
+    hits = _db_hits_from_rows(rows)
+    for h, r in zip(hits, rows):
+        h.table_uid = r["table_uid"]
+        h.table_label = r["table_label"]
     return hits
 
 
-def _db_fetch_table_token_hits(
-    table_token: str,
-    *,
-    scope: str,
-    mp_ids: list[str] | None,
-    limit: int,
-) -> list[_DBHit]:
-    normalized = _normalize_table_text(table_token)
+def _db_scan_table_token_rows(conn, normalized: str, *, scope: str, mp_ids: list[str] | None, limit: int) -> list:
+    """
+    LIKE pre-filter, then the same whole-token match build_chunks uses for
+    table_tokens, so "901.03-1" does not also return rows of "901.03-12".
+    """
     like = f"%{normalized}%"
     where = [
         "c.chunk_kind = 'table_row'",
@@ -690,36 +692,14 @@ def _db_fetch_table_token_hits(
         JOIN documents d ON d.id = c.document_id
         WHERE {" AND ".join(where)}
         ORDER BY c.page_start ASC, c.id ASC
-        LIMIT ?
     """
-    params.append(limit)
-
-    with get_conn() as conn:
-        rows = conn.execute(sql, params).fetchall()
-
-    hits: list[_DBHit] = []
-    for r in rows:
-        text = r["text"] or ""
-        hits.append(
-            _DBHit(
-                chunk_id=int(r["chunk_id"]),
-                document_id=int(r["document_id"]),
-                filename=r["filename"],
-                display_name=r["display_name"],
-                doc_type=r["doc_type"],
-                mp_id=r["mp_id"],
-                section_id=r["section_id"],
-                heading=r["heading"],
-                page_start=int(r["page_start"]),
-                page_end=int(r["page_end"]),
-                snippet=_make_snippet(text),
-                chunk_kind=r["chunk_kind"],
-                text=text,
-                table_uid=r["table_uid"],
-                table_label=r["table_label"],
-            )
-        )
-    return hits
+    rows = []
+    for r in conn.execute(sql, params):
+        if normalized in table_tokens_in(r["text"], r["heading"], r["table_label"]):
+            rows.append(r)
+            if len(rows) >= limit:
+                break
+    return rows
 
 
 def _sanitize_exact_section_hits(section_id: str, hits: list[_DBHit]) -> list[_DBHit]:
@@ -821,32 +801,6 @@ def _make_answer_user_friendly(answer: str) -> str:
     return answer
 
 
-def _question_asks_for_section_or_page(query: str) -> bool:
-    q = (query or "").lower()
-    triggers = [
-        "which section",
-        "what section",
-        "section number",
-        "section id",
-        "what page",
-        "which page",
-        "page number",
-        "where in the manual",
-        "where in the spec",
-        "where can i find",
-        "cite",
-        "citation",
-        "reference",
-    ]
-    if any(t in q for t in triggers):
-        return True
-    return bool(re.search(r"\b\d{3}\.\d{2}(?:\.\d{2})?\b", q, re.I))
-
-
-def _is_bare_section_id_query(query: str) -> bool:
-    return bool(re.fullmatch(r"\s*\d{3}\.\d{2}(?:\.\d{2})?\s*", query or ""))
-
-
 def _strip_answer_metadata(answer: str, query: str) -> str:
     if not answer:
         return answer
@@ -856,7 +810,7 @@ def _strip_answer_metadata(answer: str, query: str) -> str:
     answer = re.sub(r"\s*[\(\[]?\s*source\s*\d+\s*[\)\]]?\s*", " ", answer, flags=re.I)
     answer = re.sub(r"\bsource\s*:\s*", "", answer, flags=re.I)
 
-    if _question_asks_for_section_or_page(query):
+    if asks_for_section_or_page(query):
         answer = re.sub(r"\s{2,}", " ", answer).strip(" ,.;:")
         return answer
 
@@ -975,13 +929,8 @@ def _extract_prompt_payment_days(text: str) -> str | None:
     return None
 
 
-def _looks_like_table_query(q: str) -> bool:
-    s = (q or "").lower()
-    return any(w in s for w in ["table", "tab.", "chart", "tbl", "requirements table"])
-
-
 def _looks_like_table_intent(query: str, hits) -> bool:
-    if _looks_like_table_query(query):
+    if looks_like_table_query(query):
         return True
     if not hits:
         return False
@@ -996,15 +945,6 @@ def _looks_like_table_intent(query: str, hits) -> bool:
     return len(q_tokens & h_tokens) >= 2
 
 
-def _extract_table_token(query: str) -> str | None:
-    m = re.search(
-        r"\btable\s*(\d{3}\.\d{2}\.\d{2}-\d+|\d{3}\.\d{2}-\d+)\b",
-        query or "",
-        re.I,
-    )
-    return m.group(1) if m else None
-
-
 def _normalize_table_text(text: str) -> str:
     s = (text or "").lower()
     s = s.replace("–", "-").replace("—", "-")
@@ -1013,12 +953,7 @@ def _normalize_table_text(text: str) -> str:
 
 
 def _table_has_enough_rows(table_uid: str, min_rows: int = 4) -> bool:
-    with get_conn() as conn:
-        r = conn.execute(
-            "SELECT COUNT(1) AS n FROM table_rows WHERE table_uid = ?",
-            (table_uid,),
-        ).fetchone()
-    return bool(r and int(r["n"] or 0) >= min_rows)
+    return table_row_count(table_uid) >= min_rows
 
 
 _TABLE_DATA_UNITS = (
@@ -1237,23 +1172,29 @@ def _top_table_block(hits) -> tuple[str | None, str | None, list]:
 # Main entry
 # -----------------------------
 
-def _ask_question_inner(
+def _prepare_answer(
     query: str,
     *,
     scope: str = "all",
     mp_ids: list[str] | None = None,
     k: int = 6,
     mode: str = "answer",
-) -> dict:
-    q = query or ""
+    analysis: QueryAnalysis | None = None,
+) -> dict | _SynthesisPlan:
+    """
+    Retrieval and every deterministic answer path (CPU + SQLite).
+    Returns the final response, or a plan for LLM synthesis.
+    """
+    a = analysis or analyze_query(query)
+    q = a.text
+    plan = plan_query(a, mode)
 
-    exact = _extract_exact_section_id(q)
-    prefix = _extract_section_prefix(q)
-    table_token = _extract_table_token(q)
-    explicit_table = bool(table_token and re.fullmatch(r"\d{3}\.\d{2}\.\d{2}-\d+", table_token))
+    exact = a.exact_section_id
+    prefix = a.lookup_prefix
+    table_token = a.table_token
 
     # Deterministic table lookup for explicit table tokens (e.g., 701.03.15-1).
-    if explicit_table and mode == "answer":
+    if plan.table_prelookup:
         token_hits = _db_fetch_table_token_hits(table_token, scope=scope, mp_ids=mp_ids, limit=25)
         logger.debug("explicit_table_token=%s prelookup_hits=%d", table_token, len(token_hits))
         if token_hits:
@@ -1297,7 +1238,7 @@ def _ask_question_inner(
 
     # ✅ 1) EXACT SECTION DB FALLBACK (deterministic)
     # If user asked for 701.03.01, fetch it directly from DB first.
-    if exact:
+    if plan.exact_section:
         exact_hits = _db_fetch_exact_section(exact, scope=scope, mp_ids=mp_ids, limit=max(k, 12))
         if exact_hits:
             text_map = _hydrate_text_for_hits(exact_hits)
@@ -1305,7 +1246,7 @@ def _ask_question_inner(
                 cid = int(getattr(h, "chunk_id", 0) or 0)
                 full_text = text_map.get(cid, "")
                 if full_text:
-                    h.snippet = _make_query_focused_snippet(full_text, q, window=260, max_len=520)
+                    h.snippet = _make_query_focused_snippet(full_text, q, window=260, max_len=520, focus=a.focus)
             exact_hits = _sanitize_exact_section_hits(exact, exact_hits)
             if len(exact_hits) < 4:
                 # Expand to child subsections to avoid single-excerpt section responses.
@@ -1335,7 +1276,7 @@ def _ask_question_inner(
                     "hits": hits,
                 }
 
-            if mode == "answer" and _is_bare_section_id_query(q):
+            if mode == "answer" and a.bare_section_id:
                 answer = f"See the citations panel for Section {exact}."
                 _log_path("section_exact_bare", scope=scope, mp_ids=mp_ids, k=k, mode=mode, conf=conf)
                 return {"confidence": conf, "answer": answer, "hits": hits}
@@ -1347,7 +1288,7 @@ def _ask_question_inner(
 
     # ✅ 2) SECTION PREFIX DB FALLBACK (deterministic set, then rerank)
     used_prefix_fallback = False
-    if prefix and not exact and is_section_intent(q):
+    if plan.prefix_sections:
         db_hits = _db_fetch_prefix_sections(prefix, scope=scope, mp_ids=mp_ids, limit=max(300, k * 40))
         if db_hits:
             text_map = _hydrate_text_for_hits(db_hits)
@@ -1355,7 +1296,7 @@ def _ask_question_inner(
                 cid = int(getattr(h, "chunk_id", 0) or 0)
                 full_text = text_map.get(cid, "")
                 if full_text:
-                    h.snippet = _make_query_focused_snippet(full_text, q, window=260, max_len=520)
+                    h.snippet = _make_query_focused_snippet(full_text, q, window=260, max_len=520, focus=a.focus)
             db_hits = _filter_mismatched_section_hits(db_hits, expected_prefix=prefix)
             hits = _bm25_rerank(q, db_hits, k=k)
             # Deterministically ensure key subsection headings are included for prefix queries
@@ -1393,9 +1334,9 @@ def _ask_question_inner(
             conf = "strong" if hits and hits[0].section_id and hits[0].section_id.startswith(prefix) else "medium"
             used_prefix_fallback = True
         else:
-            hits, conf = hybrid_chunks_search(query=q, k=k, scope=scope, mp_ids=mp_ids)
+            hits, conf = hybrid_chunks_search(query=q, k=k, scope=scope, mp_ids=mp_ids, analysis=a)
     else:
-        hits, conf = hybrid_chunks_search(query=q, k=k, scope=scope, mp_ids=mp_ids)
+        hits, conf = hybrid_chunks_search(query=q, k=k, scope=scope, mp_ids=mp_ids, analysis=a)
 
     # Hydrate full text and rebuild snippets around the query
     text_map = _hydrate_text_for_hits(hits)
@@ -1403,7 +1344,7 @@ def _ask_question_inner(
         cid = int(getattr(h, "chunk_id", 0) or 0)
         full_text = text_map.get(cid, "")
         if full_text:
-            h.snippet = _make_query_focused_snippet(full_text, q, window=260, max_len=520)
+            h.snippet = _make_query_focused_snippet(full_text, q, window=260, max_len=520, focus=a.focus)
 
     # sources-only mode: no LLM call
     if mode == "sources_only":
@@ -1414,14 +1355,14 @@ def _ask_question_inner(
             "hits": hits,
         }
 
-    if mode == "answer" and _is_bare_section_id_query(q):
+    if mode == "answer" and a.bare_section_id:
         section_id = q.strip()
         answer = f"See the citations panel for Section {section_id}."
         _log_path("section_lookup", scope=scope, mp_ids=mp_ids, k=k, mode=mode, conf=conf)
         return {"confidence": conf, "answer": answer, "hits": hits}
 
     # Location/section/page questions should not synthesize; defer to citations panel.
-    if mode == "answer" and _question_asks_for_section_or_page(q) and not _is_bare_section_id_query(q):
+    if mode == "answer" and a.asks_for_location and not a.bare_section_id:
         _log_path("section_lookup", scope=scope, mp_ids=mp_ids, k=k, mode=mode, conf=conf)
         return {
             "confidence": conf,
@@ -1429,13 +1370,13 @@ def _ask_question_inner(
             "hits": hits,
         }
 
-    table_intent = _looks_like_table_query(q)
+    table_intent = a.table_wording
     if not table_intent:
         # For non-table queries, drop table_row chunks entirely.
         hits = [h for h in hits if getattr(h, "chunk_kind", None) != "table_row"]
 
     # For non-table queries, prefer real content chunks over low-value rows/TOC in answer mode.
-    if mode == "answer" and not table_intent and not is_section_intent(q):
+    if mode == "answer" and not table_intent and not a.section_intent:
         low_value_kinds = {"table_row", "toc", "front_matter"}
         preferred = [h for h in hits if getattr(h, "chunk_kind", None) not in low_value_kinds]
         low_value = [h for h in hits if getattr(h, "chunk_kind", None) in low_value_kinds]
@@ -1447,7 +1388,7 @@ def _ask_question_inner(
                 hits = preferred + low_value[:allowed_low_value] + low_value[allowed_low_value:]
 
     # Section-intent queries should return deterministic merged excerpts (no LLM).
-    if is_section_intent(q) and not _looks_like_table_query(q) and not _question_asks_for_section_or_page(q):
+    if a.section_intent and not a.table_wording and not a.asks_for_location:
         if not hits:
             _log_path("section_intent_empty", scope=scope, mp_ids=mp_ids, k=k, mode=mode, conf="weak")
             return {
@@ -1603,9 +1544,8 @@ def _ask_question_inner(
     # If we reach here, we are not in section-intent handling or table-specific logic.
 
     # Prefer the chunk that actually contains the requested "Table XXX.XX-N" header text
-    m = re.search(r"\btable\s*(\d{3}\.\d{2}-\d+)\b", (q or "").lower())
-    if m and hits:
-        token = m.group(1)  # e.g. 901.03-1
+    if a.table_ref and hits:
+        token = a.table_ref  # e.g. 901.03-1
 
         def looks_like_real_table_chunk(h) -> bool:
             s = (getattr(h, "snippet", "") or "").lower()
@@ -1699,67 +1639,179 @@ SOURCES:
 """
 
     _log_path("hybrid", scope=scope, mp_ids=mp_ids, k=k, mode=mode, conf=conf)
+    return _SynthesisPlan(
+        query=q,
+        hits=hits,
+        top_hits=top_hits,
+        conf=conf,
+        sources_text=sources_text,
+        messages=[
+            LLMMessage(role="system", content=SYNTHESIS_PROMPT),
+            LLMMessage(role="user", content=user_prompt),
+        ],
+    )
+
+
+# -----------------------------
+# LLM synthesis
+# -----------------------------
+
+
+@dataclass
+class _SynthesisPlan:
+    """
+    Everything retrieval decided before the LLM call, so the (slow, I/O bound)
+    call can be made either blocking or awaited.
+    """
+
+    query: str
+    hits: list
+    top_hits: list
+    conf: str
+    sources_text: str
+    messages: list[LLMMessage]
+
+
+def _pre_llm_answer(plan: _SynthesisPlan) -> dict | str:
+    """
+    Gates that run before the LLM: a final response (dict), a deterministic
+    answer (non-empty str), or "" when the LLM should answer.
+    """
+    q = plan.query
+    if _is_time_limit_question(q):
+        has_days = _has_payment_days_phrase(plan.sources_text)
+        logger.info("time_limit_gate match=%s", has_days)
+        logger.debug("time_limit_gate sources_text=%s", plan.sources_text)
+        if not has_days:
+            return {"confidence": "weak", "answer": "Insufficient Evidence.", "hits": plan.hits}
+    if _is_prompt_payment_interest_intent(q):
+        statute_best = next((h for h in plan.top_hits if _statute_hit_score(h) >= 2), None)
+        if statute_best:
+            statute_text = (
+                (getattr(statute_best, "text", "") or "")
+                + " "
+                + (getattr(statute_best, "snippet", "") or "")
+            )
+            days = _extract_prompt_payment_days(statute_text)
+            if days:
+                return (
+                    f"Interest begins to accrue if the subcontractor is not paid within {days} days after receipt of payment."
+                )
+    return ""
+
+
+def _numeric_guard(plan: _SynthesisPlan, answer: str) -> Optional[dict]:
+    # Prevent numeric hallucination for time-based questions.
+    if re.search(r"\bhow many days\b|\bwithin \d+ days\b|\bdays\b", plan.query.lower()):
+        src_blob = plan.sources_text.lower()
+        nums_in_answer = set(re.findall(r"\b\d+\b", answer))
+        if nums_in_answer and not any(n in src_blob for n in nums_in_answer):
+            return _llm_fallback_answer(plan.hits)
+    return None
+
+
+def _llm_failed(plan: _SynthesisPlan, llm, err: Exception) -> dict:
+    provider = getattr(llm, "provider", "unknown")
+    error_code = _llm_error_code(err)
+    logger.warning("LLM call failed; provider=%s error_code=%s", provider, error_code)
+    # LLM provider may be unavailable/restricted; fall back to deterministic excerpt.
+    # Not cached, so the next ask retries the provider.
+    return {**_llm_fallback_answer(plan.hits), NO_CACHE_KEY: True}
+
+
+def _finish_answer(plan: _SynthesisPlan, answer: str) -> dict:
+    conf = _safe_confidence(plan.conf, answer)
+    answer = _make_answer_user_friendly(answer)
+    answer = _strip_answer_metadata(answer, plan.query)
+    answer = _polish_answer_text(answer)
+
+    return {"confidence": conf, "answer": answer, "hits": plan.hits}
+
+
+def _synthesize(plan: _SynthesisPlan) -> dict:
     llm = None
     try:
         llm = get_llm()
-        if _is_time_limit_question(q):
-            has_days = _has_payment_days_phrase(sources_text)
-            logger.info("time_limit_gate match=%s", has_days)
-            logger.debug("time_limit_gate sources_text=%s", sources_text)
-            if not has_days:
-                return {"confidence": "weak", "answer": "Insufficient Evidence.", "hits": hits}
-        if _is_prompt_payment_interest_intent(q):
-            statute_best = next((h for h in top_hits if _statute_hit_score(h) >= 2), None)
-            if statute_best:
-                statute_text = (
-                    (getattr(statute_best, "text", "") or "")
-                    + " "
-                    + (getattr(statute_best, "snippet", "") or "")
-                )
-                days = _extract_prompt_payment_days(statute_text)
-                if days:
-                    answer = (
-                        f"Interest begins to accrue if the subcontractor is not paid within {days} days after receipt of payment."
-                    )
-                else:
-                    answer = ""
-            else:
-                answer = ""
-        else:
-            answer = ""
+        answer = _pre_llm_answer(plan)
+        if isinstance(answer, dict):
+            return answer
+        if not answer:
+            answer = llm.chat(plan.messages).strip()
+        guarded = _numeric_guard(plan, answer)
+        if guarded is not None:
+            return guarded
+    except Exception as e:
+        return _llm_failed(plan, llm, e)
+    return _finish_answer(plan, answer)
+
 
+async def _asynthesize(plan: _SynthesisPlan) -> dict:
+    llm = None
+    try:
+        llm = get_llm()
+        answer = _pre_llm_answer(plan)
+        if isinstance(answer, dict):
+            return answer
         if not answer:
-            answer = llm.chat(
-                [
-                    LLMMessage(role="system", content=SYNTHESIS_PROMPT),
-                    LLMMessage(role="user", content=user_prompt),
-                ]
-            ).strip()
-        # Prevent numeric hallucination for time-based questions.
-        if re.search(r"\bhow many days\b|\bwithin \d+ days\b|\bdays\b", q.lower()):
-            src_blob = sources_text.lower()
-            nums_in_answer = set(re.findall(r"\b\d+\b", answer))
-            if nums_in_answer and not any(n in src_blob for n in nums_in_answer):
-                return _llm_fallback_answer(hits)
-    except LLMError as e:
-        provider = getattr(llm, "provider", "unknown")
-        error_code = _llm_error_code(e)
-        logger.warning("LLM call failed; provider=%s error_code=%s", provider, error_code)
-        # LLM provider may be unavailable/restricted; fall back to deterministic excerpt.
-        return _llm_fallback_answer(hits)
+            answer = (await llm.achat(plan.messages)).strip()
+        guarded = _numeric_guard(plan, answer)
+        if guarded is not None:
+            return guarded
     except Exception as e:
-        provider = getattr(llm, "provider", "unknown")
-        error_code = _llm_error_code(e)
-        logger.warning("LLM call failed; provider=%s error_code=%s", provider, error_code)
-        # LLM provider may be unavailable/restricted; fall back to deterministic excerpt.
-        return _llm_fallback_answer(hits)
+        return _llm_failed(plan, llm, e)
+    return _finish_answer(plan, answer)
 
-    conf = _safe_confidence(conf, answer)
-    answer = _make_answer_user_friendly(answer)
-    answer = _strip_answer_metadata(answer, q)
-    answer = _polish_answer_text(answer)
 
-    return {"confidence": conf, "answer": answer, "hits": hits}
+def _log_ask_failure(scope: str, mp_ids: list[str] | None, k: int, mode: str) -> None:
+    logger.exception(
+        "ask_question failed; scope=%s mp_ids=%s k=%s mode=%s",
+        scope,
+        mp_ids or [],
+        k,
+        mode,
+    )
+
+
+def _cache_get(query: str, *, scope: str, mp_ids: list[str] | None, k: int, mode: str) -> Optional[dict]:
+    try:
+        return get_answer_cache().get(query, scope=scope, mp_ids=mp_ids, k=k, mode=mode)
+    except Exception:
+        logger.exception("answer cache lookup failed")
+        return None
+
+
+def _cache_put(query: str, result: dict, *, scope: str, mp_ids: list[str] | None, k: int, mode: str) -> None:
+    try:
+        get_answer_cache().put(query, result, scope=scope, mp_ids=mp_ids, k=k, mode=mode)
+    except Exception:
+        result.pop(NO_CACHE_KEY, None)
+        logger.exception("answer cache store failed")
+
+
+async def _acache_put(query: str, result: dict, *, scope: str, mp_ids: list[str] | None, k: int, mode: str) -> None:
+    # put may embed the query (semantic tier) and write SQLite (persistent tier): keep it off the event loop
+    await asyncio.get_running_loop().run_in_executor(
+        _retrieval_executor(),
+        functools.partial(_cache_put, query, result, scope=scope, mp_ids=mp_ids, k=k, mode=mode),
+    )
+
+
+def _lookup_or_prepare(
+    query: str,
+    *,
+    scope: str,
+    mp_ids: list[str] | None,
+    k: int,
+    mode: str,
+) -> tuple[dict | _SynthesisPlan, bool]:
+    """
+    (cached result, True) on an answer-cache hit, else (_prepare_answer(...), False).
+    """
+    cached = _cache_get(query, scope=scope, mp_ids=mp_ids, k=k, mode=mode)
+    if cached is not None:
+        return cached, True
+    analysis = analyze_query(query)
+    return _prepare_answer(query, scope=scope, mp_ids=mp_ids, k=k, mode=mode, analysis=analysis), False
 
 
 def ask_question(
@@ -1771,13 +1823,127 @@ def ask_question(
     mode: str = "answer",
 ) -> dict:
     try:
-        return _ask_question_inner(query, scope=scope, mp_ids=mp_ids, k=k, mode=mode)
+        prepared, cached = _lookup_or_prepare(query, scope=scope, mp_ids=mp_ids, k=k, mode=mode)
+        if cached:
+            return prepared
+        out = prepared if isinstance(prepared, dict) else _synthesize(prepared)
     except Exception:
-        logger.exception(
-            "ask_question failed; scope=%s mp_ids=%s k=%s mode=%s",
-            scope,
-            mp_ids or [],
-            k,
-            mode,
+        _log_ask_failure(scope, mp_ids, k, mode)
+        return _weak_response([], query)
+    _cache_put(query, out, scope=scope, mp_ids=mp_ids, k=k, mode=mode)
+    return out
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _retrieval_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ASK_RETRIEVAL_WORKERS,
+                    thread_name_prefix="ask-retrieval",
+                )
+    return _executor
+
+
+def shutdown_retrieval_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+async def ask_question_async(
+    query: str,
+    *,
+    scope: str = "all",
+    mp_ids: list[str] | None = None,
+    k: int = 6,
+    mode: str = "answer",
+) -> dict:
+    """
+    ask_question for async routes: retrieval runs on a bounded executor and the
+    LLM call is awaited, so a slow provider holds no thread while it waits.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        prepared, cached = await loop.run_in_executor(
+            _retrieval_executor(),
+            functools.partial(_lookup_or_prepare, query, scope=scope, mp_ids=mp_ids, k=k, mode=mode),
         )
+        if cached:
+            return prepared
+        out = prepared if isinstance(prepared, dict) else await _asynthesize(prepared)
+    except Exception:
+        _log_ask_failure(scope, mp_ids, k, mode)
         return _weak_response([], query)
+    await _acache_put(query, out, scope=scope, mp_ids=mp_ids, k=k, mode=mode)
+    return out
+
+
+async def ask_question_stream(
+    query: str,
+    *,
+    scope: str = "all",
+    mp_ids: list[str] | None = None,
+    k: int = 6,
+    mode: str = "answer",
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Streaming ask_question. Yields (event, payload):
+
+    - ("citations", {"hits", "confidence"}) as soon as retrieval is done
+    - ("token", {"text"}) for each LLM text delta
+    - ("final", <ask_question result>) last
+
+    The final answer is sanitized and authoritative: guards and fallbacks can
+    replace what was streamed. Cached answers arrive without token events.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        prepared, cached = await loop.run_in_executor(
+            _retrieval_executor(),
+            functools.partial(_lookup_or_prepare, query, scope=scope, mp_ids=mp_ids, k=k, mode=mode),
+        )
+    except Exception:
+        _log_ask_failure(scope, mp_ids, k, mode)
+        # cached=True keeps the failure response out of the answer cache.
+        prepared, cached = _weak_response([], query), True
+
+    if isinstance(prepared, dict):
+        yield "citations", {"hits": prepared.get("hits", []), "confidence": prepared.get("confidence")}
+        if not cached:
+            await _acache_put(query, prepared, scope=scope, mp_ids=mp_ids, k=k, mode=mode)
+        yield "final", prepared
+        return
+
+    plan = prepared
+    yield "citations", {"hits": plan.hits, "confidence": plan.conf}
+
+    llm = None
+    final: Optional[dict] = None
+    try:
+        llm = get_llm()
+        answer = _pre_llm_answer(plan)
+        if isinstance(answer, dict):
+            final = answer
+        else:
+            if not answer:
+                parts: list[str] = []
+                async for delta in llm.astream(plan.messages):
+                    parts.append(delta)
+                    yield "token", {"text": delta}
+                answer = "".join(parts).strip()
+            final = _numeric_guard(plan, answer)
+    except Exception as e:
+        final = _llm_failed(plan, llm, e)
+    else:
+        if final is None:
+            final = _finish_answer(plan, answer)
+    await _acache_put(query, final, scope=scope, mp_ids=mp_ids, k=k, mode=mode)
+    yield "final", final
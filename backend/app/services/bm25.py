@@ -6,10 +6,13 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Optional
 
+import numpy as np
 from rank_bm25 import BM25Okapi
 
 from app.core.config import settings
 from app.services.db import get_conn
+from app.services.index_registry import IndexGeneration, atomic_output, get_registry
+from app.services.metadata_columns import MetadataColumns, top_indices
 
 # Keeps things like MP1-25, 701.01, A-709, etc.
 _WORD_RE = re.compile(r"[A-Za-z0-9]+(?:[.\-/][A-Za-z0-9]+)*")
@@ -18,6 +21,12 @@ _WORD_RE = re.compile(r"[A-Za-z0-9]+(?:[.\-/][A-Za-z0-9]+)*")
 _SECTION_DOT_RE = re.compile(r"^\d{3}\.\d{2}$")  # 701.01
 _SECTION_3_RE = re.compile(r"^\d{3}$")  # 701
 
+# Static page features (uppercased text). Lookaheads so every position is tried:
+# a subsection id is collected iff section_content_bonus's per-id regex would match.
+_DESCRIPTION_HEADER_RE = re.compile(r"(?=\b(\d{3}\.\d{2})\b\s+DESCRIPTION\b)")
+_TOC_LINE_REF_RE = re.compile(r"(?=\b(\d{3}\.\d{2})\b.*\.{2,}.*\b\d{1,4}\b)")
+_SECTION_HEADER_RE = re.compile(r"(?=SECTION (\d{3}))")
+
 
 def tokenize(text: str) -> list[str]:
     tokens = [m.group(0).lower() for m in _WORD_RE.finditer(text or "")]
@@ -232,6 +241,83 @@ class BM25Hit:
     mp_id: str | None
     page_number: int
     snippet: str
+    snippet_toc_entries: int = 0
+
+
+def page_snippet(text: str) -> str:
+    return text[:350].replace("\n", " ").strip() + ("…" if len(text) > 350 else "")
+
+
+def page_features(text: str) -> dict[str, Any]:
+    """
+    Query-independent heuristics for one page, stored in the page index meta
+    at build time so search never runs the TOC/section regexes per query.
+    """
+    t = text.upper()
+    return {
+        "toc_entries": toc_entry_count(text),
+        "snippet_toc_entries": toc_entry_count(page_snippet(text)),
+        "looks_like_toc": looks_like_toc(text),
+        "prose": "THIS SECTION" in t or "SHALL" in t,
+        # subsection ids followed by a DESCRIPTION header / listed on a TOC line,
+        # and the section numbers that appear as "SECTION nnn"
+        "description_sections": sorted(set(_DESCRIPTION_HEADER_RE.findall(t))),
+        "toc_line_sections": sorted(set(_TOC_LINE_REF_RE.findall(t))),
+        "section_headers": sorted(set(_SECTION_HEADER_RE.findall(t))),
+    }
+
+
+def _postings(values: list[list[str]]) -> dict[str, np.ndarray]:
+    rows: dict[str, list[int]] = {}
+    for i, keys in enumerate(values):
+        for key in keys:
+            rows.setdefault(key, []).append(i)
+    return {key: np.asarray(r, dtype=np.int64) for key, r in rows.items()}
+
+
+class PageFeatures:
+    """
+    page_features() as columns aligned with a page index's corpus order.
+    Subsection/section sets are kept as postings (id -> rows), so the TOC
+    penalty and section bonus for a query are array arithmetic.
+    """
+
+    def __init__(self, features: list[dict[str, Any]]):
+        self.n = len(features)
+        self.toc_entries = np.array([f["toc_entries"] for f in features], dtype=np.int64)
+        self.snippet_toc_entries = np.array([f["snippet_toc_entries"] for f in features], dtype=np.int64)
+        self.looks_like_toc = np.array([f["looks_like_toc"] for f in features], dtype=bool)
+        self.prose = np.array([f["prose"] for f in features], dtype=bool)
+        self.description_rows = _postings([f["description_sections"] for f in features])
+        self.toc_line_rows = _postings([f["toc_line_sections"] for f in features])
+        self.section_rows = _postings([f["section_headers"] for f in features])
+
+    @staticmethod
+    def from_meta(meta: list[dict[str, Any]]) -> "PageFeatures":
+        # Artifacts built before the features were stored get them computed on load.
+        return PageFeatures([m if "toc_entries" in m else page_features(m.get("text") or "") for m in meta])
+
+    def toc_penalty(self, section_intent: bool) -> np.ndarray:
+        """
+        Continuous TOC penalty: TOC pages have many entries, content pages near 0.
+        Section-intent queries penalize much harder (toc_n=30 => 1/91).
+        """
+        return 1.0 / (1.0 + (3.0 if section_intent else 0.5) * self.toc_entries)
+
+    def section_bonus(self, sec3: Optional[str], secdot: Optional[str]) -> np.ndarray:
+        """
+        section_content_bonus for every page at once.
+        """
+        bonus = np.ones(self.n, dtype=np.float64)
+        if not sec3:
+            return bonus
+        empty = np.zeros(0, dtype=np.int64)
+        if secdot:
+            bonus[self.description_rows.get(secdot, empty)] *= 3.0
+            bonus[self.toc_line_rows.get(secdot, empty)] *= 0.15
+        bonus[self.section_rows.get(sec3, empty)] *= 1.2
+        bonus[self.prose] *= 1.2
+        return bonus
 
 
 class BM25Index:
@@ -244,10 +330,11 @@ class BM25Index:
     def __init__(self, bm25: BM25Okapi, meta: list[dict[str, Any]]):
         self.bm25 = bm25
         self.meta = meta
+        self.columns = MetadataColumns.from_meta(meta)
+        self.features = PageFeatures.from_meta(meta)
 
     def save(self, path: Path) -> None:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("wb") as f:
+        with atomic_output(path) as tmp, tmp.open("wb") as f:
             pickle.dump({"bm25": self.bm25, "meta": self.meta}, f)
 
     @staticmethod
@@ -263,7 +350,7 @@ def build_bm25_index(output_path: Path | None = None) -> Path:
     """
     output_path = output_path or settings.BM25_PATH
 
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         rows = conn.execute(
             """
             SELECT
@@ -294,7 +381,8 @@ def build_bm25_index(output_path: Path | None = None) -> Path:
                 "doc_type": r["doc_type"],
                 "mp_id": r["mp_id"],
                 "page_number": int(r["page_number"]),
-                "text": text,  # stored for snippets + heuristics (ok for dataset size)
+                "text": text,  # stored for snippets (ok for dataset size)
+                **page_features(text),
             }
         )
 
@@ -310,80 +398,41 @@ def bm25_search_filtered(
     scope: str = "all",
     mp_ids: list[str] | None = None,
     index_path: Path | None = None,
+    generation: IndexGeneration | None = None,
 ) -> list[BM25Hit]:
-    index_path = index_path or settings.BM25_PATH
-    index = BM25Index.load(index_path)
+    if index_path is not None:
+        index = BM25Index.load(index_path)
+    else:
+        index = (generation or get_registry().current()).get("bm25_pages")
 
     q_tokens = tokenize(query)
     bm25_scores = index.bm25.get_scores(q_tokens)
 
-    mp_ids_norm = [m.upper() for m in (mp_ids or [])]
-
-    def allowed(i: int) -> bool:
-        m = index.meta[i]
-        doc_type = (m.get("doc_type") or "").lower()
-        mp_id = (m.get("mp_id") or "")
-        if scope == "all":
-            return True
-        if scope == "standspec":
-            return doc_type == "standspec"
-        if scope == "scheduling":
-            return doc_type == "scheduling"
-        if scope == "mp":
-            return doc_type == "mp"
-        if scope == "mp_only":
-            return doc_type == "mp" and mp_id.upper() in mp_ids_norm
-        return True
-
-    def final_score(i: int) -> float:
-        if not allowed(i):
-            return float("-inf")
-
-        m = index.meta[i]
-        text = m.get("text") or ""
-        raw = float(bm25_scores[i])
-
-        if raw <= 0:
-            return 0.0
-
-        sec3, secdot = parse_section_intent(query)
-        section_intent = bool(sec3 or secdot)
-
-        # Continuous TOC penalty: TOC pages will have many entries, content pages near 0.
-        toc_n = toc_entry_count(text)
-
-        # If query is section intent, apply much stronger penalty to TOC-y pages
-        if section_intent:
-            # Example: toc_n=30 => divide by (1 + 3*30)=91 (massive penalty)
-            toc_penalty = 1.0 / (1.0 + 3.0 * toc_n)
-        else:
-            # Softer penalty for general queries
-            toc_penalty = 1.0 / (1.0 + 0.5 * toc_n)
-
-        bonus = section_content_bonus(query, text)
-
-        return raw * toc_penalty * bonus
-
-    # IMPORTANT: rank only within allowed set AND skip -inf
-    candidates = [i for i in range(len(bm25_scores)) if allowed(i)]
-    ranked_all = sorted(candidates, key=final_score, reverse=True)
+    # bm25 * TOC penalty * section bonus; non-positive bm25 scores always rank as 0.
+    sec3, secdot = parse_section_intent(query)
+    features = index.features
+    positive = bm25_scores > 0
+    final = np.where(
+        positive,
+        bm25_scores * features.toc_penalty(bool(sec3 or secdot)) * features.section_bonus(sec3, secdot),
+        0.0,
+    )
 
-    # Prefer strictly positive bm25 scores
-    ranked = [i for i in ranked_all if bm25_scores[i] > 0][:k]
+    # Rank only within the allowed set.
+    mask = index.columns.scope_mask(scope, mp_ids)
+    ranked = top_indices(final, np.flatnonzero(positive if mask is None else (mask & positive)), k).tolist()
 
-    # Fallback (rare)
+    # Fallback (rare): nothing allowed scored above 0, keep corpus order
     if not ranked:
-        ranked = ranked_all[:k]
+        ranked = (np.arange(len(bm25_scores)) if mask is None else np.flatnonzero(mask))[:k].tolist()
 
     hits: list[BM25Hit] = []
     for i in ranked:
         m = index.meta[i]
-        text = m["text"] or ""
-        snippet = text[:350].replace("\n", " ").strip() + ("…" if len(text) > 350 else "")
 
         hits.append(
             BM25Hit(
-                score=float(final_score(i)),
+                score=float(final[i]),
                 bm25_score=float(bm25_scores[i]),
                 document_id=int(m["document_id"]),
                 filename=m["filename"],
@@ -391,7 +440,8 @@ def bm25_search_filtered(
                 doc_type=m["doc_type"],
                 mp_id=m["mp_id"],
                 page_number=int(m["page_number"]),
-                snippet=snippet,
+                snippet=page_snippet(m["text"] or ""),
+                snippet_toc_entries=int(features.snippet_toc_entries[i]),
             )
         )
 
@@ -6,10 +6,13 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Optional
 
+import numpy as np
 from rank_bm25 import BM25Okapi
 
 from app.core.config import settings
-from app.services.db import get_conn
+from app.services.chunk_store import ChunkStore, load_chunk_records, open_chunk_store
+from app.services.index_registry import IndexGeneration, atomic_output, get_registry, load_array, save_array
+from app.services.metadata_columns import MetadataColumns, top_indices
 
 _WORD_RE = re.compile(r"[A-Za-z0-9]+(?:[.\-/:][A-Za-z0-9]+)*")
 
@@ -46,129 +49,162 @@ class BM25ChunkHit:
     table_row_index: Optional[int] = None
 
 
+class BM25TermMatrix:
+    """
+    BM25Okapi term weights as a term-major CSR matrix.
+
+    Row t holds idf(t) * tf*(k1+1) / (tf + k1*(1-b+b*dl/avgdl)) for every chunk
+    containing t, so scoring a query is a sum of sparse row slices. Weights are
+    computed with the same expression as BM25Okapi.get_scores, so scores match it.
+    """
+
+    def __init__(self, vocab: dict[str, int], indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, n_docs: int):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_docs = n_docs
+
+    @staticmethod
+    def from_okapi(bm25: BM25Okapi) -> "BM25TermMatrix":
+        vocab: dict[str, int] = {}
+        term_ids: list[int] = []
+        doc_ids: list[int] = []
+        tfs: list[int] = []
+        for d, freqs in enumerate(bm25.doc_freqs):
+            for term, tf in freqs.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(d)
+                tfs.append(tf)
+
+        term_arr = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_arr, kind="stable")
+        term_arr = term_arr[order]
+        doc_arr = np.asarray(doc_ids, dtype=np.int32)[order]
+        tf_arr = np.asarray(tfs, dtype=np.int64)[order]
+
+        idf = np.zeros(len(vocab), dtype=np.float64)
+        for term, t in vocab.items():
+            idf[t] = bm25.idf.get(term) or 0
+        doc_len = np.asarray(bm25.doc_len, dtype=np.int64)[doc_arr]
+        data = idf[term_arr] * (
+            tf_arr * (bm25.k1 + 1) / (tf_arr + bm25.k1 * (1 - bm25.b + bm25.b * doc_len / bm25.avgdl))
+        )
+
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_arr, minlength=len(vocab)), out=indptr[1:])
+        return BM25TermMatrix(vocab, indptr, doc_arr, data, n_docs=bm25.corpus_size)
+
+    def scores(self, tokens: list[str]) -> np.ndarray:
+        # Repeated query tokens are added once per occurrence, as BM25Okapi does.
+        out = np.zeros(self.n_docs, dtype=np.float64)
+        for tok in tokens:
+            t = self.vocab.get(tok)
+            if t is None:
+                continue
+            lo, hi = self.indptr[t], self.indptr[t + 1]
+            out[self.indices[lo:hi]] += self.data[lo:hi]
+        return out
+
+    @staticmethod
+    def from_dict(obj: dict[str, Any]) -> "BM25TermMatrix":
+        return BM25TermMatrix(obj["vocab"], obj["indptr"], obj["indices"], obj["data"], int(obj["n_docs"]))
+
+
+def bm25_chunks_array_paths(path: Path) -> dict[str, Path]:
+    """
+    CSR arrays stored next to the index pickle, e.g. bm25_chunks.indptr.npy.
+    """
+    return {name: path.with_name(f"{path.stem}.{name}.npy") for name in ("indptr", "indices", "data")}
+
+
 class BM25ChunksIndex:
-    def __init__(self, bm25: BM25Okapi, meta: list[dict[str, Any]]):
-        self.bm25 = bm25
-        self.meta = meta
+    def __init__(self, matrix: BM25TermMatrix, store: ChunkStore):
+        self.matrix = matrix
+        self.store = store
+        self.columns = MetadataColumns.from_store(store)
 
     def save(self, path: Path) -> None:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("wb") as f:
-            pickle.dump({"bm25": self.bm25, "meta": self.meta}, f)
+        # Postings go to flat .npy files (memory-mapped on load); the pickle keeps the
+        # vocabulary and records which chunk store the matrix belongs to.
+        m = self.matrix
+        for name, p in bm25_chunks_array_paths(path).items():
+            save_array(p, getattr(m, name))
+        with atomic_output(path) as tmp, tmp.open("wb") as f:
+            pickle.dump(
+                {
+                    "vocab": m.vocab,
+                    "n_docs": m.n_docs,
+                    "nnz": len(m.data),
+                    "store_fingerprint": self.store.fingerprint,
+                },
+                f,
+            )
 
     @staticmethod
-    def load(path: Path) -> "BM25ChunksIndex":
+    def load(path: Path, store_dir: Path | None = None) -> "BM25ChunksIndex":
         with path.open("rb") as f:
             obj = pickle.load(f)
-        return BM25ChunksIndex(obj["bm25"], obj["meta"])
+        if "meta" in obj:
+            # Artifacts built before the chunk store pickled metadata and text inline.
+            store = ChunkStore.from_records(obj["meta"])
+        else:
+            store = open_chunk_store(store_dir)
+            if store.fingerprint != obj["store_fingerprint"]:
+                raise RuntimeError(f"{path.name} was built against a different chunk store")
+        if "vocab" in obj:
+            arrays = {name: load_array(p) for name, p in bm25_chunks_array_paths(path).items()}
+            if len(arrays["data"]) != obj["nnz"] or len(arrays["indptr"]) != len(obj["vocab"]) + 1:
+                raise RuntimeError(f"{path.name} does not match its postings files")
+            matrix = BM25TermMatrix(obj["vocab"], arrays["indptr"], arrays["indices"], arrays["data"], int(obj["n_docs"]))
+        elif "matrix" in obj:
+            matrix = BM25TermMatrix.from_dict(obj["matrix"])
+        else:
+            # Artifacts built before the CSR engine pickled the BM25Okapi object itself.
+            matrix = BM25TermMatrix.from_okapi(obj["bm25"])
+        return BM25ChunksIndex(matrix, store)
 
 
 def build_bm25_chunks_index(output_path: Path | None = None) -> Path:
     output_path = output_path or (settings.INDEX_DIR / "bm25_chunks.pkl")
 
-    with get_conn() as conn:
-        rows = conn.execute(
-            """
-            SELECT
-                c.id AS chunk_id,
-                c.document_id,
-                d.filename,
-                d.display_name,
-                d.doc_type,
-                d.mp_id,
-                c.section_id,
-                c.heading,
-                c.page_start,
-                c.page_end,
-                c.chunk_kind,
-                c.equation_score,
-                c.table_uid,
-                c.table_label,
-                c.table_row_index,
-                c.text
-            FROM chunks c
-            JOIN documents d ON d.id = c.document_id
-            ORDER BY c.document_id, c.chunk_index
-            """
-        ).fetchall()
-
-    corpus_tokens: list[list[str]] = []
-    meta: list[dict[str, Any]] = []
-
-    for r in rows:
-        text = r["text"] or ""
-        corpus_tokens.append(tokenize(text))
-        meta.append(
-            {
-                "chunk_id": int(r["chunk_id"]),
-                "document_id": int(r["document_id"]),
-                "filename": r["filename"],
-                "display_name": r["display_name"],
-                "doc_type": r["doc_type"],
-                "mp_id": r["mp_id"],
-                "section_id": r["section_id"],
-                "heading": r["heading"],
-                "page_start": int(r["page_start"]),
-                "page_end": int(r["page_end"]),
-                "chunk_kind": r["chunk_kind"],
-                "equation_score": float(r["equation_score"] or 0),
-
-                # ✅ store table metadata
-                "table_uid": r["table_uid"],
-                "table_label": r["table_label"],
-                "table_row_index": (int(r["table_row_index"]) if r["table_row_index"] is not None else None),
-
-                "text": text,
-            }
-        )
+    store = ChunkStore.from_records(load_chunk_records())
+    store.write()
 
-    bm25 = BM25Okapi(corpus_tokens)
-    idx = BM25ChunksIndex(bm25=bm25, meta=meta)
+    corpus_tokens = [tokenize(store.text(i)) for i in range(len(store))]
+    matrix = BM25TermMatrix.from_okapi(BM25Okapi(corpus_tokens))
+    idx = BM25ChunksIndex(matrix=matrix, store=store)
     idx.save(output_path)
     return output_path
 
 
-def bm25_chunks_search_filtered(
-    query: str,
+def bm25_chunks_scores(query: str, index: BM25ChunksIndex, tokens: list[str] | None = None) -> np.ndarray:
+    """
+    BM25 score for every chunk in corpus order. Compute once per query and
+    rank it as many times as needed with bm25_chunks_rank.
+    `tokens` skips re-tokenizing a query that was already analyzed.
+    """
+    return index.matrix.scores(tokenize(query) if tokens is None else tokens)
+
+
+def bm25_chunks_rank(
+    index: BM25ChunksIndex,
+    scores: np.ndarray,
     k: int = 8,
     scope: str = "all",
     mp_ids: list[str] | None = None,
-    index_path: Path | None = None,
     min_equation_score: float | None = None,
 ) -> list[BM25ChunkHit]:
-    index_path = index_path or (settings.INDEX_DIR / "bm25_chunks.pkl")
-    index = BM25ChunksIndex.load(index_path)
-
-    scores = index.bm25.get_scores(tokenize(query))
-    mp_ids_norm = [m.upper() for m in (mp_ids or [])]
-
-    def allowed(i: int) -> bool:
-        m = index.meta[i]
-        doc_type = (m.get("doc_type") or "").lower()
-        mp_id = (m.get("mp_id") or "")
-        eq_score = float(m.get("equation_score") or 0)
-        if min_equation_score is not None and eq_score < min_equation_score:
-            return False
-        if scope == "all":
-            return True
-        if scope == "standspec":
-            return doc_type == "standspec"
-        if scope == "scheduling":
-            return doc_type == "scheduling"
-        if scope == "mp":
-            return doc_type == "mp"
-        if scope == "mp_only":
-            return doc_type == "mp" and mp_id.upper() in mp_ids_norm
-        return True
-
-    ranked_all = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
-    ranked = [i for i in ranked_all if allowed(i) and scores[i] > 0][:k]
+    mask = index.columns.filter_mask(scope, mp_ids, min_equation_score)
+    positive = scores > 0
+    ranked = top_indices(scores, np.flatnonzero(positive if mask is None else (mask & positive)), k).tolist()
     if not ranked:
-        ranked = [i for i in ranked_all if allowed(i)][:k]
+        allowed = np.arange(len(scores)) if mask is None else np.flatnonzero(mask)
+        ranked = top_indices(scores, allowed, k).tolist()
 
     hits: list[BM25ChunkHit] = []
     for i in ranked:
-        m = index.meta[i]
+        m = index.store.record(i)
         text = m["text"] or ""
         snippet = text[:350].replace("\n", " ").strip() + ("…" if len(text) > 350 else "")
 
@@ -195,3 +231,37 @@ def bm25_chunks_search_filtered(
             )
         )
     return hits
+
+
+def bm25_chunks_search_filtered(
+    query: str,
+    k: int = 8,
+    scope: str = "all",
+    mp_ids: list[str] | None = None,
+    index_path: Path | None = None,
+    min_equation_score: float | None = None,
+    generation: IndexGeneration | None = None,
+) -> list[BM25ChunkHit]:
+    """
+    Lexical top-k chunks from the engine selected by CHUNKS_LEXICAL_ENGINE
+    (an explicit index_path always means the pickled index).
+    """
+    if index_path is None and settings.CHUNKS_LEXICAL_ENGINE == "fts5":
+        from app.services.fts_chunks import fts_chunks_search
+
+        return fts_chunks_search(query, k=k, scope=scope, mp_ids=mp_ids, min_equation_score=min_equation_score)
+
+    if index_path is not None:
+        index = BM25ChunksIndex.load(index_path)
+    else:
+        index = (generation or get_registry().current()).get("bm25_chunks")
+
+    scores = bm25_chunks_scores(query, index)
+    return bm25_chunks_rank(
+        index,
+        scores,
+        k=k,
+        scope=scope,
+        mp_ids=mp_ids,
+        min_equation_score=min_equation_score,
+    )
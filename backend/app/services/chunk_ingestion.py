@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import re
 import hashlib
+import sqlite3
+from contextlib import ExitStack, nullcontext
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Optional
 
-from app.services.db import get_conn
+from app.services.db import bulk_write, deferred_indexes, deferred_triggers
 from app.services.chunking import chunk_document_pages
 
 _MULTI_SPACE = re.compile(r"\S+\s{2,}\S+")
@@ -13,6 +15,8 @@ _HAS_NUMBER = re.compile(r"\d")
 _TABLE_TOKEN_RE = re.compile(r"\b(?:table|tab\.)\s*(\d{3}\.\d{2}(?:\.\d{2})?-\d+)\b", re.I)
 _TABLE_HEADER_RE = re.compile(r"^\s*(?:table|tab\.)\s+\d{3}\.\d{2}", re.I)
 _SECTION_HEADER_RE = re.compile(r"^\s*\d{3}\.\d{2}\b")
+# any table token, with or without a "Table" prefix: 701.03.15-1, 901.03-1
+_TABLE_TOKEN_ANY_RE = re.compile(r"(?<![\d.])(\d{3}\.\d{2}(?:\.\d{2})?-\d+)(?!\d)")
 _EQUATION_VAR_RE = re.compile(r"\b[A-Za-z]{1,4}\d{0,2}\b")
 _EQUATION_FUNC_RE = re.compile(r"\b(?:log|ln|sin|cos|tan)\b", re.I)
 _EQUATION_SYMBOLS = set("=≤≥≠±×÷∑√^_")
@@ -57,8 +61,7 @@ def equation_score(text: str) -> float:
             continue
 
         score = 0.0
-        symbols = sum(1 for ch in line if ch in _EQUATION_SYMBOLS)
-        if symbols:
+        if not _EQUATION_SYMBOLS.isdisjoint(line):
             score += 0.25
         if _EQUATION_OPS_RE.search(line):
             score += 0.2
@@ -68,11 +71,12 @@ def equation_score(text: str) -> float:
             score += 0.1
         if _FRACTION_RE.search(line):
             score += 0.1
-        digits = sum(ch.isdigit() for ch in line)
+        digits = sum(map(str.isdigit, line))
         if digits >= 4:
             score += 0.1
 
-        non_letters = sum(not ch.isalpha() and not ch.isspace() for ch in line)
+        # per-character counts via map() stay in C; this runs for every line of every chunk
+        non_letters = len(line) - sum(map(str.isalpha, line)) - sum(map(str.isspace, line))
         if len(line) > 0 and (non_letters / len(line)) > 0.3:
             score += 0.1
 
@@ -246,7 +250,7 @@ def link_table_uids_for_document(conn, document_id: int) -> int:
         (document_id,),
     ).fetchall()
 
-    updated = 0
+    updates: list[tuple[str, str, int]] = []
     for r in rows:
         text = r["text"] or ""
         m = _TABLE_TOKEN_RE.search(text)
@@ -257,186 +261,430 @@ def link_table_uids_for_document(conn, document_id: int) -> int:
         if not resolved:
             continue
         table_uid, table_label = resolved
-        conn.execute(
-            """
-            UPDATE chunks
-            SET table_uid = ?, table_label = ?
-            WHERE id = ?
-            """,
-            (table_uid, table_label, int(r["id"])),
+        updates.append((table_uid, table_label, int(r["id"])))
+
+    conn.executemany(
+        """
+        UPDATE chunks
+        SET table_uid = ?, table_label = ?
+        WHERE id = ?
+        """,
+        updates,
+    )
+    return len(updates)
+
+
+_INSERT_CHUNK_SQL = """
+    INSERT INTO chunks (
+        document_id, chunk_index, section_id, heading,
+        page_start, page_end, text,
+        is_table, is_definition, is_procedure,
+        chunk_kind, equation_score,
+        table_uid, table_row_index, table_label
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, 0, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_TABLE_SQL = """
+    INSERT OR REPLACE INTO tables (
+        table_uid, document_id, filename, display_name, doc_type, mp_id,
+        section_id, page_number, table_index_on_page, table_label, title,
+        row_count
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?)
+"""
+
+_INSERT_TABLE_ROW_SQL = """
+    INSERT INTO table_rows (table_uid, row_index, row_text)
+    VALUES (?, ?, ?)
+"""
+
+
+@dataclass
+class _DocumentRows:
+    chunks: list[tuple]
+    tables: list[tuple]
+    table_rows: list[tuple]
+
+
+def _document_rows(doc, pages: list[tuple[int, str]]) -> _DocumentRows:
+    """
+    Build the chunks / tables / table_rows insert parameters for one document,
+    in insertion order (chunk_index and row ids follow it).
+    """
+    doc_id = int(doc["id"])
+    filename = doc["filename"]
+    out = _DocumentRows(chunks=[], tables=[], table_rows=[])
+
+    # --- normal content chunks ---
+    chunks = chunk_document_pages(pages)
+    chunks_sorted = sorted(chunks, key=lambda c: (c.page_start, c.page_end))
+
+    # section context by page for table tagging
+    section_context_by_page: dict[int, tuple[str | None, str | None]] = {}
+    current_section_id = None
+    current_heading = None
+    chunk_idx = 0
+    for page_no, _text in pages:
+        while chunk_idx < len(chunks_sorted) and chunks_sorted[chunk_idx].page_start <= page_no:
+            ch = chunks_sorted[chunk_idx]
+            if ch.section_id:
+                current_section_id = ch.section_id
+                current_heading = ch.heading
+            chunk_idx += 1
+        section_context_by_page[page_no] = (current_section_id, current_heading)
+
+    for ch in chunks:
+        eq_score = equation_score(ch.text)
+        kind = "equation" if eq_score >= 0.45 else classify_chunk(ch.section_id, ch.text)
+        out.chunks.append(
+            (
+                doc_id,
+                len(out.chunks),
+                ch.section_id,
+                ch.heading,
+                ch.page_start,
+                ch.page_end,
+                ch.text,
+                0,
+                kind,
+                float(eq_score),
+                None,
+                None,
+                None,
+            )
         )
-        updated += 1
 
-    return updated
+    # --- structured tables + table-row chunks ---
+    for page_no, page_text in pages:
+        blocks = extract_table_blocks(page_text)
+        if not blocks:
+            continue
 
+        section_id, heading = section_context_by_page.get(page_no, (None, None))
+
+        for t_idx, blk in enumerate(blocks, start=1):
+            table_uid = _stable_table_uid(doc_id, filename, page_no, t_idx, blk.lines)
+            table_label = f"Table (p. {page_no}) #{t_idx}"
+            row_texts = [(r_idx, (line or "").strip()) for r_idx, line in enumerate(blk.lines)]
+            row_texts = [(r_idx, text) for r_idx, text in row_texts if text]
+
+            out.tables.append(
+                (
+                    table_uid,
+                    doc_id,
+                    filename,
+                    doc["display_name"],
+                    doc["doc_type"],
+                    doc["mp_id"],
+                    section_id,
+                    page_no,
+                    t_idx,
+                    table_label,
+                    len(row_texts),
+                )
+            )
 
-def rebuild_chunks() -> dict[str, int]:
+            # rows are also searchable chunks
+            for r_idx, row_text in row_texts:
+                out.table_rows.append((table_uid, r_idx, row_text))
+                out.chunks.append(
+                    (
+                        doc_id,
+                        len(out.chunks),
+                        section_id,
+                        heading,
+                        page_no,
+                        page_no,
+                        row_text,
+                        1,
+                        "table_row",
+                        0.0,
+                        table_uid,
+                        r_idx,
+                        table_label,
+                    )
+                )
+
+    return out
+
+
+_INSERT_SECTION_SQL = """
+    INSERT INTO sections (
+        document_id, section_id, parent_section_id, depth, ordinal, heading,
+        page_start, page_end, first_chunk_id, last_chunk_id, chunk_count
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def parent_section_id(section_id: str) -> str | None:
+    # "701.03.01" -> "701.03" -> "701" -> None
+    head, sep, _tail = section_id.rpartition(".")
+    return head if sep else None
+
+
+def _section_rows(conn, doc_ids: list[int]) -> list[tuple]:
+    """
+    sections insert parameters for `doc_ids`, aggregated from their content
+    chunks (the same rows the exact/prefix section lookups return).
+    """
+    if not doc_ids:
+        return []
+    rows = conn.execute(
+        f"""
+        SELECT id, document_id, section_id, heading, page_start, page_end
+        FROM chunks
+        WHERE document_id IN ({_placeholders(doc_ids)})
+          AND section_id IS NOT NULL
+          AND (chunk_kind IS NULL OR chunk_kind NOT IN ('toc', 'front_matter'))
+        ORDER BY document_id, id
+        """,
+        doc_ids,
+    ).fetchall()
+
+    # (document_id, section_id) -> [heading, page_start, page_end, first_id, last_id, count], first appearance order
+    agg: dict[tuple[int, str], list] = {}
+    for r in rows:
+        cid = int(r["id"])
+        key = (int(r["document_id"]), r["section_id"])
+        cur = agg.get(key)
+        if cur is None:
+            agg[key] = [r["heading"], int(r["page_start"]), int(r["page_end"]), cid, cid, 1]
+            continue
+        cur[1] = min(cur[1], int(r["page_start"]))
+        cur[2] = max(cur[2], int(r["page_end"]))
+        cur[4] = cid
+        cur[5] += 1
+
+    # Ancestors that own no chunks (e.g. "701" when only 701.xx chunks exist) still get a
+    # row, placed before their first subsection and spanning all of their subsections,
+    # so every parent_section_id points at a row of the same document.
+    ordered: dict[tuple[int, str], list] = {}
+    for (doc_id, sid), vals in agg.items():
+        ancestors: list[str] = []
+        parent = parent_section_id(sid)
+        while parent is not None:
+            ancestors.append(parent)
+            parent = parent_section_id(parent)
+        for anc in reversed(ancestors):
+            key = (doc_id, anc)
+            if key in agg:
+                continue
+            span = ordered.get(key)
+            if span is None:
+                ordered[key] = [None, vals[1], vals[2], vals[3], vals[4], 0]
+            else:
+                span[1] = min(span[1], vals[1])
+                span[2] = max(span[2], vals[2])
+                span[3] = min(span[3], vals[3])
+                span[4] = max(span[4], vals[4])
+        ordered[(doc_id, sid)] = vals
+
+    out: list[tuple] = []
+    ordinals: dict[int, int] = {}
+    for (doc_id, sid), vals in ordered.items():
+        ordinals[doc_id] = ordinals.get(doc_id, -1) + 1
+        out.append((doc_id, sid, parent_section_id(sid), sid.count("."), ordinals[doc_id], *vals))
+    return out
+
+
+def table_tokens_in(*texts: str | None) -> set[str]:
+    """
+    Whole table tokens (701.03.15-1, 901.03-1) in `texts`, en/em dashes
+    normalized like the ask-side table lookups.
+    """
+    out: set[str] = set()
+    for t in texts:
+        if t:
+            out.update(_TABLE_TOKEN_ANY_RE.findall(t.replace("–", "-").replace("—", "-")))
+    return out
+
+
+def _table_token_rows(conn, doc_ids: list[int]) -> list[tuple[str, str, int]]:
+    """
+    table_tokens insert parameters for the table-row chunks of `doc_ids`
+    (tokens in the row text, heading or table label).
+    """
+    if not doc_ids:
+        return []
+    rows = conn.execute(
+        f"""
+        SELECT id, table_uid, heading, text, table_label
+        FROM chunks
+        WHERE document_id IN ({_placeholders(doc_ids)})
+          AND chunk_kind = 'table_row'
+          AND table_uid IS NOT NULL
+        ORDER BY id
+        """,
+        doc_ids,
+    ).fetchall()
+    return [
+        (token, r["table_uid"], int(r["id"]))
+        for r in rows
+        for token in sorted(table_tokens_in(r["text"], r["heading"], r["table_label"]))
+    ]
+
+
+def _placeholders(values: list) -> str:
+    return ",".join("?" for _ in values)
+
+
+def _delete_document_chunks(conn, doc_ids: list[int]) -> list[int]:
+    """
+    Delete the chunks, tables and table_rows of `doc_ids`.
+    Returns the removed chunk ids.
+    """
+    if not doc_ids:
+        return []
+    ph = _placeholders(doc_ids)
+    removed = [
+        int(r[0]) for r in conn.execute(f"SELECT id FROM chunks WHERE document_id IN ({ph}) ORDER BY id", doc_ids)
+    ]
+    conn.execute(
+        f"DELETE FROM table_rows WHERE table_uid IN (SELECT table_uid FROM tables WHERE document_id IN ({ph}))",
+        doc_ids,
+    )
+    conn.execute(
+        f"DELETE FROM table_tokens WHERE chunk_id IN (SELECT id FROM chunks WHERE document_id IN ({ph}))",
+        doc_ids,
+    )
+    conn.execute(f"DELETE FROM tables WHERE document_id IN ({ph})", doc_ids)
+    conn.execute(f"DELETE FROM sections WHERE document_id IN ({ph})", doc_ids)
+    conn.execute(f"DELETE FROM chunks WHERE document_id IN ({ph})", doc_ids)
+    return removed
+
+
+def _has_chunks_fts(conn) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunks_fts'").fetchone()
+    return row is not None
+
+
+def chunk_builds_recorded(conn) -> bool:
+    """
+    True once rebuild_chunks has run on this database. Chunks written before the
+    chunk_builds ledger (migration 009) have no sections or table_tokens rows, so
+    lookups over those tables fall back to scanning chunks until it has.
+    """
+    try:
+        return conn.execute("SELECT 1 FROM chunk_builds LIMIT 1").fetchone() is not None
+    except sqlite3.OperationalError:
+        return False
+
+
+def rebuild_chunks(incremental: bool = False) -> dict[str, Any]:
     """
     Rebuild chunks from pages for all documents.
     Safe to run multiple times (it deletes and recreates).
-    Also rebuilds structured tables (tables + table_rows).
+    Also rebuilds structured tables (tables + table_rows), the section
+    hierarchy (sections) and the table-token lookup (table_tokens).
+
+    incremental=True only re-chunks documents whose file_hash differs from the
+    chunk_builds ledger (or that were never chunked), and drops the chunks of
+    documents that no longer exist; everything else is left in place. On a
+    database chunked before the ledger existed every document is re-chunked.
+    The result lists the chunk ids added and removed by this run.
+
+    Runs as one bulk transaction: readers keep the previous rows until it
+    commits, rows go in with executemany, and a full rebuild creates the
+    secondary indexes on the rebuilt tables once after the load. A full rebuild
+    also loads chunks without the chunks_fts triggers and rebuilds that index
+    once at the end.
     """
-    with get_conn() as conn:
-        # wipe dependent artifacts first
-        conn.execute("DELETE FROM table_rows")
-        conn.execute("DELETE FROM tables")
-        conn.execute("DELETE FROM chunks")
-        conn.commit()
-
-        docs = conn.execute("SELECT id, filename, display_name, doc_type, mp_id FROM documents ORDER BY id").fetchall()
-
-        total_chunks = 0
-        total_tables = 0
-        total_table_rows = 0
-
-        for d in docs:
-            doc_id = int(d["id"])
-            filename = d["filename"]
-            display_name = d["display_name"]
-            doc_type = d["doc_type"]
-            mp_id = d["mp_id"]
-
-            rows = conn.execute(
-                "SELECT page_number, text FROM pages WHERE document_id = ? ORDER BY page_number",
-                (doc_id,),
-            ).fetchall()
-
-            pages = [(int(r["page_number"]), r["text"] or "") for r in rows]
-
-            # --- normal content chunks ---
-            chunks = chunk_document_pages(pages)
-            chunks_sorted = sorted(chunks, key=lambda c: (c.page_start, c.page_end))
-
-            # section context by page for table tagging
-            section_context_by_page: dict[int, tuple[str | None, str | None]] = {}
-            current_section_id = None
-            current_heading = None
-            chunk_idx = 0
-            for page_no, _text in pages:
-                while chunk_idx < len(chunks_sorted) and chunks_sorted[chunk_idx].page_start <= page_no:
-                    ch = chunks_sorted[chunk_idx]
-                    if ch.section_id:
-                        current_section_id = ch.section_id
-                        current_heading = ch.heading
-                    chunk_idx += 1
-                section_context_by_page[page_no] = (current_section_id, current_heading)
-
-            chunk_index = 0
-
-            for ch in chunks:
-                eq_score = equation_score(ch.text)
-                kind = "equation" if eq_score >= 0.45 else classify_chunk(ch.section_id, ch.text)
-                conn.execute(
-                    """
-                    INSERT INTO chunks (
-                        document_id, chunk_index, section_id, heading,
-                        page_start, page_end, text,
-                        is_table, is_definition, is_procedure,
-                        chunk_kind, equation_score,
-                        table_uid, table_row_index, table_label
-                    )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, 0, 0, 0, ?, ?, NULL, NULL, NULL)
-                    """,
-                    (
-                        doc_id,
-                        chunk_index,
-                        ch.section_id,
-                        ch.heading,
-                        ch.page_start,
-                        ch.page_end,
-                        ch.text,
-                        kind,
-                        float(eq_score),
-                    ),
+    total_chunks = 0
+    total_tables = 0
+    total_table_rows = 0
+    rebuild_fts = False
+
+    with bulk_write() as conn, ExitStack() as fts_scope:
+        docs = conn.execute(
+            "SELECT id, filename, display_name, doc_type, mp_id, file_hash FROM documents ORDER BY id"
+        ).fetchall()
+
+        if incremental:
+            built = {
+                int(r["document_id"]): r["file_hash"]
+                for r in conn.execute("SELECT document_id, file_hash FROM chunk_builds")
+            }
+            targets = [d for d in docs if built.get(int(d["id"])) != d["file_hash"]]
+            orphaned = {
+                int(r[0])
+                for r in conn.execute(
+                    "SELECT DISTINCT document_id FROM chunks WHERE document_id NOT IN (SELECT id FROM documents)"
                 )
-                chunk_index += 1
-                total_chunks += 1
-
-            # --- structured tables + table-row chunks ---
-            for page_no, page_text in pages:
-                blocks = extract_table_blocks(page_text)
-                if not blocks:
-                    continue
-
-                section_id, heading = section_context_by_page.get(page_no, (None, None))
-
-                for t_idx, blk in enumerate(blocks, start=1):
-                    table_uid = _stable_table_uid(doc_id, filename, page_no, t_idx, blk.lines)
-                    table_label = f"Table (p. {page_no}) #{t_idx}"
-
-                    # insert table metadata
-                    conn.execute(
-                        """
-                        INSERT OR REPLACE INTO tables (
-                            table_uid, document_id, filename, display_name, doc_type, mp_id,
-                            section_id, page_number, table_index_on_page, table_label, title
-                        )
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)
-                        """,
-                        (
-                            table_uid,
-                            doc_id,
-                            filename,
-                            display_name,
-                            doc_type,
-                            mp_id,
-                            section_id,
-                            page_no,
-                            t_idx,
-                            table_label,
-                        ),
-                    )
-                    total_tables += 1
-
-                    # insert rows + also insert as searchable chunks
-                    for r_idx, row_text in enumerate(blk.lines):
-                        row_text = (row_text or "").strip()
-                        if not row_text:
-                            continue
-
-                        conn.execute(
-                            """
-                            INSERT INTO table_rows (table_uid, row_index, row_text)
-                            VALUES (?, ?, ?)
-                            """,
-                            (table_uid, r_idx, row_text),
-                        )
-                        total_table_rows += 1
-
-                        conn.execute(
-                            """
-                            INSERT INTO chunks (
-                                document_id, chunk_index, section_id, heading,
-                                page_start, page_end, text,
-                                is_table, is_definition, is_procedure,
-                                chunk_kind, equation_score,
-                                table_uid, table_row_index, table_label
-                            )
-                            VALUES (?, ?, ?, ?, ?, ?, ?, 1, 0, 0, 'table_row', 0, ?, ?, ?)
-                            """,
-                            (
-                                doc_id,
-                                chunk_index,
-                                section_id,
-                                heading,
-                                page_no,
-                                page_no,
-                                row_text,
-                                table_uid,
-                                r_idx,
-                                table_label,
-                            ),
-                        )
-                        chunk_index += 1
-                        total_chunks += 1
-
-            link_table_uids_for_document(conn, doc_id)
-
-        conn.commit()
+            }
+            gone = sorted((set(built) | orphaned) - {int(d["id"]) for d in docs})
+            removed_ids = _delete_document_chunks(conn, [int(d["id"]) for d in targets] + gone)
+            conn.executemany("DELETE FROM chunk_builds WHERE document_id = ?", [(doc_id,) for doc_id in gone])
+        else:
+            targets = docs
+            removed_ids = [int(r[0]) for r in conn.execute("SELECT id FROM chunks ORDER BY id")]
+            # chunks_fts is refilled in one pass below, not per row by its triggers
+            fts_scope.enter_context(deferred_triggers(conn, "chunks"))
+            rebuild_fts = _has_chunks_fts(conn)
+            if rebuild_fts:
+                conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('delete-all')")
+            # wipe dependent artifacts first
+            conn.execute("DELETE FROM table_rows")
+            conn.execute("DELETE FROM table_tokens")
+            conn.execute("DELETE FROM tables")
+            conn.execute("DELETE FROM sections")
+            conn.execute("DELETE FROM chunks")
+            conn.execute("DELETE FROM chunk_builds")
+
+        # A handful of changed documents is cheaper to insert under the live indexes.
+        load_scope = nullcontext() if incremental else deferred_indexes(conn, "chunks", "tables", "table_rows")
+        ledger: list[tuple[int, str, int]] = []
+        with load_scope:
+            for d in targets:
+                rows = conn.execute(
+                    "SELECT page_number, text FROM pages WHERE document_id = ? ORDER BY page_number",
+                    (int(d["id"]),),
+                ).fetchall()
+                pages = [(int(r["page_number"]), r["text"] or "") for r in rows]
+
+                doc_rows = _document_rows(d, pages)
+                conn.executemany(_INSERT_CHUNK_SQL, doc_rows.chunks)
+                conn.executemany(_INSERT_TABLE_SQL, doc_rows.tables)
+                conn.executemany(_INSERT_TABLE_ROW_SQL, doc_rows.table_rows)
+                total_chunks += len(doc_rows.chunks)
+                total_tables += len(doc_rows.tables)
+                total_table_rows += len(doc_rows.table_rows)
+                ledger.append((int(d["id"]), d["file_hash"], len(doc_rows.chunks)))
+
+        # Linking looks tables up by page and rows by uid, so it runs once the indexes are back.
+        for d in targets:
+            link_table_uids_for_document(conn, int(d["id"]))
+
+        target_ids = [doc_id for doc_id, _hash, _count in ledger]
+        added_ids: list[int] = []
+        if target_ids:
+            added_ids = [
+                int(r[0])
+                for r in conn.execute(
+                    f"SELECT id FROM chunks WHERE document_id IN ({_placeholders(target_ids)}) ORDER BY id",
+                    target_ids,
+                )
+            ]
+        section_rows = _section_rows(conn, target_ids)
+        conn.executemany(_INSERT_SECTION_SQL, section_rows)
+        token_rows = _table_token_rows(conn, target_ids)
+        conn.executemany("INSERT INTO table_tokens (token, table_uid, chunk_id) VALUES (?, ?, ?)", token_rows)
+        conn.executemany(
+            "INSERT OR REPLACE INTO chunk_builds (document_id, file_hash, chunk_count) VALUES (?, ?, ?)",
+            ledger,
+        )
+        if rebuild_fts:
+            conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild')")
 
     return {
         "documents": len(docs),
+        "rebuilt_documents": len(targets),
         "chunks": total_chunks,
         "tables": total_tables,
         "table_rows": total_table_rows,
+        "sections": len(section_rows),
+        "table_tokens": len(token_rows),
+        "added_chunk_ids": added_ids,
+        "removed_chunk_ids": removed_ids,
     }
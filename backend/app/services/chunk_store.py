@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.db import get_conn
+from app.services.index_registry import (
+    IndexGeneration,
+    _file_signature,
+    atomic_output,
+    get_registry,
+    load_array,
+    save_array,
+)
+
+# String columns are dictionary-encoded into one shared string table; -1 means NULL.
+_STRING_COLUMNS = (
+    "filename",
+    "display_name",
+    "doc_type",
+    "mp_id",
+    "section_id",
+    "heading",
+    "chunk_kind",
+    "table_uid",
+    "table_label",
+)
+_INT_COLUMNS = {
+    "chunk_id": np.int64,
+    "document_id": np.int64,
+    "page_start": np.int32,
+    "page_end": np.int32,
+    "table_row_index": np.int32,  # -1 means NULL
+}
+
+_STRINGS_FILE = "strings.json"
+_TEXT_FILE = "text.bin"
+# One flat .npy per column so each can be memory-mapped.
+_ARRAY_FILES = (*_STRING_COLUMNS, *_INT_COLUMNS, "equation_score", "text_offsets")
+
+
+def chunk_store_dir() -> Path:
+    return settings.INDEX_DIR / "chunk_store"
+
+
+def chunk_store_paths(directory: Path | None = None) -> list[Path]:
+    directory = directory or chunk_store_dir()
+    return [directory / f"{name}.npy" for name in _ARRAY_FILES] + [directory / _TEXT_FILE, directory / _STRINGS_FILE]
+
+
+def load_chunk_records() -> list[dict[str, Any]]:
+    """
+    Chunk rows in index order (document_id, chunk_index), shared by every chunk index builder.
+    """
+    with get_conn(readonly=True) as conn:
+        rows = conn.execute(
+            """
+            SELECT
+                c.id AS chunk_id,
+                c.document_id,
+                d.filename,
+                d.display_name,
+                d.doc_type,
+                d.mp_id,
+                c.section_id,
+                c.heading,
+                c.page_start,
+                c.page_end,
+                c.chunk_kind,
+                c.equation_score,
+                c.table_uid,
+                c.table_label,
+                c.table_row_index,
+                c.text
+            FROM chunks c
+            JOIN documents d ON d.id = c.document_id
+            ORDER BY c.document_id, c.chunk_index
+            """
+        ).fetchall()
+
+    return [
+        {
+            "chunk_id": int(r["chunk_id"]),
+            "document_id": int(r["document_id"]),
+            "filename": r["filename"],
+            "display_name": r["display_name"],
+            "doc_type": r["doc_type"],
+            "mp_id": r["mp_id"],
+            "section_id": r["section_id"],
+            "heading": r["heading"],
+            "page_start": int(r["page_start"]),
+            "page_end": int(r["page_end"]),
+            "chunk_kind": r["chunk_kind"],
+            "equation_score": float(r["equation_score"] or 0),
+            "table_uid": r["table_uid"],
+            "table_label": r["table_label"],
+            "table_row_index": (int(r["table_row_index"]) if r["table_row_index"] is not None else None),
+            "text": r["text"] or "",
+        }
+        for r in rows
+    ]
+
+
+class ChunkStore:
+    """
+    Columnar chunk metadata shared by the BM25 and FAISS chunk indexes.
+
+    - ints/floats are NumPy arrays
+    - filenames, headings, ids etc. are codes into one interned string table
+    - chunk text is a single UTF-8 blob (memory-mapped when opened from disk)
+      addressed by an offsets array
+
+    Row i is the i-th chunk of both chunk indexes; `fingerprint` identifies the
+    exact contents so index artifacts can check they were built against it.
+    """
+
+    def __init__(
+        self,
+        columns: dict[str, np.ndarray],
+        strings: list[str],
+        text_offsets: np.ndarray,
+        text_blob: np.ndarray,
+        fingerprint: str,
+    ):
+        self.columns = columns
+        self.strings = strings
+        self.text_offsets = text_offsets
+        self.text_blob = text_blob
+        self.fingerprint = fingerprint
+        self.chunk_ids: np.ndarray = columns["chunk_id"]
+        self.equation_scores: np.ndarray = columns["equation_score"]
+        self._row_by_chunk_id: Optional[dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    # ---- build ----
+
+    @staticmethod
+    def from_records(records: list[dict[str, Any]]) -> "ChunkStore":
+        interned: dict[str, int] = {}
+
+        def code(v: Optional[str]) -> int:
+            return -1 if v is None else interned.setdefault(v, len(interned))
+
+        columns: dict[str, np.ndarray] = {}
+        for name in _STRING_COLUMNS:
+            columns[name] = np.array([code(r.get(name)) for r in records], dtype=np.int32)
+        for name, dtype in _INT_COLUMNS.items():
+            columns[name] = np.array(
+                [-1 if r.get(name) is None else int(r[name]) for r in records], dtype=dtype
+            )
+        columns["equation_score"] = np.array(
+            [float(r.get("equation_score") or 0) for r in records], dtype=np.float64
+        )
+
+        encoded = [(r.get("text") or "").encode("utf-8") for r in records]
+        text_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=text_offsets[1:])
+        text_blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        strings = list(interned)
+        return ChunkStore(columns, strings, text_offsets, text_blob, _fingerprint(columns, strings, text_offsets, text_blob))
+
+    def write(self, directory: Path | None = None) -> None:
+        """
+        Write the store unless the same contents are already on disk, so the
+        second chunk index builder in a rebuild does not rewrite it.
+        """
+        directory = directory or chunk_store_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        if _read_fingerprint(directory) == self.fingerprint and all(p.exists() for p in chunk_store_paths(directory)):
+            return
+
+        arrays = {**self.columns, "text_offsets": self.text_offsets}
+        for name in _ARRAY_FILES:
+            save_array(directory / f"{name}.npy", arrays[name])
+        with atomic_output(directory / _TEXT_FILE) as tmp:
+            tmp.write_bytes(self.text_blob.tobytes())
+        # Written last: it names the fingerprint the files above belong to.
+        with atomic_output(directory / _STRINGS_FILE) as tmp:
+            tmp.write_text(
+                json.dumps(
+                    {"fingerprint": self.fingerprint, "rows": len(self), "strings": self.strings},
+                    ensure_ascii=False,
+                ),
+                encoding="utf-8",
+            )
+
+    # ---- load ----
+
+    @staticmethod
+    def open(directory: Path | None = None) -> "ChunkStore":
+        """
+        Columns and text are memory-mapped (INDEX_MMAP), so opening the store
+        does not copy the corpus into the process heap.
+        """
+        directory = directory or chunk_store_dir()
+        doc = json.loads((directory / _STRINGS_FILE).read_text(encoding="utf-8"))
+        arrays = {name: load_array(directory / f"{name}.npy") for name in _ARRAY_FILES}
+        text_offsets = arrays.pop("text_offsets")
+        if any(len(a) != doc["rows"] for a in arrays.values()) or len(text_offsets) != doc["rows"] + 1:
+            raise RuntimeError(f"chunk store files are from different builds: {directory}")
+
+        text_path = directory / _TEXT_FILE
+        if text_path.stat().st_size == 0:
+            text_blob = np.zeros(0, dtype=np.uint8)
+        elif settings.INDEX_MMAP:
+            text_blob = np.memmap(text_path, dtype=np.uint8, mode="r")
+        else:
+            text_blob = np.fromfile(text_path, dtype=np.uint8)
+        if len(text_blob) != int(text_offsets[-1]):
+            raise RuntimeError(f"chunk store text blob does not match its offsets: {text_path}")
+
+        return ChunkStore(arrays, doc["strings"], text_offsets, text_blob, doc["fingerprint"])
+
+    # ---- read ----
+
+    def string(self, name: str, i: int) -> Optional[str]:
+        c = int(self.columns[name][i])
+        return self.strings[c] if c >= 0 else None
+
+    def string_column(self, name: str) -> list[Optional[str]]:
+        strings = self.strings
+        return [strings[c] if c >= 0 else None for c in self.columns[name].tolist()]
+
+    def text(self, i: int) -> str:
+        lo, hi = int(self.text_offsets[i]), int(self.text_offsets[i + 1])
+        return self.text_blob[lo:hi].tobytes().decode("utf-8")
+
+    def record(self, i: int) -> dict[str, Any]:
+        """
+        One chunk as the dict shape the chunk indexes used to pickle.
+        """
+        row_index = int(self.columns["table_row_index"][i])
+        out: dict[str, Any] = {name: self.string(name, i) for name in _STRING_COLUMNS}
+        out.update(
+            chunk_id=int(self.chunk_ids[i]),
+            document_id=int(self.columns["document_id"][i]),
+            page_start=int(self.columns["page_start"][i]),
+            page_end=int(self.columns["page_end"][i]),
+            table_row_index=(row_index if row_index >= 0 else None),
+            equation_score=float(self.equation_scores[i]),
+            text=self.text(i),
+        )
+        return out
+
+    def _rows(self) -> dict[int, int]:
+        if self._row_by_chunk_id is None:
+            self._row_by_chunk_id = {cid: i for i, cid in enumerate(self.chunk_ids.tolist())}
+        return self._row_by_chunk_id
+
+    def __contains__(self, chunk_id: object) -> bool:
+        return chunk_id in self._rows()
+
+    def texts_for(self, chunk_ids: Iterable[int]) -> dict[int, str]:
+        rows = self._rows()
+        return {cid: self.text(rows[cid]) for cid in chunk_ids if cid in rows}
+
+
+def _fingerprint(
+    columns: dict[str, np.ndarray],
+    strings: list[str],
+    text_offsets: np.ndarray,
+    text_blob: np.ndarray,
+) -> str:
+    h = hashlib.sha1()
+    for name in sorted(columns):
+        h.update(name.encode("utf-8"))
+        h.update(np.ascontiguousarray(columns[name]).tobytes())
+    h.update(json.dumps(strings, ensure_ascii=False).encode("utf-8"))
+    h.update(text_offsets.tobytes())
+    h.update(text_blob.tobytes())
+    return h.hexdigest()
+
+
+def _read_fingerprint(directory: Path) -> Optional[str]:
+    try:
+        return json.loads((directory / _STRINGS_FILE).read_text(encoding="utf-8")).get("fingerprint")
+    except (OSError, ValueError):
+        return None
+
+
+_open_lock = threading.Lock()
+_opened: dict[Path, tuple[Any, ChunkStore]] = {}
+
+
+def open_chunk_store(directory: Path | None = None) -> ChunkStore:
+    """
+    Open the on-disk store, reusing the instance already open for unchanged
+    files so both chunk indexes of a generation share one copy.
+    """
+    directory = directory or chunk_store_dir()
+    signature = _file_signature(chunk_store_paths(directory))
+    with _open_lock:
+        cached = _opened.get(directory)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        store = ChunkStore.open(directory)
+        _opened[directory] = (signature, store)
+        return store
+
+
+def chunk_texts(chunk_ids: Iterable[int], generation: IndexGeneration | None = None) -> dict[int, str]:
+    """
+    Full chunk text from the chunk store of the active index generation.
+    Ids the loaded store does not know are simply absent from the result.
+    """
+    gen = generation or get_registry().current()
+    for name in ("bm25_chunks", "faiss_chunks"):
+        try:
+            return gen.get(name).store.texts_for(chunk_ids)
+        except RuntimeError:
+            continue
+    return {}
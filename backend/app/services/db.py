@@ -1,19 +1,237 @@
+import logging
+import os
+import queue
 import sqlite3
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, Iterator
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+
 def _ensure_parent_dir(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
-@contextmanager
-def get_conn():
+
+def _connect(readonly: bool) -> sqlite3.Connection:
     _ensure_parent_dir(settings.DB_PATH)
-    conn = sqlite3.connect(settings.DB_PATH)
+    # Pooled connections move between threads, but only one thread uses a connection at a time.
+    conn = sqlite3.connect(settings.DB_PATH, check_same_thread=False, timeout=settings.DB_BUSY_TIMEOUT_MS / 1000.0)
     conn.row_factory = sqlite3.Row
+    if settings.DB_WAL:
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.DatabaseError:
+            logger.warning("could not enable WAL; path=%s", settings.DB_PATH)
+    conn.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE_BYTES)}")
+    conn.execute(f"PRAGMA cache_size={-int(settings.DB_CACHE_SIZE_KIB)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    if readonly:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+class _ConnectionPool:
+    """
+    Bounded LIFO pool of SQLite connections (LIFO keeps the hottest page cache in use).
+    Connections are opened lazily up to `size`; callers past that wait for a release.
+    """
+
+    def __init__(self, readonly: bool, size: int) -> None:
+        self.readonly = readonly
+        self.size = max(1, size)
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self.acquires = 0
+        self.waits = 0
+        self.timeouts = 0
+        self._acquire_ms: deque[float] = deque(maxlen=1024)
+
+    def acquire(self) -> sqlite3.Connection:
+        t0 = time.perf_counter()
+        waited = False
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._open < self.size
+                if create:
+                    self._open += 1
+            if create:
+                try:
+                    conn = _connect(self.readonly)
+                except Exception:
+                    with self._lock:
+                        self._open -= 1
+                    raise
+            else:
+                waited = True
+                try:
+                    conn = self._idle.get(timeout=settings.DB_POOL_TIMEOUT_SECONDS)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise TimeoutError(f"No SQLite connection available within {settings.DB_POOL_TIMEOUT_SECONDS}s")
+
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self.acquires += 1
+            self.waits += int(waited)
+            self._acquire_ms.append(elapsed_ms)
+        return conn
+
+    def release(self, conn: sqlite3.Connection, *, broken: bool = False) -> None:
+        if broken:
+            with self._lock:
+                self._open -= 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+        self._idle.put(conn)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._acquire_ms)
+            out: dict[str, Any] = {
+                "size": self.size,
+                "open": self._open,
+                "idle": self._idle.qsize(),
+                "acquires": self.acquires,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+            }
+        if samples:
+            out["acquire_ms"] = {
+                "avg": round(sum(samples) / len(samples), 3),
+                "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+                "max": round(samples[-1], 3),
+            }
+        return out
+
+
+_pools: dict[tuple[int, str, bool], _ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(readonly: bool) -> _ConnectionPool:
+    # Keyed by pid so forked workers never share a parent's connections.
+    key = (os.getpid(), str(settings.DB_PATH), readonly)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                size = settings.DB_READ_POOL_SIZE if readonly else settings.DB_WRITE_POOL_SIZE
+                pool = _pools[key] = _ConnectionPool(readonly, size)
+    return pool
+
+
+@contextmanager
+def get_conn(readonly: bool = False) -> Iterator[sqlite3.Connection]:
+    """
+    Borrow a pooled connection.
+    readonly=True uses query_only connections and never commits; otherwise the
+    transaction commits on success and rolls back on error.
+    """
+    pool = _pool(readonly)
+    conn = pool.acquire()
+    broken = False
     try:
         yield conn
-        conn.commit()
+        if not readonly:
+            conn.commit()
+    except BaseException:
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            broken = True
+        raise
     finally:
-        conn.close()
\ No newline at end of file
+        if not broken and conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                broken = True
+        pool.release(conn, broken=broken)
+
+
+def db_pool_stats() -> dict[str, Any]:
+    pid = os.getpid()
+    path = str(settings.DB_PATH)
+    return {
+        ("read" if readonly else "write"): pool.stats()
+        for (p, db, readonly), pool in list(_pools.items())
+        if p == pid and db == path
+    }
+
+
+@contextmanager
+def bulk_write() -> Iterator[sqlite3.Connection]:
+    """
+    Write connection for bulk loads: everything runs in one explicit transaction
+    with synchronous=OFF. The journal mode is left alone so WAL readers keep
+    serving the previous snapshot until the load commits.
+    """
+    with get_conn() as conn:
+        previous = int(conn.execute("PRAGMA synchronous").fetchone()[0])
+        conn.execute("PRAGMA synchronous=OFF")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute(f"PRAGMA synchronous={previous}")
+
+
+@contextmanager
+def deferred_indexes(conn: sqlite3.Connection, *tables: str) -> Iterator[None]:
+    """
+    Drop the secondary indexes on `tables` and recreate them from their saved
+    definitions when the block exits, so a bulk load builds each index once
+    instead of updating it per row. Use inside a transaction: on error the
+    rollback restores the dropped indexes.
+    """
+    placeholders = ",".join("?" for _ in tables)
+    indexes = conn.execute(
+        f"""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+        """,
+        tables,
+    ).fetchall()
+    for name, _sql in indexes:
+        conn.execute(f'DROP INDEX "{name}"')
+    yield
+    for _name, sql in indexes:
+        conn.execute(sql)
+
+
+@contextmanager
+def deferred_triggers(conn: sqlite3.Connection, *tables: str) -> Iterator[None]:
+    """
+    Drop the triggers on `tables` for the block and recreate them afterwards,
+    for bulk loads that bring the trigger targets up to date in one pass
+    instead. Use inside a transaction, like deferred_indexes.
+    """
+    placeholders = ",".join("?" for _ in tables)
+    triggers = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ({placeholders})",
+        tables,
+    ).fetchall()
+    for name, _sql in triggers:
+        conn.execute(f'DROP TRIGGER "{name}"')
+    yield
+    for _name, sql in triggers:
+        conn.execute(sql)
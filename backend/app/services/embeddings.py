@@ -1,5 +1,9 @@
 from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
 from functools import lru_cache
+from typing import Any, Optional
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from app.core.config import settings
@@ -8,7 +12,108 @@ from app.core.config import settings
 def get_model() -> SentenceTransformer:
     return SentenceTransformer(settings.EMBED_MODEL_NAME)
 
-def embed_texts(texts: list[str]) -> np.ndarray:
+
+class _EmbeddingCache:
+    """
+    Bounded, thread-safe LRU with TTL for query embeddings.
+    Keyed on (model name, whitespace-normalized text).
+    """
+
+    def __init__(self, maxsize: int, ttl_s: float) -> None:
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data: OrderedDict[tuple[str, str], tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, str]) -> Optional[np.ndarray]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (self.ttl_s <= 0 or now - item[0] < self.ttl_s):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple[str, str], vec: np.ndarray) -> None:
+        vec.flags.writeable = False
+        with self._lock:
+            self._data[key] = (time.monotonic(), vec)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
+
+
+_cache = _EmbeddingCache(settings.EMBED_CACHE_SIZE, settings.EMBED_CACHE_TTL_SECONDS)
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def _encode(texts: list[str]) -> np.ndarray:
     model = get_model()
     vecs = model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
     return np.asarray(vecs, dtype="float32")
+
+
+def embed_texts(texts: list[str], *, use_cache: bool = True) -> np.ndarray:
+    """
+    Encode texts to normalized float32 vectors (N, D).
+    Query-time callers hit the LRU cache; index builders pass use_cache=False
+    so the corpus does not evict hot queries.
+    """
+    if not use_cache or _cache.maxsize <= 0 or not texts:
+        return _encode(texts)
+
+    model_name = settings.EMBED_MODEL_NAME
+    norm = [_normalize(t) for t in texts]
+    found: dict[str, np.ndarray] = {}
+    missing: dict[str, None] = {}
+    for t in norm:
+        if t in found or t in missing:
+            continue
+        vec = _cache.get((model_name, t))
+        if vec is None:
+            missing[t] = None
+        else:
+            found[t] = vec
+
+    if missing:
+        new_vecs = _encode(list(missing))
+        for t, vec in zip(missing, new_vecs):
+            vec = vec.copy()
+            _cache.put((model_name, t), vec)
+            found[t] = vec
+
+    return np.stack([found[t] for t in norm]).astype("float32", copy=False)
+
+
+def embedding_cache_stats() -> dict[str, Any]:
+    return _cache.stats()
+
+
+def clear_embedding_cache() -> None:
+    _cache.clear()
@@ -9,8 +9,12 @@ import faiss
 import numpy as np
 
 from app.core.config import settings
-from app.services.db import get_conn
 from app.services.embeddings import embed_texts
+from app.services.chunk_store import ChunkStore, load_chunk_records, open_chunk_store
+from app.services.index_registry import IndexGeneration, atomic_output, get_registry
+from app.services.metadata_columns import MetadataColumns, top_indices
+from app.services.vector_index import build_vector_index, read_vector_index, write_vector_index
+from app.services.vector_index import search as vector_search
 
 
 @dataclass
@@ -43,130 +47,105 @@ def build_faiss_chunks_index(
     meta_path = meta_path or (settings.INDEX_DIR / "faiss_chunks_meta.pkl")
     index_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with get_conn() as conn:
-        rows = conn.execute(
-            """
-            SELECT
-                c.id AS chunk_id,
-                c.document_id,
-                d.filename,
-                d.display_name,
-                d.doc_type,
-                d.mp_id,
-                c.section_id,
-                c.heading,
-                c.page_start,
-                c.page_end,
-                c.chunk_kind,
-                c.equation_score,
-                c.table_uid,
-                c.table_label,
-                c.table_row_index,
-                c.text
-            FROM chunks c
-            JOIN documents d ON d.id = c.document_id
-            ORDER BY c.document_id, c.chunk_index
-            """
-        ).fetchall()
-
-    texts = [(r["text"] or "").strip() for r in rows]
-    vecs = embed_texts(texts)  # normalized float32
-
-    dim = vecs.shape[1]
-    index = faiss.IndexFlatIP(dim)
-    index.add(vecs)
-
-    meta: list[dict[str, Any]] = []
-    for r, txt in zip(rows, texts):
-        meta.append(
-            {
-                "chunk_id": int(r["chunk_id"]),
-                "document_id": int(r["document_id"]),
-                "filename": r["filename"],
-                "display_name": r["display_name"],
-                "doc_type": r["doc_type"],
-                "mp_id": r["mp_id"],
-                "section_id": r["section_id"],
-                "heading": r["heading"],
-                "page_start": int(r["page_start"]),
-                "page_end": int(r["page_end"]),
-                "chunk_kind": r["chunk_kind"],
-                "equation_score": float(r["equation_score"] or 0),
-
-                # ✅ store table metadata
-                "table_uid": r["table_uid"],
-                "table_label": r["table_label"],
-                "table_row_index": (int(r["table_row_index"]) if r["table_row_index"] is not None else None),
-
-                "text": txt,
-            }
-        )
+    store = ChunkStore.from_records(load_chunk_records())
+    store.write()
+
+    texts = [store.text(i).strip() for i in range(len(store))]
+    vecs = embed_texts(texts, use_cache=False)  # normalized float32
+
+    index, params = build_vector_index(vecs)
 
-    faiss.write_index(index, str(index_path))
-    with meta_path.open("wb") as f:
-        pickle.dump(meta, f)
+    # Chunk metadata/text live in the shared chunk store; record which one the vectors belong to.
+    write_vector_index(index, params, index_path)
+    with atomic_output(meta_path) as tmp, tmp.open("wb") as f:
+        pickle.dump({"store_fingerprint": store.fingerprint}, f)
 
     return index_path, meta_path
 
 
-def _load(index_path: Path, meta_path: Path) -> tuple[faiss.Index, list[dict[str, Any]]]:
-    index = faiss.read_index(str(index_path))
+class FaissChunksIndex:
+    def __init__(self, index: faiss.Index, store: ChunkStore, params: dict[str, Any] | None = None):
+        self.index = index
+        self.store = store
+        self.params = params or {"index_type": "flat"}
+        self.columns = MetadataColumns.from_store(store)
+        # Flat indexes expose their vectors; scoring them directly yields the full
+        # similarity vector in one BLAS call (no copy: a view over FAISS memory).
+        self._xb: Optional[np.ndarray] = None
+        if isinstance(index, faiss.IndexFlat) and index.ntotal > 0:
+            self._xb = faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d).reshape(index.ntotal, index.d)
+
+    @property
+    def exhaustive(self) -> bool:
+        """
+        True when faiss_chunks_scores covers every chunk, so one score vector
+        can be ranked under any filter.
+        """
+        return self._xb is not None
+
+
+def _load(index_path: Path, meta_path: Path) -> FaissChunksIndex:
+    index, params = read_vector_index(index_path)
     with meta_path.open("rb") as f:
         meta = pickle.load(f)
-    return index, meta
+    if isinstance(meta, list):
+        # Artifacts built before the chunk store pickled metadata and text inline.
+        store = ChunkStore.from_records(meta)
+    else:
+        store = open_chunk_store()
+        if store.fingerprint != meta["store_fingerprint"]:
+            raise RuntimeError(f"{index_path.name} was built against a different chunk store")
+    return FaissChunksIndex(index, store, params)
 
 
-def faiss_chunks_search_filtered(
+def faiss_chunks_scores(
     query: str,
+    index: FaissChunksIndex,
+    mask: np.ndarray | None = None,
+    k: int | None = None,
+    query_vec: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Dense similarity per chunk in corpus order (-inf where not scored).
+
+    Flat indexes score every chunk (mask/k unused; faiss_chunks_rank applies
+    filters), so the result can be ranked as many times as needed. Other index
+    types search only rows inside `mask` and return the top `k` of them.
+    `query_vec` is a precomputed (1, D) query embedding.
+    """
+    n = len(index.store)
+    qv = embed_texts([query]) if query_vec is None else query_vec
+    if index.exhaustive:
+        return index._xb @ qv[0]
+
+    scores = np.full(n, -np.inf, dtype=np.float32)
+    D, I = vector_search(index.index, qv, k or n, mask)
+    scores[I] = D
+    return scores
+
+
+def faiss_chunks_rank(
+    index: FaissChunksIndex,
+    scores: np.ndarray,
     k: int = 8,
     scope: str = "all",
     mp_ids: list[str] | None = None,
-    index_path: Path | None = None,
-    meta_path: Path | None = None,
     min_equation_score: float | None = None,
 ) -> list[FaissChunkHit]:
-    index_path = index_path or (settings.INDEX_DIR / "faiss_chunks.index")
-    meta_path = meta_path or (settings.INDEX_DIR / "faiss_chunks_meta.pkl")
-
-    index, meta = _load(index_path, meta_path)
-
-    mp_ids_norm = [m.upper() for m in (mp_ids or [])]
-
-    def allowed(m: dict[str, Any]) -> bool:
-        doc_type = (m.get("doc_type") or "").lower()
-        mp_id = (m.get("mp_id") or "")
-        eq_score = float(m.get("equation_score") or 0)
-        if min_equation_score is not None and eq_score < min_equation_score:
-            return False
-        if scope == "all":
-            return True
-        if scope == "standspec":
-            return doc_type == "standspec"
-        if scope == "scheduling":
-            return doc_type == "scheduling"
-        if scope == "mp":
-            return doc_type == "mp"
-        if scope == "mp_only":
-            return doc_type == "mp" and mp_id.upper() in mp_ids_norm
-        return True
-
-    qv = embed_texts([query])
-    D, I = index.search(qv, min(len(meta), max(k * 8, 50)))
+    mask = index.columns.filter_mask(scope, mp_ids, min_equation_score)
+    scored = np.isfinite(scores)
+    ranked = top_indices(scores, np.flatnonzero(scored if mask is None else (mask & scored)), k).tolist()
 
     hits: list[FaissChunkHit] = []
-    for score, idx in zip(D[0].tolist(), I[0].tolist()):
-        if idx < 0:
-            continue
-        m = meta[idx]
-        if not allowed(m):
-            continue
-
-        txt = m["text"] or ""
+    for idx in ranked:
+        m = index.store.record(idx)
+
+        txt = (m["text"] or "").strip()
         snippet = txt[:350].replace("\n", " ").strip() + ("…" if len(txt) > 350 else "")
 
         hits.append(
             FaissChunkHit(
-                score=float(score),
+                score=float(scores[idx]),
                 chunk_id=int(m["chunk_id"]),
                 document_id=int(m["document_id"]),
                 filename=m["filename"],
@@ -186,7 +165,35 @@ def faiss_chunks_search_filtered(
                 table_row_index=m.get("table_row_index"),
             )
         )
-        if len(hits) >= k:
-            break
 
     return hits
+
+
+def faiss_chunks_search_filtered(
+    query: str,
+    k: int = 8,
+    scope: str = "all",
+    mp_ids: list[str] | None = None,
+    index_path: Path | None = None,
+    meta_path: Path | None = None,
+    min_equation_score: float | None = None,
+    generation: IndexGeneration | None = None,
+) -> list[FaissChunkHit]:
+    if index_path is not None or meta_path is not None:
+        index = _load(
+            index_path or (settings.INDEX_DIR / "faiss_chunks.index"),
+            meta_path or (settings.INDEX_DIR / "faiss_chunks_meta.pkl"),
+        )
+    else:
+        index = (generation or get_registry().current()).get("faiss_chunks")
+
+    mask = index.columns.filter_mask(scope, mp_ids, min_equation_score)
+    scores = faiss_chunks_scores(query, index, mask=mask, k=k)
+    return faiss_chunks_rank(
+        index,
+        scores,
+        k=k,
+        scope=scope,
+        mp_ids=mp_ids,
+        min_equation_score=min_equation_score,
+    )
@@ -9,9 +9,13 @@ import faiss
 import numpy as np
 
 from app.core.config import settings
+from app.services.bm25 import PageFeatures, page_features, page_snippet
 from app.services.db import get_conn
 from app.services.embeddings import embed_texts
-from app.services.rerank import toc_entry_count
+from app.services.index_registry import IndexGeneration, atomic_output, get_registry
+from app.services.metadata_columns import MetadataColumns
+from app.services.vector_index import build_vector_index, read_vector_index, write_vector_index
+from app.services.vector_index import search as vector_search
 
 
 @dataclass
@@ -25,6 +29,7 @@ class FaissHit:
     page_number: int
     snippet: str
     toc_entries: int = 0
+    snippet_toc_entries: int = 0
 
 
 def build_faiss_index(index_path: Path | None = None, meta_path: Path | None = None) -> tuple[Path, Path]:
@@ -32,7 +37,7 @@ def build_faiss_index(index_path: Path | None = None, meta_path: Path | None = N
     meta_path = meta_path or settings.FAISS_META_PATH
     index_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         rows = conn.execute("""
             SELECT
                 p.document_id,
@@ -48,12 +53,10 @@ def build_faiss_index(index_path: Path | None = None, meta_path: Path | None = N
         """).fetchall()
 
     texts = [(r["text"] or "").strip() for r in rows]
-    vecs = embed_texts(texts)  # (N, D), normalized float32
+    vecs = embed_texts(texts, use_cache=False)  # (N, D), normalized float32
 
     # Inner product == cosine sim if normalized
-    dim = vecs.shape[1]
-    index = faiss.IndexFlatIP(dim)
-    index.add(vecs)
+    index, params = build_vector_index(vecs)
 
     meta: list[dict[str, Any]] = []
     for r, txt in zip(rows, texts):
@@ -65,20 +68,30 @@ def build_faiss_index(index_path: Path | None = None, meta_path: Path | None = N
             "mp_id": r["mp_id"],
             "page_number": int(r["page_number"]),
             "text": txt,
+            **page_features(txt),
         })
 
-    faiss.write_index(index, str(index_path))
-    with meta_path.open("wb") as f:
+    write_vector_index(index, params, index_path)
+    with atomic_output(meta_path) as tmp, tmp.open("wb") as f:
         pickle.dump(meta, f)
 
     return index_path, meta_path
 
 
-def _load_index() -> tuple[faiss.Index, list[dict[str, Any]]]:
-    index = faiss.read_index(str(settings.FAISS_INDEX_PATH))
+class FaissPagesIndex:
+    def __init__(self, index: faiss.Index, meta: list[dict[str, Any]], params: dict[str, Any] | None = None):
+        self.index = index
+        self.meta = meta
+        self.params = params or {"index_type": "flat"}
+        self.columns = MetadataColumns.from_meta(meta)
+        self.features = PageFeatures.from_meta(meta)
+
+
+def _load_index() -> FaissPagesIndex:
+    index, params = read_vector_index(settings.FAISS_INDEX_PATH)
     with settings.FAISS_META_PATH.open("rb") as f:
         meta = pickle.load(f)
-    return index, meta
+    return FaissPagesIndex(index, meta, params)
 
 
 def faiss_search_filtered(
@@ -86,40 +99,19 @@ def faiss_search_filtered(
     k: int = 8,
     scope: str = "all",
     mp_ids: list[str] | None = None,
+    generation: IndexGeneration | None = None,
 ) -> list[FaissHit]:
-    index, meta = _load_index()
-
-    mp_ids_norm = [m.upper() for m in (mp_ids or [])]
-
-    def allowed(m: dict[str, Any]) -> bool:
-        doc_type = (m.get("doc_type") or "").lower()
-        mp_id = (m.get("mp_id") or "")
-        if scope == "all":
-            return True
-        if scope == "standspec":
-            return doc_type == "standspec"
-        if scope == "scheduling":
-            return doc_type == "scheduling"
-        if scope == "mp":
-            return doc_type == "mp"
-        if scope == "mp_only":
-            return doc_type == "mp" and mp_id.upper() in mp_ids_norm
-        return True
+    loaded = (generation or get_registry().current()).get("faiss_pages")
+    index, meta = loaded.index, loaded.meta
 
+    # Filter inside the search so scoped queries get exactly k allowed pages.
+    mask = loaded.columns.scope_mask(scope, mp_ids)
     qv = embed_texts([query])  # (1, D)
-    # Pull more than k so we can filter by scope
-    D, I = index.search(qv, min(len(meta), max(k * 8, 50)))
+    D, I = vector_search(index, qv, k, mask)
 
     hits: list[FaissHit] = []
-    for score, idx in zip(D[0].tolist(), I[0].tolist()):
-        if idx < 0:
-            continue
+    for score, idx in zip(D.tolist(), I.tolist()):
         m = meta[idx]
-        if not allowed(m):
-            continue
-        txt = m["text"] or ""
-        snippet = (txt[:350].replace("\n", " ").strip() + ("…" if len(txt) > 350 else ""))
-        toc_n = toc_entry_count(txt)
 
         hits.append(FaissHit(
             score=float(score),
@@ -129,10 +121,9 @@ def faiss_search_filtered(
             doc_type=m["doc_type"],
             mp_id=m["mp_id"],
             page_number=int(m["page_number"]),
-            snippet=snippet,
-            toc_entries=toc_n,
+            snippet=page_snippet(m["text"] or ""),
+            toc_entries=int(loaded.features.toc_entries[idx]),
+            snippet_toc_entries=int(loaded.features.snippet_toc_entries[idx]),
         ))
-        if len(hits) >= k:
-            break
 
     return hits
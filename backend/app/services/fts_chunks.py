@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import re
+from typing import Container
+
+from app.services.bm25_chunks import BM25ChunkHit, tokenize
+from app.services.db import get_conn
+
+# bm25() weights for the chunks_fts columns: text, heading, section_id, table_label.
+# Chunk text carries the ranking; headings and ids repeat across a section, so they only nudge it.
+_COLUMN_WEIGHTS = (1.0, 0.25, 0.25, 0.25)
+_ALNUM_RE = re.compile(r"[a-z0-9]+")
+
+# Same scope semantics as MetadataColumns.scope_mask (unknown scopes are unfiltered).
+_SCOPE_DOC_TYPES = {
+    "standspec": "standspec",
+    "scheduling": "scheduling",
+    "mp": "mp",
+    "mp_only": "mp",
+}
+
+_HIT_COLUMNS = """
+    c.id AS chunk_id,
+    c.document_id,
+    d.filename,
+    d.display_name,
+    d.doc_type,
+    d.mp_id,
+    c.section_id,
+    c.heading,
+    c.page_start,
+    c.page_end,
+    c.chunk_kind,
+    c.text,
+    c.table_uid,
+    c.table_label,
+    c.table_row_index
+"""
+
+
+def fts_match_query(tokens: list[str]) -> str | None:
+    """
+    FTS5 MATCH expression for bm25_chunks tokens: one quoted phrase per token, OR'ed.
+    FTS5's unicode61 tokenizer splits "701.03.15-1" into 701/03/15/1, so ids and
+    table tokens match as phrases of those parts. None when there are no terms.
+    """
+    phrases: list[str] = []
+    for token in tokens:
+        phrase = " ".join(_ALNUM_RE.findall(token.lower()))
+        if phrase and phrase not in phrases:
+            phrases.append(phrase)
+    if not phrases:
+        return None
+    return " OR ".join(f'"{p}"' for p in phrases)
+
+
+def _filters(scope: str, mp_ids: list[str] | None, min_equation_score: float | None) -> tuple[list[str], list[object]]:
+    where: list[str] = []
+    params: list[object] = []
+    doc_type = _SCOPE_DOC_TYPES.get(scope)
+    if doc_type is not None:
+        where.append("d.doc_type = ?")
+        params.append(doc_type)
+        if scope == "mp_only":
+            wanted = sorted({m.upper() for m in (mp_ids or [])})
+            where.append(f"d.mp_id IN ({','.join('?' for _ in wanted)})" if wanted else "0")
+            params.extend(wanted)
+    if min_equation_score is not None:
+        where.append("COALESCE(c.equation_score, 0) >= ?")
+        params.append(float(min_equation_score))
+    return where, params
+
+
+def _hit(r, score: float) -> BM25ChunkHit:
+    text = r["text"] or ""
+    snippet = text[:350].replace("\n", " ").strip() + ("…" if len(text) > 350 else "")
+    return BM25ChunkHit(
+        score=score,
+        chunk_id=int(r["chunk_id"]),
+        document_id=int(r["document_id"]),
+        filename=r["filename"],
+        display_name=r["display_name"],
+        doc_type=r["doc_type"],
+        mp_id=r["mp_id"],
+        section_id=r["section_id"],
+        heading=r["heading"],
+        page_start=int(r["page_start"]),
+        page_end=int(r["page_end"]),
+        snippet=snippet,
+        chunk_kind=r["chunk_kind"],
+        table_uid=r["table_uid"],
+        table_label=r["table_label"],
+        table_row_index=r["table_row_index"],
+    )
+
+
+def _top_rows(conn, sql: str, params: list[object], k: int, chunk_ids: Container[int] | None) -> list:
+    """
+    First k rows of `sql` (ordered, without LIMIT) whose chunk_id is in `chunk_ids`.
+    Pages through the result in growing batches; with no rebuild since the dense
+    index was built the first batch already holds k allowed rows.
+    """
+    if chunk_ids is None:
+        return conn.execute(f"{sql} LIMIT ?", [*params, int(k)]).fetchall()
+    out: list = []
+    offset = 0
+    batch = max(int(k), 64)
+    while len(out) < k:
+        rows = conn.execute(f"{sql} LIMIT ? OFFSET ?", [*params, batch, offset]).fetchall()
+        out.extend(r for r in rows if int(r["chunk_id"]) in chunk_ids)
+        if len(rows) < batch:
+            break
+        offset += batch
+        batch *= 2
+    return out[:k]
+
+
+def fts_chunks_search(
+    query: str,
+    k: int = 8,
+    scope: str = "all",
+    mp_ids: list[str] | None = None,
+    min_equation_score: float | None = None,
+    tokens: list[str] | None = None,
+    chunk_ids: Container[int] | None = None,
+) -> list[BM25ChunkHit]:
+    """
+    Top-k chunks by FTS5 bm25() with scope/mp_id/equation filters applied in SQL.
+    Scores are -bm25() so higher is better, like BM25ChunkHit from the pickled index.
+    With no lexical match it falls back to the first k allowed chunks in corpus
+    order at score 0, as bm25_chunks_rank does.
+    `tokens` skips re-tokenizing a query that was already analyzed.
+    `chunk_ids` restricts hits to those ids (the chunk store of the index
+    generation they are fused with), since chunks_fts follows live SQLite.
+    """
+    where, params = _filters(scope, mp_ids, min_equation_score)
+    match = fts_match_query(tokenize(query) if tokens is None else tokens)
+
+    with get_conn(readonly=True) as conn:
+        rows = []
+        if match is not None:
+            weights = ", ".join(str(w) for w in _COLUMN_WEIGHTS)
+            rows = _top_rows(
+                conn,
+                f"""
+                SELECT {_HIT_COLUMNS}, -bm25(chunks_fts, {weights}) AS score
+                FROM chunks_fts
+                JOIN chunks c ON c.id = chunks_fts.rowid
+                JOIN documents d ON d.id = c.document_id
+                WHERE chunks_fts MATCH ?{"".join(f" AND {w}" for w in where)}
+                ORDER BY score DESC, c.document_id, c.chunk_index
+                """,
+                [match, *params],
+                k,
+                chunk_ids,
+            )
+        if rows:
+            return [_hit(r, float(r["score"])) for r in rows]
+
+        rows = _top_rows(
+            conn,
+            f"""
+            SELECT {_HIT_COLUMNS}
+            FROM chunks c
+            JOIN documents d ON d.id = c.document_id
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY c.document_id, c.chunk_index
+            """,
+            params,
+            k,
+            chunk_ids,
+        )
+    return [_hit(r, 0.0) for r in rows]
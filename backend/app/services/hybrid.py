@@ -5,7 +5,8 @@ from typing import Optional
 
 from app.services.bm25 import bm25_search_filtered, BM25Hit
 from app.services.faiss_store import faiss_search_filtered, FaissHit
-from app.services.rerank import is_section_intent, toc_entry_count, toc_penalty
+from app.services.index_registry import get_registry
+from app.services.rerank import is_section_intent, toc_penalty_for_count
 
 
 @dataclass
@@ -64,9 +65,16 @@ def hybrid_search(
     scope: str = "all",
     mp_ids: list[str] | None = None,
 ) -> tuple[list[HybridHit], str]:
+    # One generation for both sides so fused keys come from the same build.
+    gen = get_registry().current()
+
     # Pull more than k so fusion has enough candidates
-    bm25_hits: list[BM25Hit] = bm25_search_filtered(query=query, k=max(20, k), scope=scope, mp_ids=mp_ids)
-    vec_hits: list[FaissHit] = faiss_search_filtered(query=query, k=max(20, k), scope=scope, mp_ids=mp_ids)
+    bm25_hits: list[BM25Hit] = bm25_search_filtered(
+        query=query, k=max(20, k), scope=scope, mp_ids=mp_ids, generation=gen
+    )
+    vec_hits: list[FaissHit] = faiss_search_filtered(
+        query=query, k=max(20, k), scope=scope, mp_ids=mp_ids, generation=gen
+    )
 
     bm25_keys = [(h.document_id, h.page_number) for h in bm25_hits]
     vec_keys = [(h.document_id, h.page_number) for h in vec_hits]
@@ -79,16 +87,12 @@ def hybrid_search(
 
     section_intent = is_section_intent(query)
 
+    # TOC entries in each key's snippet were counted when the page indexes were built.
+    snippet_toc = {key: h.snippet_toc_entries for key, h in vec_map.items()}
+    snippet_toc.update((key, h.snippet_toc_entries) for key, h in bm25_map.items())
+
     def fused_with_penalty(key: tuple[int, int]) -> float:
-        base = fused[key]
-        b = bm25_map.get(key)
-        v = vec_map.get(key)
-        text = None
-        if b is not None:
-            text = b.snippet
-        if v is not None and text is None:
-            text = v.snippet
-        return base * toc_penalty(text or "", strong=section_intent)
+        return fused[key] * toc_penalty_for_count(snippet_toc.get(key, 0), strong=section_intent)
 
     ranked_keys = sorted(fused.keys(), key=fused_with_penalty, reverse=True)[: max(k * 5, 50)]
 
@@ -122,7 +126,7 @@ def hybrid_search(
             snip_upper = (h.snippet or "").upper()
             if "TABLE OF CONTENTS" in snip_upper:
                 continue
-            if toc_entry_count(h.snippet or "") >= 6:
+            if snippet_toc.get((h.document_id, h.page_number), 0) >= 6:
                 continue
             cleaned.append(h)
         results = cleaned[:k]
@@ -4,46 +4,28 @@ from dataclasses import dataclass
 from typing import Optional
 import re
 
-from app.services.bm25_chunks import bm25_chunks_search_filtered, BM25ChunkHit
-from app.services.faiss_chunks import faiss_chunks_search_filtered, FaissChunkHit
+from app.core.config import settings
+from app.services.bm25_chunks import bm25_chunks_rank, bm25_chunks_scores, BM25ChunkHit
+from app.services.faiss_chunks import faiss_chunks_rank, faiss_chunks_scores, FaissChunkHit
+from app.services.fts_chunks import fts_chunks_search
 from app.services.db import get_conn
-from app.services.rerank import is_section_intent
+from app.services.index_registry import IndexGeneration, get_registry
+from app.services.query_analysis import QueryAnalysis, QueryPlan, analyze_query, plan_query
 
 
-def extract_section_dot(query: str) -> str | None:
-    # supports 701.02 and 701.02.01
-    m = re.search(r"\b(\d{3}\.\d{2}(?:\.\d{2})?)\b", query or "")
-    return m.group(1) if m else None
-
-
-def extract_section_prefix(query: str) -> str | None:
-    q = query or ""
-    m = re.search(r"\bsection\s*(\d{3})\b", q, re.I)
-    if m:
-        return m.group(1)
-    m = re.search(r"\b§\s*(\d{3})\b", q)
-    if m:
-        return m.group(1)
-    return None
-
-
-_TABLE_QUERY_RE = re.compile(r"\b(table|tbl|tab\.)\b", re.I)
-_EQUATION_QUERY_RE = re.compile(
-    r"\b(equation|equations|formula|calculate|calculation|compute|how to compute|pay adjustment|ppa|pd|ql|iri)\b",
-    re.I,
-)
-
-
-def is_table_query(q: str) -> bool:
-    return bool(_TABLE_QUERY_RE.search(q or ""))
-
-
-def is_equation_query(q: str) -> bool:
-    return bool(_EQUATION_QUERY_RE.search(q or ""))
-
-
-def table_row_count(table_uid: str) -> int:
-    with get_conn() as conn:
+def table_row_count(table_uid: str, generation: IndexGeneration | None = None) -> int:
+    """
+    Row count from the registry's table_row_counts map; SQLite if that map failed
+    to load or does not know the table yet (built after the map was loaded).
+    """
+    gen = generation or get_registry().current()
+    try:
+        n = gen.get("table_row_counts").get(table_uid)
+    except RuntimeError:
+        n = None
+    if n is not None:
+        return int(n)
+    with get_conn(readonly=True) as conn:
         r = conn.execute(
             "SELECT COUNT(1) AS n FROM table_rows WHERE table_uid = ?",
             (table_uid,),
@@ -51,15 +33,16 @@ def table_row_count(table_uid: str) -> int:
     return int(r["n"]) if r and r["n"] is not None else 0
 
 
-def boost_table_hits_for_table_queries(query: str, hits: list) -> list:
+def boost_table_hits_for_table_queries(
+    hits: list,
+    target_section: str | None,
+    generation: IndexGeneration | None = None,
+) -> list:
     """
     Boost tables that look like real multi-row tables and/or match a likely section/table reference.
+    `target_section` is the query's section id (QueryAnalysis.section_dot).
     """
-    q = (query or "").lower()
-
-    m = re.search(r"\b(\d{3}\.\d{2}(?:\.\d{2})?)\b", q)
-    target_section = m.group(1) if m else None
-
+    gen = generation or get_registry().current()
     boosted = []
     for h in hits:
         score = float(getattr(h, "score", 0.0))
@@ -69,7 +52,7 @@ def boost_table_hits_for_table_queries(query: str, hits: list) -> list:
         snippet = (getattr(h, "snippet", "") or "").lower()
 
         if tuid:
-            nrows = table_row_count(tuid)
+            nrows = table_row_count(tuid, gen)
 
             if nrows >= 6:
                 score += 0.08
@@ -148,16 +131,57 @@ def hybrid_chunks_search(
     k: int = 8,
     scope: str = "all",
     mp_ids: list[str] | None = None,
+    analysis: QueryAnalysis | None = None,
+    plan: QueryPlan | None = None,
 ) -> tuple[list[HybridChunkHit], str]:
+    """
+    `analysis`/`plan` come from the caller when it already parsed the query
+    (ask_question); otherwise they are computed here.
+    """
+    analysis = analysis or analyze_query(query)
+    plan = plan or plan_query(analysis)
+
     # Pull deeper candidate pools so we can rerank AFTER fusion.
     pool_k = max(60, k * 12)
 
-    bm25_hits: list[BM25ChunkHit] = bm25_chunks_search_filtered(
-        query=query, k=pool_k, scope=scope, mp_ids=mp_ids
-    )
-    vec_hits: list[FaissChunkHit] = faiss_chunks_search_filtered(
-        query=query, k=pool_k, scope=scope, mp_ids=mp_ids
-    )
+    # One generation for every search below so fused chunk_ids come from the same build.
+    gen = get_registry().current()
+    use_fts = settings.CHUNKS_LEXICAL_ENGINE == "fts5"
+    # FTS5 reads live SQLite, so its hits are limited to the chunks of the loaded
+    # faiss_chunks build (an incremental re-chunk is not fused until FAISS is rebuilt).
+    fts_chunk_ids = None
+    if use_fts:
+        try:
+            fts_chunk_ids = gen.get("faiss_chunks").store
+        except RuntimeError:
+            pass  # no dense side to stay in step with
+
+    # Score the query once per engine; every candidate list below is a ranking of these arrays.
+    # (FTS5 ranks inside SQLite, one query per candidate list.)
+    bm25_index = None
+    bm25_scores = None
+    if use_fts:
+        bm25_hits: list[BM25ChunkHit] = fts_chunks_search(
+            query, k=pool_k, scope=scope, mp_ids=mp_ids, tokens=analysis.chunk_tokens, chunk_ids=fts_chunk_ids
+        )
+    else:
+        bm25_index = gen.get("bm25_chunks")
+        bm25_scores = bm25_chunks_scores(query, bm25_index, tokens=analysis.chunk_tokens)
+        bm25_hits = bm25_chunks_rank(bm25_index, bm25_scores, k=pool_k, scope=scope, mp_ids=mp_ids)
+
+    faiss_index = None
+    vec_scores = None
+    vec_hits: list[FaissChunkHit] = []
+    if plan.dense:
+        faiss_index = gen.get("faiss_chunks")
+        vec_scores = faiss_chunks_scores(
+            query,
+            faiss_index,
+            mask=faiss_index.columns.scope_mask(scope, mp_ids),
+            k=pool_k,
+            query_vec=analysis.query_vector,
+        )
+        vec_hits = faiss_chunks_rank(faiss_index, vec_scores, k=pool_k, scope=scope, mp_ids=mp_ids)
 
     bm25_keys = [h.chunk_id for h in bm25_hits]
     vec_keys = [h.chunk_id for h in vec_hits]
@@ -165,21 +189,44 @@ def hybrid_chunks_search(
 
     eq_bm25_hits: list[BM25ChunkHit] = []
     eq_vec_hits: list[FaissChunkHit] = []
-    if is_equation_query(query):
-        eq_bm25_hits = bm25_chunks_search_filtered(
-            query=query,
-            k=50,
-            scope=scope,
-            mp_ids=mp_ids,
-            min_equation_score=0.45,
-        )
-        eq_vec_hits = faiss_chunks_search_filtered(
-            query=query,
-            k=50,
-            scope=scope,
-            mp_ids=mp_ids,
-            min_equation_score=0.45,
-        )
+    if plan.equation_pools:
+        if use_fts:
+            eq_bm25_hits = fts_chunks_search(
+                query,
+                k=50,
+                scope=scope,
+                mp_ids=mp_ids,
+                min_equation_score=0.45,
+                tokens=analysis.chunk_tokens,
+                chunk_ids=fts_chunk_ids,
+            )
+        else:
+            eq_bm25_hits = bm25_chunks_rank(
+                bm25_index,
+                bm25_scores,
+                k=50,
+                scope=scope,
+                mp_ids=mp_ids,
+                min_equation_score=0.45,
+            )
+        if plan.dense:
+            eq_vec_scores = vec_scores
+            if not faiss_index.exhaustive:
+                eq_vec_scores = faiss_chunks_scores(
+                    query,
+                    faiss_index,
+                    mask=faiss_index.columns.filter_mask(scope, mp_ids, 0.45),
+                    k=50,
+                    query_vec=analysis.query_vector,
+                )
+            eq_vec_hits = faiss_chunks_rank(
+                faiss_index,
+                eq_vec_scores,
+                k=50,
+                scope=scope,
+                mp_ids=mp_ids,
+                min_equation_score=0.45,
+            )
         eq_keys: list[int] = []
         seen = set()
         for h in eq_bm25_hits + eq_vec_hits:
@@ -232,10 +279,10 @@ def hybrid_chunks_search(
         )
 
     # ---- section intent cleanup/boost (same logic, just runs on bigger pool) ----
-    section_prefix = extract_section_prefix(query)
-    exact_section = extract_section_dot(query)
+    section_prefix = analysis.section_prefix
+    exact_section = analysis.section_dot
 
-    if is_section_intent(query):
+    if analysis.section_intent:
         results = [h for h in results if h.chunk_kind not in ("toc", "front_matter")]
 
         cleaned: list[HybridChunkHit] = []
@@ -256,18 +303,14 @@ def hybrid_chunks_search(
                 results = preferred + [h for h in results if h not in preferred]
 
     # ---- Equation intent: boost equation-tagged chunks ----
-    if is_equation_query(query):
+    if analysis.equation_intent:
         for h in results:
             if h.chunk_kind == "equation":
                 h.score = float(h.score) * 1.35
         results.sort(key=lambda x: x.score, reverse=True)
 
     # ---- NEW: if query looks like "Table 901.03-1", boost chunks that contain that exact table token ----
-    qlow = (query or "").lower()
-    table_token = None
-    m = re.search(r"\btable\s*([0-9]{3}\.[0-9]{2}-[0-9]+)\b", qlow)
-    if m:
-        table_token = m.group(1)  # e.g. "901.03-1"
+    table_token = analysis.table_ref  # e.g. "901.03-1"
 
     if table_token:
         def _table_token_bonus(h: HybridChunkHit) -> float:
@@ -292,8 +335,8 @@ def hybrid_chunks_search(
     # Table intent shaping (now meaningful because we still have the full pool)
     results = _table_group_boost(results, query)
     results = collapse_tables(results, k=max(pool_k, 120))
-    if is_table_query(query):
-        results = boost_table_hits_for_table_queries(query, results)
+    if analysis.table_query:
+        results = boost_table_hits_for_table_queries(results, analysis.section_dot, gen)
     results.sort(key=lambda x: getattr(x, "score", 0.0), reverse=True)
 
     # Confidence (use post-processed top hit if present)
@@ -0,0 +1,475 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, size) per artifact file; None when the file is missing.
+# Specs backed by SQLite append their state tuple.
+FileSignature = tuple[Any, ...]
+
+
+@dataclass
+class LoadedIndex:
+    name: str
+    value: Any
+    paths: list[Path]
+    signature: FileSignature
+    fingerprint: Optional[str]
+    load_ms: float
+    file_bytes: int
+    rss_delta_bytes: Optional[int]
+    loaded_at: float
+
+
+@dataclass
+class _IndexSpec:
+    paths: Callable[[], list[Path]]
+    loader: Callable[[], Any]
+    # Identifies the corpus rows (and their order) an artifact was built from.
+    fingerprint: Callable[[Any], str]
+    # Extra change signal for artifacts loaded from SQLite rather than files.
+    state: Optional[Callable[[], Any]] = None
+
+
+def _load_bm25_pages() -> Any:
+    from app.services.bm25 import BM25Index
+
+    return BM25Index.load(settings.BM25_PATH)
+
+
+def _load_faiss_pages() -> Any:
+    from app.services.faiss_store import _load_index
+
+    return _load_index()
+
+
+def _load_bm25_chunks() -> Any:
+    from app.services.bm25_chunks import BM25ChunksIndex
+
+    return BM25ChunksIndex.load(settings.INDEX_DIR / "bm25_chunks.pkl")
+
+
+def _load_faiss_chunks() -> Any:
+    from app.services.faiss_chunks import _load
+
+    return _load(settings.INDEX_DIR / "faiss_chunks.index", settings.INDEX_DIR / "faiss_chunks_meta.pkl")
+
+
+def _load_table_row_counts() -> Any:
+    from app.services.tables import load_table_row_counts
+
+    return load_table_row_counts()
+
+
+def _load_section_map() -> Any:
+    from app.services.sections import load_section_map
+
+    return load_section_map()
+
+
+def _section_state() -> Any:
+    from app.services.sections import section_state
+
+    try:
+        return section_state()
+    except Exception:
+        # no chunk tables yet; the load will fail and record the error
+        return None
+
+
+def _params_path(index_path: Path) -> Path:
+    from app.services.vector_index import params_path
+
+    return params_path(index_path)
+
+
+def _keys_fingerprint(keys: Iterator[Any]) -> str:
+    h = hashlib.sha1()
+    for key in keys:
+        h.update(repr(key).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def _page_keys(meta: list[dict[str, Any]]) -> Iterator[tuple[int, int]]:
+    return ((int(m["document_id"]), int(m["page_number"])) for m in meta)
+
+
+def _bm25_chunks_array_paths(path: Path) -> list[Path]:
+    from app.services.bm25_chunks import bm25_chunks_array_paths
+
+    return list(bm25_chunks_array_paths(path).values())
+
+
+def _chunk_store_paths() -> list[Path]:
+    from app.services.chunk_store import chunk_store_paths
+
+    return chunk_store_paths()
+
+
+_SPECS: dict[str, _IndexSpec] = {
+    "bm25_pages": _IndexSpec(
+        paths=lambda: [settings.BM25_PATH],
+        loader=_load_bm25_pages,
+        fingerprint=lambda idx: _keys_fingerprint(_page_keys(idx.meta)),
+    ),
+    "faiss_pages": _IndexSpec(
+        paths=lambda: [settings.FAISS_INDEX_PATH, settings.FAISS_META_PATH, _params_path(settings.FAISS_INDEX_PATH)],
+        loader=_load_faiss_pages,
+        fingerprint=lambda idx: _keys_fingerprint(_page_keys(idx.meta)),
+    ),
+    "bm25_chunks": _IndexSpec(
+        paths=lambda: [
+            settings.INDEX_DIR / "bm25_chunks.pkl",
+            *_bm25_chunks_array_paths(settings.INDEX_DIR / "bm25_chunks.pkl"),
+            *_chunk_store_paths(),
+        ],
+        loader=_load_bm25_chunks,
+        fingerprint=lambda idx: idx.store.fingerprint,
+    ),
+    "faiss_chunks": _IndexSpec(
+        paths=lambda: [
+            settings.INDEX_DIR / "faiss_chunks.index",
+            settings.INDEX_DIR / "faiss_chunks_meta.pkl",
+            _params_path(settings.INDEX_DIR / "faiss_chunks.index"),
+            *_chunk_store_paths(),
+        ],
+        loader=_load_faiss_chunks,
+        fingerprint=lambda idx: idx.store.fingerprint,
+    ),
+    # Structured tables are rewritten by every rebuild_chunks run (full or incremental),
+    # which need not touch the chunk store, so the counts follow the SQLite chunk build too.
+    "table_row_counts": _IndexSpec(
+        paths=_chunk_store_paths,
+        loader=_load_table_row_counts,
+        fingerprint=lambda counts: _keys_fingerprint(iter(sorted(counts.items()))),
+        state=_section_state,
+    ),
+    # Materialized by rebuild_chunks, whose incremental runs can leave the chunk store
+    # untouched, so it also reloads when the chunk build in SQLite changes.
+    "section_map": _IndexSpec(
+        paths=_chunk_store_paths,
+        loader=_load_section_map,
+        fingerprint=lambda smap: _keys_fingerprint((s.document_id, s.section_id, s.chunk_count) for s in smap.sections),
+        state=_section_state,
+    ),
+}
+
+# With the FTS5 engine chunk lexical search runs in SQLite, so the pickled chunk
+# index is neither loaded nor required to match faiss_chunks.
+if settings.CHUNKS_LEXICAL_ENGINE == "fts5":
+    del _SPECS["bm25_chunks"]
+
+# Lexical + dense artifacts that are fused by key and must come from the same build.
+_PAIRS: list[tuple[str, str]] = [
+    pair
+    for pair in [("bm25_pages", "faiss_pages"), ("bm25_chunks", "faiss_chunks")]
+    if all(name in _SPECS for name in pair)
+]
+
+
+def _current_rss_bytes() -> Optional[int]:
+    """
+    Resident set size of this process (Linux only; None elsewhere).
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+def _spec_signature(spec: _IndexSpec) -> FileSignature:
+    sig = _file_signature(spec.paths())
+    return sig + (spec.state(),) if spec.state is not None else sig
+
+
+def _file_signature(paths: list[Path]) -> FileSignature:
+    out: list[Optional[tuple[int, int]]] = []
+    for p in paths:
+        try:
+            st = p.stat()
+            out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+@contextmanager
+def atomic_output(path: Path) -> Iterator[Path]:
+    """
+    Yields a temp path next to `path`; renames it over `path` on success.
+    Index builders use this so a running server never loads a half-written file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def save_array(path: Path, arr: Any) -> None:
+    """
+    Write a flat .npy artifact (atomically) so it can be memory-mapped on load.
+    """
+    import numpy as np
+
+    with atomic_output(path) as tmp, tmp.open("wb") as f:
+        np.save(f, np.ascontiguousarray(arr), allow_pickle=False)
+
+
+def load_array(path: Path) -> Any:
+    """
+    Load a .npy artifact; with INDEX_MMAP the array is a read-only view of the
+    file, so every worker process shares the same page-cache pages.
+    """
+    import numpy as np
+
+    return np.load(path, mmap_mode="r" if settings.INDEX_MMAP else None, allow_pickle=False)
+
+
+@dataclass
+class IndexGeneration:
+    """
+    Immutable snapshot of every loaded artifact.
+    A request should resolve one generation and use it for all of its searches.
+    """
+
+    number: int
+    indexes: dict[str, LoadedIndex]
+    errors: dict[str, str] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+    def get(self, name: str) -> Any:
+        entry = self.indexes.get(name)
+        if entry is None:
+            err = self.errors.get(name, "not loaded")
+            raise RuntimeError(f"Index unavailable: {name} ({err})")
+        return entry.value
+
+    def signature(self) -> dict[str, FileSignature]:
+        return {name: entry.signature for name, entry in self.indexes.items()}
+
+
+def _load_entry(name: str) -> LoadedIndex:
+    spec = _SPECS[name]
+    paths = spec.paths()
+    signature = _spec_signature(spec)
+    rss_before = _current_rss_bytes()
+    t0 = time.perf_counter()
+    value = spec.loader()
+    load_ms = (time.perf_counter() - t0) * 1000.0
+    rss_after = _current_rss_bytes()
+
+    entry = LoadedIndex(
+        name=name,
+        value=value,
+        paths=paths,
+        signature=signature,
+        fingerprint=spec.fingerprint(value),
+        load_ms=load_ms,
+        file_bytes=sum(p.stat().st_size for p in paths if p.exists()),
+        rss_delta_bytes=(rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+        loaded_at=time.time(),
+    )
+    logger.info("index loaded; name=%s load_ms=%.1f file_bytes=%d", name, load_ms, entry.file_bytes)
+    return entry
+
+
+class IndexRegistry:
+    """
+    Holds search artifacts in process memory so they are deserialized once,
+    not once per query.
+
+    - load_all() is called from the FastAPI lifespan at startup.
+    - current() lazily builds the first generation (scripts, missing preload).
+    - reload() loads changed artifacts into a new generation and swaps it in;
+      requests already holding the old generation finish on it.
+    - BM25/FAISS pairs are only swapped together when their fingerprints
+      match, so fusion never mixes keys from different builds.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._current: Optional[IndexGeneration] = None
+        self._last_attempt: Optional[dict[str, FileSignature]] = None
+        self._last_reload_error: Optional[str] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ---- read path ----
+
+    def current(self) -> IndexGeneration:
+        gen = self._current
+        if gen is not None:
+            return gen
+        with self._reload_lock:
+            if self._current is None:
+                self._swap(self._build_generation(previous=None, reuse=True))
+            return self._current  # type: ignore[return-value]
+
+    def get(self, name: str) -> Any:
+        return self.current().get(name)
+
+    # ---- load / reload ----
+
+    def load_all(self) -> IndexGeneration:
+        return self.current()
+
+    def _build_generation(self, previous: Optional[IndexGeneration], *, reuse: bool) -> IndexGeneration:
+        indexes: dict[str, LoadedIndex] = {}
+        errors: dict[str, str] = {}
+
+        for name, spec in _SPECS.items():
+            prev = previous.indexes.get(name) if previous else None
+            if reuse and prev is not None and prev.signature == _spec_signature(spec):
+                indexes[name] = prev
+                continue
+            try:
+                indexes[name] = _load_entry(name)
+            except Exception as e:
+                logger.exception("index load failed; name=%s", name)
+                errors[name] = str(e)
+
+        for a, b in _PAIRS:
+            new_a, new_b = indexes.get(a), indexes.get(b)
+            in_sync = new_a is not None and new_b is not None and new_a.fingerprint == new_b.fingerprint
+            if in_sync or previous is None:
+                if new_a is not None and new_b is not None and not in_sync:
+                    logger.warning("index pair out of sync at startup; pair=%s/%s", a, b)
+                continue
+            # Keep serving the previous pair until both sides are rebuilt from the same rows.
+            logger.warning(
+                "index pair out of sync; keeping generation %d for %s/%s",
+                previous.number,
+                a,
+                b,
+            )
+            for name in (a, b):
+                if name in previous.indexes:
+                    indexes[name] = previous.indexes[name]
+                    errors.pop(name, None)
+
+        number = (previous.number + 1) if previous else 1
+        return IndexGeneration(number=number, indexes=indexes, errors=errors)
+
+    def _swap(self, gen: IndexGeneration) -> None:
+        with self._lock:
+            self._current = gen
+        logger.info("index generation active; generation=%d indexes=%s", gen.number, sorted(gen.indexes))
+
+    def _disk_signature(self) -> dict[str, FileSignature]:
+        return {name: _spec_signature(spec) for name, spec in _SPECS.items()}
+
+    def reload(self, *, force: bool = False) -> IndexGeneration:
+        """
+        Load a new generation if artifacts changed on disk (or force=True) and swap it in.
+        """
+        with self._reload_lock:
+            previous = self._current
+            disk = self._disk_signature()
+            if previous is not None and not force:
+                if disk == previous.signature() or disk == self._last_attempt:
+                    return previous
+            self._last_attempt = disk
+            try:
+                gen = self._build_generation(previous=previous, reuse=not force)
+            except Exception as e:
+                self._last_reload_error = str(e)
+                logger.exception("index reload failed")
+                if previous is None:
+                    raise
+                return previous
+
+            if previous is not None and gen.signature() == previous.signature() and not force:
+                return previous
+            self._last_reload_error = None
+            self._swap(gen)
+            return gen
+
+    # ---- watcher ----
+
+    def start_watcher(self, interval_s: float) -> None:
+        """
+        Poll INDEX_DIR artifacts and reload when they change.
+        Waits for one stable poll so a build in progress is not picked up halfway.
+        """
+        if interval_s <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def _run() -> None:
+            seen = self._disk_signature()
+            while not self._stop.wait(interval_s):
+                try:
+                    disk = self._disk_signature()
+                    if disk != seen:
+                        seen = disk
+                        continue
+                    self.reload()
+                except Exception:
+                    logger.exception("index watcher iteration failed")
+
+        self._watcher = threading.Thread(target=_run, name="index-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    # ---- reporting ----
+
+    def stats(self) -> dict[str, Any]:
+        gen = self._current
+        indexes: dict[str, Any] = {}
+        for name in _SPECS:
+            entry = gen.indexes.get(name) if gen else None
+            if entry is not None:
+                indexes[name] = {
+                    "loaded": True,
+                    "load_ms": round(entry.load_ms, 1),
+                    "file_bytes": entry.file_bytes,
+                    "rss_delta_bytes": entry.rss_delta_bytes,
+                    "fingerprint": (entry.fingerprint or "")[:12],
+                }
+                params = getattr(entry.value, "params", None)
+                if params:
+                    indexes[name]["index_type"] = params.get("index_type")
+            else:
+                indexes[name] = {"loaded": False}
+                if gen and name in gen.errors:
+                    indexes[name]["error"] = gen.errors[name]
+        out: dict[str, Any] = {
+            "generation": gen.number if gen else None,
+            "watching": self._watcher is not None,
+            "rss_bytes": _current_rss_bytes(),
+            "indexes": indexes,
+        }
+        if self._last_reload_error:
+            out["last_reload_error"] = self._last_reload_error
+        return out
+
+
+_registry = IndexRegistry()
+
+
+def get_registry() -> IndexRegistry:
+    return _registry
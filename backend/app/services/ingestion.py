@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 import hashlib
-from dataclasses import dataclass
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 
 import fitz  # PyMuPDF
 
 from app.core.config import settings
-from app.services.db import get_conn
+from app.services.db import bulk_write, get_conn
 
 
 def sha256_file(path: Path) -> str:
@@ -29,7 +33,7 @@ def init_db() -> None:
     Migrations are authoritative for schema creation.
     This check prevents silent partial setups when migrations were skipped.
     """
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         row = conn.execute(
             """
             SELECT name
@@ -71,24 +75,35 @@ def classify_pdf(pdf_path: Path) -> tuple[str, str | None, str]:
     return ("other", None, pdf_path.stem)
 
 
+@dataclass
+class DocumentTiming:
+    filename: str
+    pages: int
+    extract_s: float  # summed over page-range tasks when split across workers
+    write_s: float
+    ingested: bool
+
+
 @dataclass
 class IngestionResult:
     total_pdfs: int
     ingested: int
     skipped_unchanged: int
     pages_written: int
+    timings: list[DocumentTiming] = field(default_factory=list)
 
 
-def extract_pages_text(pdf_path: Path) -> list[str]:
+def extract_pages_text(pdf_path: Path, start: int = 0, stop: int | None = None) -> list[str]:
     """
     Extract per-page text using PyMuPDF.
-    Returns list where index 0 => page 1.
+    Returns list where index 0 => page `start + 1` (page 1 by default).
     """
     doc = fitz.open(pdf_path)
     pages: list[str] = []
-    for page in doc:
+    stop = doc.page_count if stop is None else min(stop, doc.page_count)
+    for i in range(start, stop):
         # "text" is usually best baseline; later you can switch to dict/json for table-aware parsing
-        t = page.get_text("text") or ""
+        t = doc[i].get_text("text") or ""
         # normalize a bit
         t = t.replace("\u00a0", " ").strip()
         pages.append(t)
@@ -96,20 +111,24 @@ def extract_pages_text(pdf_path: Path) -> list[str]:
     return pages
 
 
-def upsert_document_and_pages(pdf_path: Path) -> tuple[bool, int, int]:
+def _write_document(
+    pdf_path: Path,
+    file_hash: str,
+    pages: list[str],
+    stat: tuple[int, int] | None = None,
+) -> tuple[bool, int, int]:
     """
     Returns (did_ingest, document_id, pages_written)
     - Skips ingest if file hash matches existing.
     - If changed/new: upserts document row and replaces all page rows.
+    `stat` is the (mtime_ns, size) the hash was computed for.
     """
-    file_hash = sha256_file(pdf_path)
     doc_type, mp_id, display_name = classify_pdf(pdf_path)
-
-    pages = extract_pages_text(pdf_path)
+    mtime_ns, size = stat or _file_stat(pdf_path)
     page_count = len(pages)
     ingested_at = now_utc_iso()
 
-    with get_conn() as conn:
+    with bulk_write() as conn:
         existing = conn.execute(
             "SELECT id, file_hash FROM documents WHERE file_path = ?",
             (str(pdf_path),),
@@ -124,7 +143,7 @@ def upsert_document_and_pages(pdf_path: Path) -> tuple[bool, int, int]:
             conn.execute("""
                 UPDATE documents
                 SET filename = ?, display_name = ?, doc_type = ?, mp_id = ?, file_hash = ?,
-                    page_count = ?, ingested_at = ?
+                    page_count = ?, ingested_at = ?, file_mtime_ns = ?, file_size = ?
                 WHERE id = ?
             """, (
                 pdf_path.name,
@@ -134,14 +153,19 @@ def upsert_document_and_pages(pdf_path: Path) -> tuple[bool, int, int]:
                 file_hash,
                 page_count,
                 ingested_at,
+                mtime_ns,
+                size,
                 document_id,
             ))
             # Replace pages for deterministic behavior
             conn.execute("DELETE FROM pages WHERE document_id = ?", (document_id,))
         else:
             cur = conn.execute("""
-                INSERT INTO documents (filename, display_name, doc_type, mp_id, file_path, file_hash, page_count, ingested_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO documents (
+                    filename, display_name, doc_type, mp_id, file_path, file_hash, page_count, ingested_at,
+                    file_mtime_ns, file_size
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 pdf_path.name,
                 display_name,
@@ -151,19 +175,83 @@ def upsert_document_and_pages(pdf_path: Path) -> tuple[bool, int, int]:
                 file_hash,
                 page_count,
                 ingested_at,
+                mtime_ns,
+                size,
             ))
             document_id = int(cur.lastrowid)
 
         # Insert pages
-        pages_written = 0
-        for idx, text in enumerate(pages, start=1):
-            conn.execute("""
-                INSERT INTO pages (document_id, page_number, text, char_count)
-                VALUES (?, ?, ?, ?)
-            """, (document_id, idx, text, len(text)))
-            pages_written += 1
+        conn.executemany("""
+            INSERT INTO pages (document_id, page_number, text, char_count)
+            VALUES (?, ?, ?, ?)
+        """, [(document_id, idx, text, len(text)) for idx, text in enumerate(pages, start=1)])
+
+    return (True, document_id, page_count)
+
 
-    return (True, document_id, pages_written)
+def _file_stat(path: Path) -> tuple[int, int]:
+    st = path.stat()
+    return (st.st_mtime_ns, st.st_size)
+
+
+@dataclass
+class _StoredDocument:
+    id: int
+    file_hash: str
+    page_count: int
+    stat: tuple[int | None, int | None]
+
+
+def _stored_documents() -> dict[str, _StoredDocument]:
+    with get_conn(readonly=True) as conn:
+        rows = conn.execute(
+            "SELECT id, file_path, file_hash, page_count, file_mtime_ns, file_size FROM documents"
+        ).fetchall()
+    return {
+        r["file_path"]: _StoredDocument(
+            int(r["id"]), r["file_hash"], int(r["page_count"] or 0), (r["file_mtime_ns"], r["file_size"])
+        )
+        for r in rows
+    }
+
+
+def _check_unchanged(
+    pdf_path: Path,
+    stored: _StoredDocument | None,
+) -> tuple[bool, str | None, tuple[int, int]]:
+    """
+    Hash-first change detection: (unchanged, sha256 or None, stat).
+    An unchanged (mtime, size) skips hashing entirely; a touched file with
+    the same hash gets its new stat recorded so the next run skips it too.
+    """
+    stat = _file_stat(pdf_path)
+    if stored is None:
+        return (False, sha256_file(pdf_path), stat)
+    if stored.stat == stat:
+        return (True, None, stat)
+    file_hash = sha256_file(pdf_path)
+    if file_hash != stored.file_hash:
+        return (False, file_hash, stat)
+    with get_conn() as conn:
+        conn.execute(
+            "UPDATE documents SET file_mtime_ns = ?, file_size = ? WHERE id = ?",
+            (stat[0], stat[1], stored.id),
+        )
+    return (True, file_hash, stat)
+
+
+def upsert_document_and_pages(pdf_path: Path) -> tuple[bool, int, int]:
+    """
+    Returns (did_ingest, document_id, pages_written); see _write_document.
+    Unchanged files are detected before any page is parsed.
+    """
+    stored = _stored_documents().get(str(pdf_path))
+    unchanged, file_hash, stat = _check_unchanged(pdf_path, stored)
+    if unchanged:
+        assert stored is not None
+        return (False, stored.id, 0)
+    pages = extract_pages_text(pdf_path)
+    return _write_document(pdf_path, file_hash or sha256_file(pdf_path), pages, stat)
 
 
 def iter_pdfs(pdf_dir: Path) -> Iterable[Path]:
@@ -172,7 +260,69 @@ def iter_pdfs(pdf_dir: Path) -> Iterable[Path]:
             yield p
 
 
-def ingest_all_pdfs(pdf_dir: Path | None = None) -> IngestionResult:
+def _page_ranges(pdf_path: Path, pages_per_task: int) -> list[tuple[int, int]]:
+    with fitz.open(pdf_path) as doc:
+        n = doc.page_count
+    return [(lo, min(lo + pages_per_task, n)) for lo in range(0, n, pages_per_task)] or [(0, 0)]
+
+
+def _extract_range_task(pdf_path: str, start: int, stop: int) -> tuple[list[str], float]:
+    # Runs in a worker process.
+    t0 = time.perf_counter()
+    pages = extract_pages_text(Path(pdf_path), start, stop)
+    return pages, time.perf_counter() - t0
+
+
+def _range_tasks(pdfs: list[Path], pages_per_task: int) -> Iterator[tuple[Path, int, int, bool]]:
+    # (pdf, start, stop, last range of the pdf), opening each pdf only when its ranges are needed
+    for pdf in pdfs:
+        ranges = _page_ranges(pdf, pages_per_task)
+        for i, (lo, hi) in enumerate(ranges):
+            yield pdf, lo, hi, i == len(ranges) - 1
+
+
+def _extract_parallel(pdfs: list[Path], workers: int) -> Iterator[tuple[Path, list[str], float]]:
+    """
+    Extract PDFs across a process pool, splitting large documents into page
+    ranges. Yields (pdf, pages, extract_s) in `pdfs` order as each document's
+    ranges complete, so the single writer assigns document ids deterministically.
+    At most `workers` ranges are in flight, so finished ranges never pile up
+    ahead of the writer and memory tracks the worker count, not the corpus.
+    """
+    tasks = _range_tasks(pdfs, max(1, settings.INGEST_PAGES_PER_TASK))
+    in_flight: deque[tuple[Path, bool, Future]] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        def submit_next() -> None:
+            for pdf, lo, hi, last in islice(tasks, workers - len(in_flight)):
+                in_flight.append((pdf, last, pool.submit(_extract_range_task, str(pdf), lo, hi)))
+
+        submit_next()
+        pages: list[str] = []
+        extract_s = 0.0
+        while in_flight:
+            pdf, last, fut = in_flight.popleft()
+            part, elapsed = fut.result()
+            submit_next()
+            pages.extend(part)
+            extract_s += elapsed
+            if last:
+                yield pdf, pages, extract_s
+                pages, extract_s = [], 0.0
+
+
+def _extract_sequential(pdfs: list[Path]) -> Iterator[tuple[Path, list[str], float]]:
+    for pdf in pdfs:
+        t0 = time.perf_counter()
+        pages = extract_pages_text(pdf)
+        yield pdf, pages, time.perf_counter() - t0
+
+
+def ingest_all_pdfs(pdf_dir: Path | None = None, workers: int = 1) -> IngestionResult:
+    """
+    workers > 1 extracts text in a process pool; SQLite writes stay in this
+    process, one document at a time.
+    """
     init_db()
 
     pdf_dir = pdf_dir or settings.PDF_DIR
@@ -181,18 +331,40 @@ def ingest_all_pdfs(pdf_dir: Path | None = None) -> IngestionResult:
     ingested = 0
     skipped = 0
     pages_written = 0
+    timings: list[DocumentTiming] = []
 
+    # Only new/changed files are extracted.
+    stored = _stored_documents()
+    changed: list[Path] = []
+    checked: dict[Path, tuple[str | None, tuple[int, int]]] = {}
     for pdf in pdfs:
-        did_ingest, _, written = upsert_document_and_pages(pdf)
+        unchanged, file_hash, stat = _check_unchanged(pdf, stored.get(str(pdf)))
+        if unchanged:
+            skipped += 1
+            timings.append(DocumentTiming(pdf.name, stored[str(pdf)].page_count, 0.0, 0.0, False))
+        else:
+            changed.append(pdf)
+            checked[pdf] = (file_hash, stat)
+
+    extracted = _extract_parallel(changed, workers) if workers > 1 and changed else _extract_sequential(changed)
+    for pdf, pages, extract_s in extracted:
+        t0 = time.perf_counter()
+        file_hash, stat = checked[pdf]
+        did_ingest, _, written = _write_document(pdf, file_hash or sha256_file(pdf), pages, stat)
+        timings.append(DocumentTiming(pdf.name, len(pages), extract_s, time.perf_counter() - t0, did_ingest))
         if did_ingest:
             ingested += 1
             pages_written += written
         else:
             skipped += 1
 
+    order = {pdf.name: i for i, pdf in enumerate(pdfs)}
+    timings.sort(key=lambda t: order[t.filename])
+
     return IngestionResult(
         total_pdfs=len(pdfs),
         ingested=ingested,
         skipped_unchanged=skipped,
         pages_written=pages_written,
+        timings=timings,
     )
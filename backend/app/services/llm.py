@@ -1,17 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import bisect
+import hashlib
+import importlib.util
 import json
 import logging
 import os
+import re
+import sqlite3
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import httpx
 
+from app.core.config import settings
+
 try:
     # OpenAI python lib 
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
 except Exception:  # pragma: no cover
+    AsyncOpenAI = None  # type: ignore
     OpenAI = None  # type: ignore
 
 
@@ -62,6 +74,249 @@ def _to_float(name: str, default: float) -> float:
         raise LLMError(f"Invalid float for env var {name}: {raw}") from e
 
 
+def _to_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+# ----------------------------
+# HTTP clients + latency metrics
+# ----------------------------
+
+def _http_client_kwargs(timeout_s: int) -> Dict[str, Any]:
+    """
+    Settings shared by the long-lived sync and async HTTP clients.
+    HTTP/2 needs the optional `h2` package; without it we stay on HTTP/1.1 keep-alive.
+    """
+    http2 = _to_bool("LLM_HTTP2", True) and importlib.util.find_spec("h2") is not None
+    return {
+        "timeout": timeout_s,
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=_to_int("LLM_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=_to_int("LLM_MAX_KEEPALIVE_CONNECTIONS", 10),
+            keepalive_expiry=_to_float("LLM_KEEPALIVE_EXPIRY_SECONDS", 30.0),
+        ),
+    }
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+_LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class _LatencyHistogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float, *, ok: bool) -> None:
+        self.counts[bisect.bisect_left(_LATENCY_BUCKETS_MS, ms)] += 1
+        self.total += 1
+        self.errors += int(not ok)
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def stats(self) -> Dict[str, Any]:
+        labels = [f"le_{b}" for b in _LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.total,
+            "errors": self.errors,
+            "avg_ms": round(self.sum_ms / self.total, 1) if self.total else None,
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+_latency_lock = threading.Lock()
+_latency: Dict[str, _LatencyHistogram] = {}
+
+
+def _observe_latency(key: str, started: float, *, ok: bool) -> None:
+    ms = (time.perf_counter() - started) * 1000.0
+    with _latency_lock:
+        _latency.setdefault(key, _LatencyHistogram()).observe(ms, ok=ok)
+
+
+def llm_latency_stats() -> Dict[str, Any]:
+    """
+    Per-call latency histograms keyed "<provider>.<call>", e.g. "groq.achat" or
+    "ollama.astream.first_token".
+    """
+    with _latency_lock:
+        return {key: h.stats() for key, h in sorted(_latency.items())}
+
+
+# ----------------------------
+# Completion cache
+# ----------------------------
+
+class _CompletionCache:
+    """
+    Content-addressed completion cache in SQLite, shared by workers.
+
+    Key: sha256 over provider, model, temperature, max_tokens, response_format
+    and the exact message list. Only calls at or below LLM_CACHE_MAX_TEMPERATURE
+    are cached (higher temperatures are meant to vary). When the stored text
+    exceeds LLM_CACHE_MAX_BYTES the least recently used rows are dropped.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, max_temperature: float) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_temperature = max_temperature
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_last_used ON completions(last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def key(
+        self,
+        client: "LLMClient",
+        messages: List[LLMMessage],
+        temperature: float,
+        max_tokens: int,
+        response_format: Optional[Dict[str, Any]],
+    ) -> Optional[str]:
+        """
+        Cache key for a call, or None when the call must not be cached.
+        """
+        if self.max_bytes <= 0 or client.provider == "mock" or temperature > self.max_temperature:
+            return None
+        doc = {
+            "provider": client.provider,
+            "model": client.model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "response_format": response_format,
+            "messages": [[m.role, m.content] for m in messages],
+        }
+        return hashlib.sha256(json.dumps(doc, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        try:
+            with self._lock:
+                db = self._db()
+                row = db.execute("SELECT response FROM completions WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                db.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+                db.commit()
+                self.hits += 1
+                return row[0]
+        except sqlite3.Error:
+            logger.exception("LLM cache read failed; path=%s", self.path)
+            return None
+
+    def put(self, key: Optional[str], client: "LLMClient", response: str) -> None:
+        if key is None or not response:
+            return
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._db()
+                db.execute(
+                    """
+                    INSERT OR REPLACE INTO completions (key, provider, model, response, size, created_at, last_used)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (key, client.provider, client.model, response, size, now, now),
+                )
+                total = db.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+                if total > self.max_bytes:
+                    # Keep the most recently used rows that fit in 90% of the budget.
+                    cur = db.execute(
+                        """
+                        DELETE FROM completions WHERE key IN (
+                            SELECT key FROM (
+                                SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS running
+                                FROM completions
+                            )
+                            WHERE running > ?
+                        )
+                        """,
+                        (int(self.max_bytes * 0.9),),
+                    )
+                    self.evicted += cur.rowcount
+                db.commit()
+        except sqlite3.Error:
+            logger.exception("LLM cache write failed; path=%s", self.path)
+
+    # Async callers: the SQLite read/write (and eviction) runs in a worker thread,
+    # never on the event loop. Uncacheable calls (key None) skip the hop.
+
+    async def aget(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: Optional[str], client: "LLMClient", response: str) -> None:
+        if key is None or not response:
+            return
+        await asyncio.to_thread(self.put, key, client, response)
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "enabled": self.max_bytes > 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }
+        if self.max_bytes > 0:
+            try:
+                with self._lock:
+                    rows, size = self._db().execute(
+                        "SELECT COUNT(1), COALESCE(SUM(size), 0) FROM completions"
+                    ).fetchone()
+                out.update(entries=rows, bytes=size, max_bytes=self.max_bytes)
+            except sqlite3.Error:
+                pass
+        return out
+
+
+_completion_cache = _CompletionCache(
+    Path(os.getenv("LLM_CACHE_PATH") or settings.DATA_DIR / "llm_cache.sqlite3"),
+    _to_int("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+    _to_float("LLM_CACHE_MAX_TEMPERATURE", 0.2),
+)
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    return _completion_cache.stats()
+
+
 # ----------------------------
 # Main client
 # ----------------------------
@@ -83,6 +338,11 @@ class LLMClient:
         self.max_tokens = _to_int("LLM_MAX_TOKENS", 600)
         self.temperature = _to_float("LLM_TEMPERATURE", 0.1)
 
+        # Long-lived pooled clients (keep-alive, HTTP/2 when available), shared by
+        # every request; the OpenAI SDK clients are built on top of them.
+        self._http = httpx.Client(**_http_client_kwargs(self.timeout_s))
+        self._ahttp = httpx.AsyncClient(**_http_client_kwargs(self.timeout_s))
+
         if self.provider == "groq":
             if OpenAI is None:
                 raise LLMError(
@@ -92,10 +352,8 @@ class LLMClient:
             base_url = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
             self.model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
 
-            # Use httpx timeout for safety
-            http_client = httpx.Client(timeout=self.timeout_s)
-
-            self._client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            self._client = OpenAI(api_key=api_key, base_url=base_url, http_client=self._http)
+            self._async_client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self._ahttp)
 
         elif self.provider == "openai":
             if OpenAI is None:
@@ -105,20 +363,23 @@ class LLMClient:
             api_key = _get_env("OPENAI_API_KEY")
             base_url = os.getenv("OPENAI_BASE_URL")
             self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-            http_client = httpx.Client(timeout=self.timeout_s)
             if base_url:
-                self._client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+                self._client = OpenAI(api_key=api_key, base_url=base_url, http_client=self._http)
+                self._async_client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self._ahttp)
             else:
-                self._client = OpenAI(api_key=api_key, http_client=http_client)
+                self._client = OpenAI(api_key=api_key, http_client=self._http)
+                self._async_client = AsyncOpenAI(api_key=api_key, http_client=self._ahttp)
 
         elif self.provider == "ollama":
             self.model = os.getenv("OLLAMA_MODEL", "llama3.1:latest")
             self.base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434").rstrip("/")
             self._client = None
+            self._async_client = None
 
         elif self.provider == "mock":
             self.model = "mock"
             self._client = None
+            self._async_client = None
 
         else:
             raise LLMError(f"Unsupported LLM_PROVIDER: {self.provider}")
@@ -134,32 +395,119 @@ class LLMClient:
     ) -> str:
         """
         Basic chat completion. Returns assistant text.
+        Low-temperature calls are served from the completion cache when the
+        exact same request was answered before.
+        """
+        key = self._cache_key(messages, temperature, max_tokens, response_format)
+        cached = _completion_cache.get(key)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        ok = False
+        try:
+            text = self._chat(messages, temperature=temperature, max_tokens=max_tokens, response_format=response_format)
+            ok = True
+        finally:
+            _observe_latency(f"{self.provider}.chat", started, ok=ok)
+        _completion_cache.put(key, self, text)
+        return text
+
+    async def achat(
+        self,
+        messages: List[LLMMessage],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        chat() for async callers; waits on the provider without holding a thread.
+        """
+        key = self._cache_key(messages, temperature, max_tokens, response_format)
+        cached = await _completion_cache.aget(key)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        ok = False
+        try:
+            text = await self._achat(
+                messages, temperature=temperature, max_tokens=max_tokens, response_format=response_format
+            )
+            ok = True
+        finally:
+            _observe_latency(f"{self.provider}.achat", started, ok=ok)
+        await _completion_cache.aput(key, self, text)
+        return text
+
+    async def astream(
+        self,
+        messages: List[LLMMessage],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> AsyncIterator[str]:
         """
+        Stream the assistant text as it is generated (text deltas, unstripped).
+        A cached completion is yielded as a single delta.
+        """
+        key = self._cache_key(messages, temperature, max_tokens, None)
+        cached = await _completion_cache.aget(key)
+        if cached is not None:
+            yield cached
+            return
+
+        started = time.perf_counter()
+        first = True
+        ok = False
+        parts: List[str] = []
+        try:
+            async for delta in self._astream(messages, temperature=temperature, max_tokens=max_tokens):
+                if first:
+                    _observe_latency(f"{self.provider}.astream.first_token", started, ok=True)
+                    first = False
+                parts.append(delta)
+                yield delta
+            ok = True
+        finally:
+            _observe_latency(f"{self.provider}.astream", started, ok=ok)
+        # Only complete streams are cached; an abandoned one never gets here.
+        await _completion_cache.aput(key, self, "".join(parts).strip())
+
+    def _cache_key(
+        self,
+        messages: List[LLMMessage],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        response_format: Optional[Dict[str, Any]],
+    ) -> Optional[str]:
+        return _completion_cache.key(
+            self,
+            messages,
+            self.temperature if temperature is None else temperature,
+            self.max_tokens if max_tokens is None else max_tokens,
+            response_format,
+        )
+
+    def _chat(
+        self,
+        messages: List[LLMMessage],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
         if self.provider == "mock":
             return self._mock_response(messages)
 
         if self.provider == "ollama":
-            temp = self.temperature if temperature is None else temperature
-            mx = self.max_tokens if max_tokens is None else max_tokens
-            prompt = _messages_to_prompt(messages)
             try:
-                with httpx.Client(timeout=self.timeout_s) as client:
-                    resp = client.post(
-                        f"{self.base_url}/api/generate",
-                        json={
-                            "model": self.model,
-                            "prompt": prompt,
-                            "stream": False,
-                            "options": {"temperature": temp, "num_predict": mx},
-                        },
-                    )
-                if resp.status_code >= 400:
-                    raise LLMError(
-                        f"LLM call failed ({self.provider}) status={resp.status_code}: {resp.text}"
-                    )
-                data = resp.json()
-                text = (data.get("response") or "").strip()
-                return text
+                resp = self._http.post(
+                    f"{self.base_url}/api/generate",
+                    json=self._ollama_payload(messages, temperature, max_tokens),
+                )
+                return self._ollama_text(resp)
             except LLMError:
                 raise
             except Exception as e:
@@ -167,31 +515,173 @@ class LLMClient:
 
         # groq
         assert self._client is not None
-        temp = self.temperature if temperature is None else temperature
-        mx = self.max_tokens if max_tokens is None else max_tokens
+        try:
+            resp = self._client.chat.completions.create(
+                **self._completion_kwargs(messages, temperature, max_tokens, response_format)
+            )
+            text = (resp.choices[0].message.content or "").strip()
+            return text
 
-        payload_messages = [{"role": m.role, "content": m.content} for m in messages]
+        except Exception as e:
+            raise self._provider_error(e) from e
 
-        try:
-            # response_format is optional; if you later want JSON mode you can pass it.
-            kwargs: Dict[str, Any] = {}
-            if response_format:
-                kwargs["response_format"] = response_format
+    async def _achat(
+        self,
+        messages: List[LLMMessage],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        if self.provider == "mock":
+            return self._mock_response(messages)
 
-            resp = self._client.chat.completions.create(
-                model=self.model,
-                messages=payload_messages,
-                temperature=temp,
-                max_tokens=mx,
-                **kwargs,
+        if self.provider == "ollama":
+            try:
+                resp = await self._ahttp.post(
+                    f"{self.base_url}/api/generate",
+                    json=self._ollama_payload(messages, temperature, max_tokens),
+                )
+                return self._ollama_text(resp)
+            except LLMError:
+                raise
+            except Exception as e:
+                raise LLMError(f"LLM call failed ({self.provider}): {e}") from e
+
+        assert self._async_client is not None
+        try:
+            resp = await self._async_client.chat.completions.create(
+                **self._completion_kwargs(messages, temperature, max_tokens, response_format)
             )
             text = (resp.choices[0].message.content or "").strip()
             return text
 
         except Exception as e:
-            status = getattr(getattr(e, "response", None), "status_code", None)
-            suffix = f" status={status}" if status else ""
-            raise LLMError(f"LLM call failed ({self.provider}){suffix}: {e}") from e
+            raise self._provider_error(e) from e
+
+    async def _astream(
+        self,
+        messages: List[LLMMessage],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        if self.provider == "mock":
+            # Word-sized deltas so streaming clients can be exercised offline.
+            for piece in re.findall(r"\S+\s*", self._mock_response(messages)):
+                yield piece
+                await asyncio.sleep(0)
+            return
+
+        if self.provider == "ollama":
+            payload = {**self._ollama_payload(messages, temperature, max_tokens), "stream": True}
+            try:
+                async with self._ahttp.stream("POST", f"{self.base_url}/api/generate", json=payload) as resp:
+                    if resp.status_code >= 400:
+                        await resp.aread()
+                        raise LLMError(
+                            f"LLM call failed ({self.provider}) status={resp.status_code}: {resp.text}"
+                        )
+                    # Newline-delimited JSON objects, the last one has done=true.
+                    async for line in resp.aiter_lines():
+                        if not line.strip():
+                            continue
+                        data = json.loads(line)
+                        if data.get("error"):
+                            raise LLMError(f"LLM call failed ({self.provider}): {data['error']}")
+                        if data.get("response"):
+                            yield data["response"]
+                        if data.get("done"):
+                            break
+            except LLMError:
+                raise
+            except Exception as e:
+                raise LLMError(f"LLM call failed ({self.provider}): {e}") from e
+            return
+
+        assert self._async_client is not None
+        try:
+            stream = await self._async_client.chat.completions.create(
+                **self._completion_kwargs(messages, temperature, max_tokens, None),
+                stream=True,
+            )
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        except Exception as e:
+            raise self._provider_error(e) from e
+
+    def close(self) -> None:
+        """
+        Close both pools from sync code. The async pool is closed on the running
+        loop when there is one (the task is kept referenced until it finishes),
+        otherwise on a short-lived loop.
+        """
+        self._http.close()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            task = loop.create_task(self._ahttp.aclose())
+            _closing_tasks.add(task)
+            task.add_done_callback(_closing_tasks.discard)
+            return
+        try:
+            asyncio.run(self._ahttp.aclose())
+        except Exception:
+            logger.debug("async LLM pool close failed", exc_info=True)
+
+    async def aclose(self) -> None:
+        self._http.close()
+        await self._ahttp.aclose()
+
+    def _ollama_payload(
+        self,
+        messages: List[LLMMessage],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+    ) -> Dict[str, Any]:
+        temp = self.temperature if temperature is None else temperature
+        mx = self.max_tokens if max_tokens is None else max_tokens
+        return {
+            "model": self.model,
+            "prompt": _messages_to_prompt(messages),
+            "stream": False,
+            "options": {"temperature": temp, "num_predict": mx},
+        }
+
+    def _ollama_text(self, resp: httpx.Response) -> str:
+        if resp.status_code >= 400:
+            raise LLMError(
+                f"LLM call failed ({self.provider}) status={resp.status_code}: {resp.text}"
+            )
+        data = resp.json()
+        return (data.get("response") or "").strip()
+
+    def _completion_kwargs(
+        self,
+        messages: List[LLMMessage],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        response_format: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "model": self.model,
+            "messages": [{"role": m.role, "content": m.content} for m in messages],
+            "temperature": self.temperature if temperature is None else temperature,
+            "max_tokens": self.max_tokens if max_tokens is None else max_tokens,
+        }
+        # response_format is optional; if you later want JSON mode you can pass it.
+        if response_format:
+            kwargs["response_format"] = response_format
+        return kwargs
+
+    def _provider_error(self, e: Exception) -> LLMError:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        suffix = f" status={status}" if status else ""
+        return LLMError(f"LLM call failed ({self.provider}){suffix}: {e}")
 
     def chat_json(
         self,
@@ -244,17 +734,34 @@ class LLMClient:
 
 # Singleton helper (simple + practical)
 _llm_singleton: Optional[LLMClient] = None
+# async pool closes scheduled by LLMClient.close() on a running loop
+_closing_tasks: set[asyncio.Task] = set()
 
 
 def get_llm(*, force_reload: bool = False) -> LLMClient:
     global _llm_singleton
-    if force_reload or _llm_singleton is None:
+    if force_reload and _llm_singleton is not None:
+        previous, _llm_singleton = _llm_singleton, None
+        previous.close()
+    if _llm_singleton is None:
         _llm_singleton = LLMClient()
     return _llm_singleton
 
 
 def reset_llm() -> None:
     global _llm_singleton
+    if _llm_singleton is not None:
+        _llm_singleton.close()
+    _llm_singleton = None
+
+
+async def shutdown_llm() -> None:
+    """
+    Close the pooled HTTP connections (app shutdown).
+    """
+    global _llm_singleton
+    if _llm_singleton is not None:
+        await _llm_singleton.aclose()
     _llm_singleton = None
 
 
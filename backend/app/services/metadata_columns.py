@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+
+_SCOPE_DOC_TYPES = {
+    "standspec": "standspec",
+    "scheduling": "scheduling",
+    "mp": "mp",
+    "mp_only": "mp",
+}
+
+_MASK_CACHE_SIZE = 64
+
+
+def _encode(values: list[str]) -> tuple[np.ndarray, list[str]]:
+    """
+    Dictionary-encode strings; "" maps to code -1.
+    """
+    vocab: dict[str, int] = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, v in enumerate(values):
+        codes[i] = vocab.setdefault(v, len(vocab)) if v else -1
+    return codes, list(vocab)
+
+
+class MetadataColumns:
+    """
+    Per-row metadata as NumPy columns, aligned with an index's corpus order.
+
+    Scope filters become boolean masks computed once per (scope, mp_ids) and
+    cached on the columns object, so they are dropped with the index generation
+    that owns them.
+    """
+
+    def __init__(
+        self,
+        doc_types: list[Optional[str]],
+        mp_ids: list[Optional[str]],
+        chunk_kinds: list[Optional[str]] | None = None,
+        equation_scores: np.ndarray | None = None,
+    ):
+        self.n = len(doc_types)
+        self.doc_type_codes, self.doc_types = _encode([(v or "").lower() for v in doc_types])
+        self.mp_id_codes, self.mp_ids = _encode([(v or "").upper() for v in mp_ids])
+        self.chunk_kind_codes, self.chunk_kinds = _encode([v or "" for v in (chunk_kinds or [None] * self.n)])
+        self.equation_scores = (
+            np.asarray(equation_scores, dtype=np.float64) if equation_scores is not None else np.zeros(self.n)
+        )
+
+        self._masks: OrderedDict[tuple[str, tuple[str, ...]], Optional[np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_meta(meta: list[dict[str, Any]]) -> "MetadataColumns":
+        return MetadataColumns(
+            [m.get("doc_type") for m in meta],
+            [m.get("mp_id") for m in meta],
+            [m.get("chunk_kind") for m in meta],
+            np.array([float(m.get("equation_score") or 0) for m in meta], dtype=np.float64),
+        )
+
+    @staticmethod
+    def from_store(store: Any) -> "MetadataColumns":
+        return MetadataColumns(
+            store.string_column("doc_type"),
+            store.string_column("mp_id"),
+            store.string_column("chunk_kind"),
+            store.equation_scores,
+        )
+
+    def _code_mask(self, codes: np.ndarray, vocab: list[str], wanted: set[str]) -> np.ndarray:
+        ids = [i for i, v in enumerate(vocab) if v in wanted]
+        return np.isin(codes, np.asarray(ids, dtype=np.int32))
+
+    def _build_scope_mask(self, scope: str, mp_ids: tuple[str, ...]) -> Optional[np.ndarray]:
+        doc_type = _SCOPE_DOC_TYPES.get(scope)
+        if doc_type is None:
+            return None
+        mask = self._code_mask(self.doc_type_codes, self.doc_types, {doc_type})
+        if scope == "mp_only":
+            mask &= self._code_mask(self.mp_id_codes, self.mp_ids, set(mp_ids))
+        mask.flags.writeable = False
+        return mask
+
+    def scope_mask(self, scope: str, mp_ids: list[str] | None = None) -> Optional[np.ndarray]:
+        """
+        Rows allowed by scope/mp_ids, or None when nothing is filtered ("all" or unknown scope).
+        """
+        key = (scope, tuple(sorted({m.upper() for m in (mp_ids or [])})) if scope == "mp_only" else ())
+        with self._lock:
+            if key in self._masks:
+                self._masks.move_to_end(key)
+                return self._masks[key]
+        mask = self._build_scope_mask(*key)
+        with self._lock:
+            self._masks[key] = mask
+            while len(self._masks) > _MASK_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        return mask
+
+    def filter_mask(
+        self,
+        scope: str,
+        mp_ids: list[str] | None = None,
+        min_equation_score: float | None = None,
+    ) -> Optional[np.ndarray]:
+        mask = self.scope_mask(scope, mp_ids)
+        if min_equation_score is None:
+            return mask
+        eq_ok = self.equation_scores >= min_equation_score
+        return eq_ok if mask is None else (mask & eq_ok)
+
+
+def ranked_indices(scores: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    # Score descending, corpus order on ties (same order as a stable sort).
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def top_indices(scores: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    """
+    Top-k of candidates by score via argpartition. Everything tied with the
+    k-th score is kept before the final sort so tie order stays deterministic.
+    """
+    if k <= 0:
+        return candidates[:0]
+    if len(candidates) > k:
+        cand_scores = scores[candidates]
+        kth = cand_scores[np.argpartition(-cand_scores, k - 1)[k - 1]]
+        candidates = candidates[cand_scores >= kth]
+    return ranked_indices(scores, candidates)[:k]
+
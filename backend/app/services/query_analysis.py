@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Optional
+
+import numpy as np
+
+from app.services.bm25_chunks import tokenize as tokenize_chunks
+from app.services.rerank import is_section_intent
+
+_SECTION_ID_RE = r"\d{3}\.\d{2}(?:\.\d{2})?"
+
+_TABLE_QUERY_RE = re.compile(r"\b(table|tbl|tab\.)\b", re.I)
+_EQUATION_QUERY_RE = re.compile(
+    r"\b(equation|equations|formula|calculate|calculation|compute|how to compute|pay adjustment|ppa|pd|ql|iri)\b",
+    re.I,
+)
+_TABLE_TOKEN_RE = re.compile(r"\btable\s*(\d{3}\.\d{2}\.\d{2}-\d+|\d{3}\.\d{2}-\d+)\b", re.I)
+_TABLE_REF_RE = re.compile(r"\btable\s*([0-9]{3}\.[0-9]{2}-[0-9]+)\b")
+_EXPLICIT_TABLE_TOKEN_RE = re.compile(r"\d{3}\.\d{2}\.\d{2}-\d+")
+
+_LOCATION_TRIGGERS = (
+    "which section",
+    "what section",
+    "section number",
+    "section id",
+    "what page",
+    "which page",
+    "page number",
+    "where in the manual",
+    "where in the spec",
+    "where can i find",
+    "cite",
+    "citation",
+    "reference",
+)
+
+_FOCUS_PHRASES = (" days", " day", " within ", " interest", " subcontractor", " supplier", " receipt", " prime rate")
+
+
+# ---- query parsers (each also usable on its own) ----
+
+
+def extract_section_dot(query: str) -> str | None:
+    # supports 701.02 and 701.02.01
+    m = re.search(rf"\b({_SECTION_ID_RE})\b", query or "")
+    return m.group(1) if m else None
+
+
+def extract_section_prefix(query: str) -> str | None:
+    q = query or ""
+    m = re.search(r"\bsection\s*(\d{3})\b", q, re.I)
+    if m:
+        return m.group(1)
+    m = re.search(r"\b§\s*(\d{3})\b", q)
+    if m:
+        return m.group(1)
+    return None
+
+
+# Exact section IDs like:
+# 701.02
+# 701.02.01
+# 105.01.02
+def extract_exact_section_id(query: str) -> str | None:
+    q = (query or "").strip()
+    if re.fullmatch(_SECTION_ID_RE, q):
+        return q
+    m = re.match(rf"^\s*({_SECTION_ID_RE})\b", q)
+    return m.group(1) if m else None
+
+
+# Section prefix ONLY when user explicitly signals it:
+# "Section 701" or "§701"
+# (NOT any random 3 digits in the sentence)
+def extract_lookup_prefix(query: str) -> str | None:
+    q = query or ""
+    prefix = extract_section_prefix(q)
+    if prefix:
+        return prefix
+
+    # Allow bare "701" ONLY if the query is basically just that token
+    # (prevents accidental prefix extraction in normal sentences)
+    if re.fullmatch(r"\s*\d{3}\s*", q.strip()):
+        return q.strip()
+
+    return None
+
+
+def is_bare_section_id_query(query: str) -> bool:
+    return bool(re.fullmatch(rf"\s*{_SECTION_ID_RE}\s*", query or ""))
+
+
+def is_table_query(q: str) -> bool:
+    return bool(_TABLE_QUERY_RE.search(q or ""))
+
+
+def is_equation_query(q: str) -> bool:
+    return bool(_EQUATION_QUERY_RE.search(q or ""))
+
+
+def looks_like_table_query(q: str) -> bool:
+    s = (q or "").lower()
+    return any(w in s for w in ["table", "tab.", "chart", "tbl", "requirements table"])
+
+
+def extract_table_token(query: str) -> str | None:
+    m = _TABLE_TOKEN_RE.search(query or "")
+    return m.group(1) if m else None
+
+
+def asks_for_section_or_page(query: str) -> bool:
+    q = (query or "").lower()
+    if any(t in q for t in _LOCATION_TRIGGERS):
+        return True
+    return bool(re.search(rf"\b{_SECTION_ID_RE}\b", q, re.I))
+
+
+def focus_patterns(query: str) -> tuple[re.Pattern[str], ...]:
+    """
+    Patterns a query-focused snippet is centered on: phrases we commonly care
+    about, statute ids, plain numbers and the first 12 longer keywords.
+    """
+    q = (query or "").lower()
+    patterns: list[str] = []
+
+    for ph in _FOCUS_PHRASES:
+        if ph.strip() in q:
+            patterns.append(re.escape(ph.strip()))
+
+    # statute patterns like "52:32-40"
+    for s in re.findall(r"\b\d{1,3}:\d{1,3}-\d+\b", q):
+        patterns.append(re.escape(s))
+
+    # any plain numbers
+    for n in re.findall(r"\b\d+\b", q):
+        patterns.append(rf"\b{re.escape(n)}\b")
+
+    # keywords
+    q_terms = [w for w in re.findall(r"[a-z0-9]+", q) if len(w) >= 4]
+    for w in q_terms[:12]:
+        patterns.append(rf"\b{re.escape(w)}\b")
+
+    return tuple(re.compile(p, re.I) for p in patterns)
+
+
+# ---- per-request analysis ----
+
+
+@dataclass(frozen=True)
+class QueryAnalysis:
+    """
+    Everything the ask pipeline derives from the query text, parsed once per
+    request and passed down through retrieval and answer shaping.
+    The embedding is computed on first use (not every path runs a dense search).
+    """
+
+    text: str
+    chunk_tokens: list[str]
+    section_intent: bool
+    # first section id anywhere in the query / "Section 701" or "§701"
+    section_dot: Optional[str]
+    section_prefix: Optional[str]
+    # section id the query starts with / explicit prefix or a bare "701"
+    exact_section_id: Optional[str]
+    lookup_prefix: Optional[str]
+    bare_section_id: bool
+    asks_for_location: bool
+    equation_intent: bool
+    # "table"/"tbl"/"tab." as a word / any table-ish wording ("chart", "tables", ...)
+    table_query: bool
+    table_wording: bool
+    # "Table 701.03.15-1" or "Table 901.03-1" / the short "901.03-1" form (lowercase query)
+    table_token: Optional[str]
+    table_ref: Optional[str]
+    focus: tuple[re.Pattern[str], ...]
+
+    @property
+    def explicit_table_token(self) -> bool:
+        return bool(self.table_token and _EXPLICIT_TABLE_TOKEN_RE.fullmatch(self.table_token))
+
+    @cached_property
+    def query_vector(self) -> np.ndarray:
+        """
+        (1, D) normalized query embedding.
+        """
+        from app.services.embeddings import embed_texts
+
+        return embed_texts([self.text])
+
+
+def analyze_query(query: str) -> QueryAnalysis:
+    q = query or ""
+    m = _TABLE_REF_RE.search(q.lower())
+    return QueryAnalysis(
+        text=q,
+        chunk_tokens=tokenize_chunks(q),
+        section_intent=is_section_intent(q),
+        section_dot=extract_section_dot(q),
+        section_prefix=extract_section_prefix(q),
+        exact_section_id=extract_exact_section_id(q),
+        lookup_prefix=extract_lookup_prefix(q),
+        bare_section_id=is_bare_section_id_query(q),
+        asks_for_location=asks_for_section_or_page(q),
+        equation_intent=is_equation_query(q),
+        table_query=is_table_query(q),
+        table_wording=looks_like_table_query(q),
+        table_token=extract_table_token(q),
+        table_ref=m.group(1) if m else None,
+        focus=focus_patterns(q),
+    )
+
+
+# ---- planner ----
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """
+    Which retrieval stages can apply to a query; the rest are skipped rather
+    than run and discarded.
+    """
+
+    # explicit "Table 701.03.15-1" in answer mode: direct table lookup
+    table_prelookup: bool
+    # query starts with a section id: fetch that section from SQLite
+    exact_section: bool
+    # "Section 701" / bare "701": fetch the section family, rerank with BM25
+    prefix_sections: bool
+    # vector search; a bare section id has no meaning to embed, BM25 matches it exactly
+    dense: bool
+    # equation-filtered candidate pools fused as a third list
+    equation_pools: bool
+
+
+def plan_query(analysis: QueryAnalysis, mode: str = "answer") -> QueryPlan:
+    return QueryPlan(
+        table_prelookup=analysis.explicit_table_token and mode == "answer",
+        exact_section=analysis.exact_section_id is not None,
+        prefix_sections=bool(
+            analysis.lookup_prefix and not analysis.exact_section_id and analysis.section_intent
+        ),
+        dense=not analysis.bare_section_id,
+        equation_pools=analysis.equation_intent,
+    )
@@ -19,7 +19,12 @@ def toc_penalty(text: str, strong: bool = False) -> float:
     Returns multiplier in (0,1].
     strong=True for section-intent queries.
     """
-    n = toc_entry_count(text)
+    return toc_penalty_for_count(toc_entry_count(text), strong=strong)
+
+def toc_penalty_for_count(n: int, strong: bool = False) -> float:
+    """
+    toc_penalty for a precomputed TOC entry count.
+    """
     if n <= 0:
         return 1.0
     if strong:
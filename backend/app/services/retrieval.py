@@ -1,7 +1,7 @@
 from typing import Optional, List
 
 from app.schemas.retrieval import RetrievalRequest, RetrievalResponse, Citation
-from app.services.ask import ask_question
+from app.services.ask import ask_question, ask_question_async
 from app.services.bm25 import bm25_search_filtered
 
 def retrieve(req: RetrievalRequest) -> RetrievalResponse:
@@ -54,3 +54,22 @@ def chat_retrieve(
         k=k,
         mode=mode,
     )
+
+
+async def chat_retrieve_async(
+    query: str,
+    scope: str,
+    mp_ids: Optional[List[str]] = None,
+    k: int = 5,
+    mode: str = "answer",
+) -> dict:
+    """
+    Async chat_retrieve used by the async /chat/ask route.
+    """
+    return await ask_question_async(
+        query=query,
+        scope=scope,
+        mp_ids=mp_ids,
+        k=k,
+        mode=mode,
+    )
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from app.services.db import get_conn
+
+
+@dataclass(frozen=True)
+class SectionChunk:
+    page_start: int
+    chunk_id: int
+    document_id: int
+
+
+@dataclass(frozen=True)
+class SectionInfo:
+    document_id: int
+    section_id: str
+    parent_section_id: Optional[str]
+    depth: int
+    ordinal: int
+    heading: Optional[str]
+    page_start: int
+    page_end: int
+    first_chunk_id: int
+    last_chunk_id: int
+    chunk_count: int
+
+
+class SectionMap:
+    """
+    Sorted section id -> content chunks, loaded once per index generation.
+
+    Section ids are zero-padded ("701", "701.03", "701.03.01"), so a section
+    and all of its descendants are one contiguous run of the sorted keys:
+    "701" resolves with a single bisect over ["701", "701/") ('/' sorts right
+    after '.').
+    """
+
+    def __init__(
+        self,
+        sections: list[SectionInfo],
+        chunks: dict[str, list[SectionChunk]],
+        state: Optional[tuple] = None,
+    ) -> None:
+        self.sections = sections
+        # section_state() of the rows the map was loaded from
+        self.state = state
+        self.keys: list[str] = sorted(chunks)
+        # per key, ordered like the SQL lookups: page_start, then chunk id
+        self._chunks: list[list[SectionChunk]] = [chunks[k] for k in self.keys]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _range(self, section_id: str, *, children: bool) -> tuple[int, int]:
+        lo = bisect_left(self.keys, section_id)
+        if not children:
+            hi = lo + 1 if lo < len(self.keys) and self.keys[lo] == section_id else lo
+            return lo, hi
+        return lo, bisect_left(self.keys, section_id + "/", lo)
+
+    def chunks(self, section_id: str, *, children: bool = False) -> Iterator[SectionChunk]:
+        """
+        Content chunks of `section_id` (and its subsections when children=True),
+        ordered by (page_start, chunk_id).
+        """
+        lo, hi = self._range(section_id, children=children)
+        # the run could also hold odd ids like "701-A"; keep the section and its dotted children
+        lists = [
+            self._chunks[i]
+            for i in range(lo, hi)
+            if self.keys[i] == section_id or self.keys[i].startswith(section_id + ".")
+        ]
+        if len(lists) == 1:
+            return iter(lists[0])
+        return heapq.merge(*lists, key=lambda c: (c.page_start, c.chunk_id))
+
+    def chunk_ids(
+        self,
+        section_id: str,
+        *,
+        children: bool = False,
+        document_ids: Optional[set[int]] = None,
+        limit: Optional[int] = None,
+    ) -> list[int]:
+        out: list[int] = []
+        for c in self.chunks(section_id, children=children):
+            if document_ids is not None and c.document_id not in document_ids:
+                continue
+            out.append(c.chunk_id)
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+
+def section_state(conn=None) -> tuple:
+    """
+    Cheap identity of the chunk build in SQLite: the chunks AUTOINCREMENT high-water
+    mark (grows on every re-chunk) plus the chunk_builds ledger size and chunk total
+    (change when documents are dropped). Any rebuild_chunks run that changes
+    sections changes this tuple.
+    """
+    if conn is None:
+        with get_conn(readonly=True) as c:
+            return section_state(c)
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'chunks'").fetchone()
+    docs, chunks = conn.execute("SELECT COUNT(1), COALESCE(SUM(chunk_count), 0) FROM chunk_builds").fetchone()
+    return (int(seq[0]) if seq else 0, int(docs), int(chunks))
+
+
+def load_section_map() -> SectionMap:
+    """
+    Build the SectionMap from the sections table and the chunks it covers.
+    Raises sqlite3.OperationalError on databases without the sections table.
+    """
+    with get_conn(readonly=True) as conn:
+        state = section_state(conn)
+        section_rows = conn.execute(
+            """
+            SELECT document_id, section_id, parent_section_id, depth, ordinal, heading,
+                   page_start, page_end, first_chunk_id, last_chunk_id, chunk_count
+            FROM sections
+            ORDER BY section_id, document_id
+            """
+        ).fetchall()
+        chunk_rows = conn.execute(
+            """
+            SELECT c.id, c.document_id, c.section_id, c.page_start
+            FROM chunks c
+            JOIN sections s ON s.document_id = c.document_id AND s.section_id = c.section_id
+            WHERE (c.chunk_kind IS NULL OR c.chunk_kind NOT IN ('toc', 'front_matter'))
+            ORDER BY c.section_id, c.page_start, c.id
+            """
+        ).fetchall()
+
+    sections = [
+        SectionInfo(
+            document_id=int(r["document_id"]),
+            section_id=r["section_id"],
+            parent_section_id=r["parent_section_id"],
+            depth=int(r["depth"]),
+            ordinal=int(r["ordinal"]),
+            heading=r["heading"],
+            page_start=int(r["page_start"]),
+            page_end=int(r["page_end"]),
+            first_chunk_id=int(r["first_chunk_id"]),
+            last_chunk_id=int(r["last_chunk_id"]),
+            chunk_count=int(r["chunk_count"]),
+        )
+        for r in section_rows
+    ]
+    chunks: dict[str, list[SectionChunk]] = {}
+    for r in chunk_rows:
+        chunks.setdefault(r["section_id"], []).append(
+            SectionChunk(page_start=int(r["page_start"]), chunk_id=int(r["id"]), document_id=int(r["document_id"]))
+        )
+    return SectionMap(sections, chunks, state)
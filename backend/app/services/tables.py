@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 import re
+import sqlite3
 from typing import Optional, Iterable
 
 from app.services.db import get_conn
@@ -39,7 +40,7 @@ class TableCell:
 
 
 def get_table_meta(table_uid: str) -> TableMeta | None:
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         r = conn.execute(
             """
             SELECT
@@ -79,16 +80,29 @@ def get_table_meta(table_uid: str) -> TableMeta | None:
 
 
 def get_table_uids() -> list[str]:
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         rows = conn.execute(
             "SELECT table_uid FROM tables ORDER BY table_uid ASC",
         ).fetchall()
     return [r["table_uid"] for r in rows]
 
 
+def load_table_row_counts() -> dict[str, int]:
+    """
+    table_uid -> row count for every structured table.
+    Falls back to counting table_rows on databases without tables.row_count.
+    """
+    with get_conn(readonly=True) as conn:
+        try:
+            rows = conn.execute("SELECT table_uid, row_count AS n FROM tables").fetchall()
+        except sqlite3.OperationalError:
+            rows = conn.execute("SELECT table_uid, COUNT(1) AS n FROM table_rows GROUP BY table_uid").fetchall()
+    return {r["table_uid"]: int(r["n"] or 0) for r in rows}
+
+
 def get_table_rows(table_uid: str, limit: int = 200) -> list[TableRow]:
     limit = min(int(limit), 80)
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         rows = conn.execute(
             """
             SELECT table_uid, row_index, row_text
@@ -111,7 +125,7 @@ def get_table_rows(table_uid: str, limit: int = 200) -> list[TableRow]:
 
 
 def get_all_table_rows(table_uid: str) -> list[TableRow]:
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         rows = conn.execute(
             """
             SELECT table_uid, row_index, row_text
@@ -133,7 +147,7 @@ def get_all_table_rows(table_uid: str) -> list[TableRow]:
 
 
 def get_table_cells(table_uid: str) -> list[TableCell]:
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         rows = conn.execute(
             """
             SELECT table_uid, row_num, col_num, cell_text, row_index_min, row_index_max
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+from pathlib import Path
+from typing import Any, Optional
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services.index_registry import atomic_output
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# Filtered ANN searches over at most this many allowed rows score them exactly.
+_EXACT_SCAN_MAX_ROWS = 4096
+
+
+def params_path(index_path: Path) -> Path:
+    """
+    Build parameters are persisted next to the index, e.g. faiss_chunks.index.json.
+    """
+    return index_path.with_name(index_path.name + ".json")
+
+
+def _ivf_nlist(n: int) -> int:
+    nlist = settings.FAISS_IVF_NLIST or int(4 * math.sqrt(n))
+    # k-means wants ~39 training points per centroid.
+    return max(1, min(nlist, n // 39))
+
+
+def build_vector_index(vecs: np.ndarray, index_type: str | None = None) -> tuple[faiss.Index, dict[str, Any]]:
+    """
+    Build an inner-product index over normalized vectors.
+    Returns the index and the parameters it was built with.
+    Corpora too small to train PQ fall back to ivf_flat, and too small
+    for IVF to flat; the returned params record the type actually built.
+    """
+    index_type = (index_type or settings.FAISS_INDEX_TYPE).lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS_INDEX_TYPE: {index_type!r} (expected one of {', '.join(INDEX_TYPES)})")
+
+    n, dim = vecs.shape
+    params: dict[str, Any] = {"index_type": index_type, "dim": int(dim), "ntotal": int(n)}
+
+    if index_type == "ivf_pq" and (dim % settings.FAISS_PQ_M or n < 39 * (1 << settings.FAISS_PQ_NBITS)):
+        logger.warning("ivf_pq needs dim %% pq_m == 0 and enough rows to train; building ivf_flat; n=%d dim=%d", n, dim)
+        index_type = params["index_type"] = "ivf_flat"
+    if index_type in ("ivf_flat", "ivf_pq") and n < 39:
+        logger.warning("too few rows to train IVF; building flat; n=%d", n)
+        index_type = params["index_type"] = "flat"
+
+    if index_type == "flat":
+        index: faiss.Index = faiss.IndexFlatIP(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, settings.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = settings.FAISS_HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+        params.update(
+            M=settings.FAISS_HNSW_M,
+            ef_construction=settings.FAISS_HNSW_EF_CONSTRUCTION,
+            ef_search=settings.FAISS_HNSW_EF_SEARCH,
+        )
+    else:
+        nlist = _ivf_nlist(n)
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(
+                quantizer, dim, nlist, settings.FAISS_PQ_M, settings.FAISS_PQ_NBITS, faiss.METRIC_INNER_PRODUCT
+            )
+            params.update(pq_m=settings.FAISS_PQ_M, pq_nbits=settings.FAISS_PQ_NBITS)
+        index.train(vecs)
+        index.nprobe = min(settings.FAISS_IVF_NPROBE, nlist)
+        params.update(nlist=nlist, nprobe=int(index.nprobe))
+
+    index.add(vecs)
+    return index, params
+
+
+def write_vector_index(index: faiss.Index, params: dict[str, Any], index_path: Path) -> None:
+    with atomic_output(index_path) as tmp:
+        faiss.write_index(index, str(tmp))
+    with atomic_output(params_path(index_path)) as tmp:
+        tmp.write_text(json.dumps(params, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def read_index_params(index_path: Path) -> dict[str, Any]:
+    p = params_path(index_path)
+    if not p.exists():
+        # Indexes built before index types were configurable are flat.
+        return {"index_type": "flat"}
+    return json.loads(p.read_text(encoding="utf-8"))
+
+
+def _io_flags() -> int:
+    if not settings.INDEX_MMAP:
+        return 0
+    # IO_FLAG_MMAP_IFC (faiss >= 1.9) also maps flat/HNSW vector storage;
+    # plain IO_FLAG_MMAP only maps IVF inverted lists.
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+
+def read_vector_index(index_path: Path) -> tuple[faiss.Index, dict[str, Any]]:
+    """
+    Load an index and prepare it for querying. Search-time knobs (efSearch,
+    nprobe) come from Settings so they can be tuned without a rebuild; IVF
+    indexes get a direct map so narrow scopes can be scored exactly via
+    reconstruct_batch. With INDEX_MMAP the vectors/inverted lists are mapped
+    from the file rather than copied, so workers share them.
+    """
+    index = faiss.read_index(str(index_path), _io_flags())
+    params = read_index_params(index_path)
+
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(settings.FAISS_IVF_NPROBE, ivf.nlist)
+        ivf.make_direct_map()
+    return index, params
+
+
+def search_params(index: faiss.Index, mask: Optional[np.ndarray]) -> Optional[faiss.SearchParameters]:
+    """
+    Restrict a FAISS search to rows inside `mask`, so scoped searches return
+    exactly k allowed rows instead of over-fetching and post-filtering.
+    Typed per index so efSearch/nprobe are carried over rather than reset.
+    """
+    if mask is None:
+        return None
+    sel = faiss.IDSelectorBatch(np.flatnonzero(mask).astype(np.int64))
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=index.hnsw.efSearch)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=sel, nprobe=ivf.nprobe)
+    return faiss.SearchParameters(sel=sel)
+
+
+def search(
+    index: faiss.Index,
+    qv: np.ndarray,
+    k: int,
+    mask: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k (scores, row ids) for one query vector, restricted to `mask`.
+    Narrow scopes on ANN indexes are scanned exactly: they are cheap, and a
+    graph/IVF walk under a very selective filter can miss allowed rows entirely.
+    """
+    ids: Optional[np.ndarray] = None
+    if mask is not None:
+        ids = np.flatnonzero(mask)
+        if not isinstance(index, faiss.IndexFlat) and len(ids) <= _EXACT_SCAN_MAX_ROWS:
+            scores = index.reconstruct_batch(ids) @ qv[0]
+            order = np.argsort(-scores, kind="stable")[:k]
+            return scores[order], ids[order]
+
+    k = min(k, index.ntotal if ids is None else len(ids))
+    if k <= 0:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    D, I = index.search(qv, k, params=search_params(index, mask))
+    valid = I[0] >= 0
+    return D[0][valid], I[0][valid]
@@ -0,0 +1,5 @@
+-- Precomputed row count per structured table (kept current by rebuild_chunks)
+ALTER TABLE tables ADD COLUMN row_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE tables
+SET row_count = (SELECT COUNT(1) FROM table_rows r WHERE r.table_uid = tables.table_uid);
@@ -0,0 +1,3 @@
+-- File (mtime, size) recorded at ingest: an unchanged stat skips hashing and extraction
+ALTER TABLE documents ADD COLUMN file_mtime_ns INTEGER;
+ALTER TABLE documents ADD COLUMN file_size INTEGER;
@@ -0,0 +1,11 @@
+-- Chunk-build ledger: the documents.file_hash each document was last chunked from,
+-- so an incremental rebuild only re-chunks documents whose PDF changed.
+-- Not seeded from existing chunks: until build_chunks (full or --incremental) runs once
+-- after upgrading, the ledger is empty and every document counts as unbuilt, and the
+-- sections/table_tokens lookups keep scanning chunks (see chunk_builds_recorded).
+CREATE TABLE IF NOT EXISTS chunk_builds (
+    document_id INTEGER PRIMARY KEY,
+    file_hash TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    built_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,21 @@
+-- Section hierarchy materialized by rebuild_chunks: one row per (document, section id)
+-- over content chunks (toc/front_matter excluded), so section lookups don't scan chunks
+-- Ancestors without chunks of their own get a row too (chunk_count 0, ranges spanning their subsections)
+CREATE TABLE IF NOT EXISTS sections (
+    document_id INTEGER NOT NULL,
+    section_id TEXT NOT NULL,                   -- e.g., "701", "701.03", "701.03.01"
+    parent_section_id TEXT,                     -- "701.03" -> "701"; NULL for a top-level section
+    depth INTEGER NOT NULL,                     -- 0 for "701", 1 for "701.03", ...
+    ordinal INTEGER NOT NULL,                   -- order of first appearance within the document
+    heading TEXT,
+    page_start INTEGER NOT NULL,
+    page_end INTEGER NOT NULL,
+    first_chunk_id INTEGER NOT NULL,
+    last_chunk_id INTEGER NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    PRIMARY KEY (document_id, section_id),
+    FOREIGN KEY (document_id) REFERENCES documents(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sections_section ON sections(section_id);
+CREATE INDEX IF NOT EXISTS idx_sections_parent ON sections(parent_section_id);
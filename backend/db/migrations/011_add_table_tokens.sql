@@ -0,0 +1,10 @@
+-- Table tokens (e.g., "701.03.15-1", "901.03-1") found in table-row chunks, extracted by
+-- rebuild_chunks so an explicit "Table 701.03.15-1" lookup is an index seek, not a LIKE scan
+CREATE TABLE IF NOT EXISTS table_tokens (
+    token TEXT NOT NULL,                        -- lowercase, en/em dashes normalized to "-"
+    table_uid TEXT NOT NULL,
+    chunk_id INTEGER NOT NULL,
+    PRIMARY KEY (token, chunk_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_table_tokens_table_uid ON table_tokens(table_uid);
@@ -0,0 +1,33 @@
+-- FTS5 lexical index over chunks (CHUNKS_LEXICAL_ENGINE=fts5).
+-- External-content table: rows live in chunks, the triggers below keep the index in
+-- step with every insert/delete/update, so there is no separate lexical artifact to
+-- rebuild or load. A full rebuild_chunks loads without the triggers and runs one
+-- 'rebuild' instead.
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    text,
+    heading,
+    section_id,
+    table_label,
+    content='chunks',
+    content_rowid='id'
+);
+
+CREATE TRIGGER IF NOT EXISTS chunks_fts_ai AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts (rowid, text, heading, section_id, table_label)
+    VALUES (new.id, new.text, new.heading, new.section_id, new.table_label);
+END;
+
+CREATE TRIGGER IF NOT EXISTS chunks_fts_ad AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts (chunks_fts, rowid, text, heading, section_id, table_label)
+    VALUES ('delete', old.id, old.text, old.heading, old.section_id, old.table_label);
+END;
+
+CREATE TRIGGER IF NOT EXISTS chunks_fts_au AFTER UPDATE OF text, heading, section_id, table_label ON chunks BEGIN
+    INSERT INTO chunks_fts (chunks_fts, rowid, text, heading, section_id, table_label)
+    VALUES ('delete', old.id, old.text, old.heading, old.section_id, old.table_label);
+    INSERT INTO chunks_fts (rowid, text, heading, section_id, table_label)
+    VALUES (new.id, new.text, new.heading, new.section_id, new.table_label);
+END;
+
+-- index chunks that existed before this migration
+INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild');
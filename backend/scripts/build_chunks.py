@@ -1,8 +1,20 @@
+import argparse
+
 from app.services.chunk_ingestion import rebuild_chunks
 
 def main():
-    out = rebuild_chunks()
-    print("✅ chunks rebuilt:", out)
+    parser = argparse.ArgumentParser(description="Rebuild chunks and structured tables from ingested pages.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only re-chunk documents whose file_hash changed since the last chunk build",
+    )
+    args = parser.parse_args()
+
+    out = rebuild_chunks(incremental=args.incremental)
+    added = out.pop("added_chunk_ids")
+    removed = out.pop("removed_chunk_ids")
+    print("✅ chunks rebuilt:", {**out, "added_chunk_ids": len(added), "removed_chunk_ids": len(removed)})
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,4 @@
-from app.services.db import get_conn
+from app.services.db import bulk_write, deferred_indexes
 from app.services.tables import (
     get_all_table_rows,
     get_table_uids,
@@ -10,7 +10,7 @@ from app.services.tables import (
 def main() -> int:
     table_uids = get_table_uids()
     total = len(table_uids)
-    built = 0
+    built: dict[str, list] = {}
     skipped = 0
 
     for idx, table_uid in enumerate(table_uids, start=1):
@@ -21,14 +21,17 @@ def main() -> int:
             print(f"[{idx}/{total}] skip {table_uid} (no cells)")
             continue
 
-        with get_conn() as conn:
-            conn.execute("DELETE FROM table_cells WHERE table_uid = ?", (table_uid,))
-            insert_table_cells(conn, cells)
+        built[table_uid] = cells
+        print(f"[{idx}/{total}] parsed {table_uid} ({len(cells)} cells)")
 
-        built += 1
-        print(f"[{idx}/{total}] built {table_uid} ({len(cells)} cells)")
+    # One transaction for every table; indexes are rebuilt once after the load.
+    with bulk_write() as conn:
+        conn.executemany("DELETE FROM table_cells WHERE table_uid = ?", [(uid,) for uid in built])
+        with deferred_indexes(conn, "table_cells"):
+            for cells in built.values():
+                insert_table_cells(conn, cells)
 
-    print(f"Done. tables={total} built={built} skipped={skipped}")
+    print(f"Done. tables={total} built={len(built)} skipped={skipped}")
     return 0
 
 
@@ -8,7 +8,7 @@ def main() -> None:
     filename = "StandSpecRoadBridge.pdf"
     page_number = 427
 
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         doc = conn.execute(
             "SELECT id FROM documents WHERE filename = ? LIMIT 1",
             (filename,),
@@ -0,0 +1,87 @@
+import argparse
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services.vector_index import INDEX_TYPES, build_vector_index, read_vector_index
+
+
+def _flat_vectors(index: faiss.Index) -> np.ndarray:
+    if not isinstance(index, faiss.IndexFlat):
+        raise SystemExit("Baseline index must be flat; rebuild it with FAISS_INDEX_TYPE=flat first.")
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def _timed_search(index: faiss.Index, queries: np.ndarray, k: int) -> tuple[np.ndarray, list[float]]:
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies_ms: list[float] = []
+    for i, q in enumerate(queries):
+        t0 = time.perf_counter()
+        _, I = index.search(q[None, :], k)
+        latencies_ms.append((time.perf_counter() - t0) * 1000.0)
+        ids[i] = I[0]
+    return ids, latencies_ms
+
+
+def _recall(truth: np.ndarray, found: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(set(t.tolist()) & set(f.tolist()) - {-1}) for t, f in zip(truth, found))
+    return hits / (len(truth) * k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ANN index recall@k and latency against the flat index.")
+    parser.add_argument("--index", type=Path, default=settings.INDEX_DIR / "faiss_chunks.index", help="Flat baseline index.")
+    parser.add_argument("--types", default="hnsw,ivf_flat,ivf_pq", help=f"Comma-separated subset of {INDEX_TYPES}.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--queries-file",
+        type=Path,
+        default=None,
+        help="One query per line, embedded as real queries (default: held-out corpus vectors).",
+    )
+    parser.add_argument("--queries", type=int, default=200, help="Corpus vectors held out as queries when no file is given.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    flat, _ = read_vector_index(args.index)
+    vecs = _flat_vectors(flat)
+    if args.queries_file:
+        from app.services.embeddings import embed_texts
+
+        texts = [q.strip() for q in args.queries_file.read_text(encoding="utf-8").splitlines() if q.strip()]
+        queries = embed_texts(texts, use_cache=False)
+        source = str(args.queries_file)
+    else:
+        # A corpus vector is its own nearest neighbour, which every ANN index finds;
+        # take the sampled vectors out of the corpus so recall measures real neighbours.
+        rng = np.random.default_rng(args.seed)
+        held_out = rng.choice(len(vecs), size=min(args.queries, len(vecs) - 1), replace=False)
+        keep = np.ones(len(vecs), dtype=bool)
+        keep[held_out] = False
+        queries, vecs = vecs[held_out], vecs[keep]
+        flat, _ = build_vector_index(vecs, index_type="flat")
+        source = "held-out corpus vectors"
+    k = min(args.k, len(vecs))
+
+    truth, flat_ms = _timed_search(flat, queries, k)
+    print(f"corpus={len(vecs)} dim={vecs.shape[1]} queries={len(queries)} ({source}) k={k}")
+    print(f"{'type':<10} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'build s':>8}  params")
+    print(f"{'flat':<10} {1.0:>9.4f} {np.percentile(flat_ms, 50):>8.3f} {np.percentile(flat_ms, 95):>8.3f} {'-':>8}")
+
+    for index_type in [t.strip() for t in args.types.split(",") if t.strip()]:
+        t0 = time.perf_counter()
+        index, params = build_vector_index(vecs, index_type=index_type)
+        build_s = time.perf_counter() - t0
+        found, ms = _timed_search(index, queries, k)
+        print(
+            f"{params['index_type']:<10} {_recall(truth, found):>9.4f} "
+            f"{np.percentile(ms, 50):>8.3f} {np.percentile(ms, 95):>8.3f} {build_s:>8.2f}  {params}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.bm25_chunks import BM25ChunksIndex, bm25_chunks_rank, bm25_chunks_scores, tokenize
+from app.services.fts_chunks import fts_chunks_search
+
+
+def _sample_queries(index: BM25ChunksIndex, n: int, seed: int) -> list[str]:
+    """
+    Corpus-derived queries: a few consecutive words from random chunks, plus
+    section ids, so both prose and id lookups are represented.
+    """
+    rng = random.Random(seed)
+    out: list[str] = []
+    n_chunks = len(index.store)
+    for i in rng.sample(range(n_chunks), min(n, n_chunks)):
+        words = [w for w in tokenize(index.store.text(i)) if len(w) >= 3]
+        if rng.random() < 0.2 and index.store.record(i)["section_id"]:
+            out.append(index.store.record(i)["section_id"])
+        elif words:
+            start = rng.randrange(max(1, len(words) - 4))
+            out.append(" ".join(words[start:start + rng.randint(2, 5)]))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FTS5 chunk search top-k against the pickled BM25 chunk index.")
+    parser.add_argument("--index", type=Path, default=settings.INDEX_DIR / "bm25_chunks.pkl", help="BM25 baseline index.")
+    parser.add_argument("--queries-file", type=Path, default=None, help="One query per line (default: sampled from the corpus).")
+    parser.add_argument("--queries", type=int, default=200, help="Sampled queries when no file is given.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--scope", default="all")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    index = BM25ChunksIndex.load(args.index)
+    if args.queries_file:
+        queries = [q.strip() for q in args.queries_file.read_text(encoding="utf-8").splitlines() if q.strip()]
+    else:
+        queries = _sample_queries(index, args.queries, args.seed)
+
+    overlaps: list[float] = []
+    top1 = 0
+    bm25_ms: list[float] = []
+    fts_ms: list[float] = []
+    worst: list[tuple[float, str]] = []
+    for q in queries:
+        t0 = time.perf_counter()
+        base = [h.chunk_id for h in bm25_chunks_rank(index, bm25_chunks_scores(q, index), k=args.k, scope=args.scope)]
+        bm25_ms.append((time.perf_counter() - t0) * 1000.0)
+
+        t0 = time.perf_counter()
+        found = [h.chunk_id for h in fts_chunks_search(q, k=args.k, scope=args.scope)]
+        fts_ms.append((time.perf_counter() - t0) * 1000.0)
+
+        overlap = len(set(base) & set(found)) / max(1, len(base))
+        overlaps.append(overlap)
+        top1 += bool(base and found and base[0] == found[0])
+        worst.append((overlap, q))
+
+    print(f"corpus={len(index.store)} queries={len(queries)} k={args.k} scope={args.scope}")
+    print(f"{'engine':<7} {'overlap@k':>9} {'top1':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'bm25':<7} {1.0:>9.4f} {1.0:>6.3f} {np.percentile(bm25_ms, 50):>8.3f} {np.percentile(bm25_ms, 95):>8.3f}")
+    print(
+        f"{'fts5':<7} {np.mean(overlaps):>9.4f} {top1 / max(1, len(queries)):>6.3f} "
+        f"{np.percentile(fts_ms, 50):>8.3f} {np.percentile(fts_ms, 95):>8.3f}"
+    )
+    print("lowest overlap:")
+    for overlap, q in sorted(worst)[:5]:
+        print(f"  {overlap:.2f}  {q!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,30 @@
+import argparse
+import os
+
 from app.services.ingestion import ingest_all_pdfs
 
 def main():
-    result = ingest_all_pdfs()
+    parser = argparse.ArgumentParser(description="Ingest PDFs from PDF_DIR into SQLite.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes for text extraction (0 = one per CPU). SQLite writes stay in one process.",
+    )
+    args = parser.parse_args()
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
+    result = ingest_all_pdfs(workers=workers)
     print("✅ Ingestion complete")
     print(f"Total PDFs: {result.total_pdfs}")
     print(f"Ingested (new/changed): {result.ingested}")
     print(f"Skipped (unchanged): {result.skipped_unchanged}")
     print(f"Pages written: {result.pages_written}")
+    print()
+    print(f"{'document':<40} {'pages':>6} {'extract s':>10} {'write s':>8}  status")
+    for t in result.timings:
+        status = "ingested" if t.ingested else "unchanged"
+        print(f"{t.filename[:40]:<40} {t.pages:>6} {t.extract_s:>10.2f} {t.write_s:>8.2f}  {status}")
 
 if __name__ == "__main__":
     main()
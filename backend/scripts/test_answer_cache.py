@@ -0,0 +1,79 @@
+import dataclasses
+import tempfile
+import time
+from pathlib import Path
+
+from app.services import answer_cache
+from app.services.answer_cache import NO_CACHE_KEY, AnswerCache, generation_key
+from app.services.index_registry import get_registry
+
+
+@dataclasses.dataclass
+class _Hit:
+    chunk_id: int
+    snippet: str
+
+
+def _check_answer_cache(tmp: Path) -> None:
+    ctx = dict(scope="standspec", mp_ids=None, k=6, mode="answer")
+    cache = AnswerCache(8, 0, persist_path=tmp / "answers.sqlite3")
+    result = {"confidence": "strong", "answer": "a", "hits": [_Hit(1, "x")]}
+    cache.put("What is 701.02?", result, **ctx)
+
+    # normalized query, same context -> hit; other context -> miss
+    got = cache.get("  what is 701.02? ", **ctx)
+    assert got == result, f"expected a hit, got {got}"
+    assert cache.get("What is 701.02?", **{**ctx, "k": 8}) is None, "k is part of the key"
+    assert cache.get("What is 701.03?", **ctx) is None, "a different query must miss"
+
+    # callers get copies
+    got["hits"][0].snippet = "changed"
+    got["extra"] = True
+    assert cache.get("what is 701.02?", **ctx) == result, "a caller's edit leaked into the cache"
+
+    # results flagged as uncacheable are skipped
+    cache.put("fallback", {"answer": "x", NO_CACHE_KEY: True}, **ctx)
+    assert cache.get("fallback", **ctx) is None
+
+    # persistent tier: JSON round trip in a fresh process-like cache
+    fresh = AnswerCache(8, 0, persist_path=tmp / "answers.sqlite3")
+    restored = fresh.get("what is 701.02?", **ctx)
+    assert restored is not None and restored["answer"] == "a", "persistent tier miss"
+    assert restored["hits"][0].chunk_id == 1 and restored["hits"][0].snippet == "x"
+    assert fresh.stats()["persistent_hits"] == 1
+
+    # promotion into the memory tier keeps the persistent row's age
+    aged = AnswerCache(8, 60, persist_path=tmp / "answers.sqlite3")
+    aged._persistent_tier()._conn.execute("UPDATE answers SET created_at = created_at - 59")
+    assert aged.get("what is 701.02?", **ctx) is not None
+    entry = next(iter(aged._data.values()))
+    assert time.monotonic() - entry.created >= 59, "a persistent hit restarted the TTL"
+
+    # a new index generation invalidates both tiers
+    original = answer_cache.generation_key
+    answer_cache.generation_key = lambda gen: "rebuilt"
+    try:
+        assert cache.get("what is 701.02?", **ctx) is None, "stale generation served"
+        assert AnswerCache(8, 0, persist_path=tmp / "answers.sqlite3").get("what is 701.02?", **ctx) is None
+    finally:
+        answer_cache.generation_key = original
+
+    # the generation key follows index contents, not the generation number
+    gen = get_registry().current()
+    name = sorted(gen.indexes)[0]
+    renumbered = dataclasses.replace(gen, number=gen.number + 1)
+    rebuilt = dataclasses.replace(
+        gen, indexes={**gen.indexes, name: dataclasses.replace(gen.indexes[name], fingerprint="rebuilt")}
+    )
+    assert generation_key(renumbered) == generation_key(gen)
+    assert generation_key(rebuilt) != generation_key(gen)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        _check_answer_cache(Path(tmp))
+    print("✅ answer cache keys, copies, TTL and invalidation ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+
+from app.core.config import settings
+from app.routers.chat import chat_ask, chat_ask_stream
+from app.schemas.ask import AskRequest
+from app.services import answer_cache
+from app.services.answer_cache import AnswerCache
+from app.services.llm import get_llm, reset_llm
+
+# same request as test_chat_ask_stream.sh
+REQ = AskRequest(query="bridge bearings", scope="standspec", k=6, mode="answer")
+
+
+async def _stream(req: AskRequest) -> list[tuple[str, dict]]:
+    resp = await chat_ask_stream(req, user=None)
+    events = []
+    async for chunk in resp.body_iterator:
+        text = chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk
+        event, data = text.strip().split("\n", 1)
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def _check_order(events: list[tuple[str, dict]]) -> None:
+    names = [e for e, _ in events]
+    assert names[0] == "citations" and names[-1] == "final", f"unexpected event order {names}"
+    assert set(names[1:-1]) <= {"token"}, f"only token events between citations and final: {names}"
+
+
+async def run() -> int:
+    llm = get_llm()
+    streamed: list[str] = []
+    original = llm.astream
+
+    async def astream(*args, **kwargs):
+        async for delta in original(*args, **kwargs):
+            streamed.append(delta)
+            yield delta
+
+    llm.astream = astream
+
+    # miss: retrieval, then the mock provider streams word by word
+    events = await _stream(REQ)
+    _check_order(events)
+    tokens = [data["text"] for e, data in events if e == "token"]
+    assert tokens and tokens == streamed, f"token events should be the LLM deltas: {tokens} != {streamed}"
+    citations, final = events[0][1], events[-1][1]
+
+    # the final event is build_ask_response of /chat/ask for the same request
+    answer_cache.get_answer_cache().clear()
+    expected = (await chat_ask(REQ, user=None)).model_dump(mode="json")
+    assert final == expected, f"final event differs from /chat/ask:\n{final}\n!=\n{expected}"
+
+    # hit: /chat/ask just cached the answer, so nothing is streamed
+    streamed.clear()
+    events = await _stream(REQ)
+    assert [e for e, _ in events] == ["citations", "final"], f"cached answer should not stream: {events}"
+    assert streamed == [], "a cache hit must not call the LLM"
+    assert events[-1][1] == expected, "cached final event differs from /chat/ask"
+    assert events[0][1] == citations, "cached citations differ from the streamed ones"
+    return len(tokens)
+
+
+def main() -> None:
+    os.environ["LLM_PROVIDER"] = "mock"
+    reset_llm()
+    original = answer_cache._cache
+    # a private in-memory cache: leave the app's (possibly persistent) one alone
+    answer_cache._cache = AnswerCache(8, settings.ANSWER_CACHE_TTL_SECONDS)
+    try:
+        n_tokens = asyncio.run(run())
+    finally:
+        answer_cache._cache = original
+        reset_llm()
+
+    print(f"✅ /chat/ask/stream events match /chat/ask ({n_tokens} tokens streamed, cached hit without LLM)")
+
+
+if __name__ == "__main__":
+    main()
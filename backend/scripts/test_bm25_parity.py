@@ -0,0 +1,42 @@
+import random
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from app.services.bm25_chunks import bm25_chunks_rank, tokenize
+from app.services.index_registry import get_registry
+from app.services.metadata_columns import ranked_indices
+
+FIXED_QUERIES = ["701.02", "Table 901.03-1 aggregate", "air voids air voids", "curing time for concrete", "zzzz-no-match"]
+
+
+def main() -> None:
+    index = get_registry().get("bm25_chunks")
+    corpus = [tokenize(index.store.text(i)) for i in range(len(index.store))]
+    okapi = BM25Okapi(corpus)
+
+    rng = random.Random(0)
+    queries = list(FIXED_QUERIES)
+    for i in rng.sample(range(len(corpus)), min(50, len(corpus))):
+        if corpus[i]:
+            start = rng.randrange(len(corpus[i]))
+            queries.append(" ".join(corpus[i][start:start + rng.randint(1, 5)]))
+
+    for q in queries:
+        tokens = tokenize(q)
+        expected = okapi.get_scores(tokens)
+        scores = index.matrix.scores(tokens)
+        assert np.allclose(scores, expected, rtol=1e-9, atol=1e-12), f"score mismatch for {q!r}"
+
+        # ranking: score descending, corpus order on ties, positive scores only
+        positive = np.flatnonzero(expected > 0)
+        want = [int(index.store.chunk_ids[i]) for i in ranked_indices(expected, positive)[:10]]
+        got = [h.chunk_id for h in bm25_chunks_rank(index, scores, k=10)]
+        if want:
+            assert got == want, f"top-10 mismatch for {q!r}: {got} != {want}"
+
+    print(f"✅ CSR BM25 matches rank_bm25 scores and top-10 on {len(queries)} queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Works offline with LLM_PROVIDER=mock (tokens are streamed word by word).
+BASE_URL="${BASE_URL:-http://127.0.0.1:8000}"
+TOKEN="${TOKEN:-}"
+
+curl -sN "${BASE_URL}/chat/ask/stream" \
+  -H "Content-Type: application/json" \
+  -H "Authorization: Bearer ${TOKEN}" \
+  -d '{"query":"bridge bearings","scope":"standspec","k":6,"mode":"answer"}' | head -c 4000
@@ -0,0 +1,34 @@
+import tempfile
+from pathlib import Path
+
+from app.services.chunk_store import ChunkStore, chunk_store_paths, load_chunk_records
+
+
+def main() -> None:
+    records = load_chunk_records()
+    assert records, "expected chunks (run build_chunks)"
+    store = ChunkStore.from_records(records)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        store.write(directory)
+        assert all(p.exists() for p in chunk_store_paths(directory)), "missing chunk store files"
+        mtimes = [p.stat().st_mtime_ns for p in chunk_store_paths(directory)]
+        store.write(directory)
+        assert mtimes == [p.stat().st_mtime_ns for p in chunk_store_paths(directory)], "identical store was rewritten"
+
+        opened = ChunkStore.open(directory)
+        assert opened.fingerprint == store.fingerprint
+        assert len(opened) == len(records)
+        for i, r in enumerate(records):
+            assert opened.record(i) == r, f"row {i} (chunk {r['chunk_id']}) did not round-trip"
+
+        ids = [r["chunk_id"] for r in records[:5]] + [-1]
+        texts = opened.texts_for(ids)
+        assert -1 not in texts and all(texts[r["chunk_id"]] == r["text"] for r in records[:5])
+
+    print(f"✅ chunk store round-trips {len(records)} chunks")
+
+
+if __name__ == "__main__":
+    main()
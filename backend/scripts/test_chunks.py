@@ -1,7 +1,7 @@
 from app.services.db import get_conn
 
 def main():
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         row = conn.execute("""
             SELECT c.section_id, c.heading, c.page_start, c.page_end, LENGTH(c.text) AS n
             FROM chunks c
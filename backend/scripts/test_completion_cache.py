@@ -0,0 +1,44 @@
+import asyncio
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from app.services.llm import LLMMessage, _CompletionCache
+
+
+def _check_completion_cache(tmp: Path) -> None:
+    cache = _CompletionCache(tmp / "llm_cache.sqlite3", max_bytes=1000, max_temperature=0.2)
+    client = SimpleNamespace(provider="groq", model="m")
+    messages = [LLMMessage("system", "s"), LLMMessage("user", "u")]
+
+    key = cache.key(client, messages, 0.1, 600, None)
+    assert key == cache.key(client, list(messages), 0.1, 600, None), "key must be deterministic"
+    assert key != cache.key(client, messages[:1], 0.1, 600, None)
+    assert key != cache.key(client, messages, 0.0, 600, None)
+    assert key != cache.key(client, messages, 0.1, 300, None)
+    assert key != cache.key(SimpleNamespace(provider="groq", model="other"), messages, 0.1, 600, None)
+    assert cache.key(client, messages, 0.7, 600, None) is None, "high temperatures are not cached"
+    assert cache.key(SimpleNamespace(provider="mock", model="m"), messages, 0.1, 600, None) is None
+
+    async def roundtrip() -> None:
+        assert await cache.aget(key) is None
+        await cache.aput(key, client, "answer")
+        assert await cache.aget(key) == "answer"
+        assert await cache.aget(None) is None
+
+    asyncio.run(roundtrip())
+
+    # over the byte budget the least recently used rows go
+    for i in range(5):
+        cache.put(cache.key(client, [LLMMessage("user", str(i))], 0.1, 600, None), client, "x" * 300)
+    assert cache.evicted > 0 and cache.get(key) is None, "expected LRU eviction"
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        _check_completion_cache(Path(tmp))
+    print("✅ LLM completion cache keys, async get/put and LRU eviction ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.db import db_pool_stats, get_conn
+from scripts import run_migrations
+
+BORROWS = 20
+
+
+def main() -> None:
+    original = settings.DB_PATH, settings.DB_READ_POOL_SIZE, settings.DB_POOL_TIMEOUT_SECONDS
+    settings.DB_READ_POOL_SIZE, settings.DB_POOL_TIMEOUT_SECONDS = 2, 0.1
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # a fresh path gets fresh pools, so the stats below count only this script
+            settings.DB_PATH = Path(tmp) / "nj.sqlite3"
+            run_migrations.main()
+
+            # sequential borrows reuse one read connection
+            seen = set()
+            for _ in range(BORROWS):
+                with get_conn(readonly=True) as conn:
+                    seen.add(id(conn))
+                    assert conn.execute("SELECT COUNT(1) FROM migrations").fetchone()[0] > 0
+            assert len(seen) == 1, f"expected one reused connection, got {len(seen)}"
+            read = db_pool_stats()["read"]
+            assert (read["open"], read["idle"], read["acquires"]) == (1, 1, BORROWS), f"read pool stats: {read}"
+
+            # read connections are query_only, and a rejected write does not cost the connection
+            with get_conn(readonly=True) as conn:
+                assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+                try:
+                    conn.execute("INSERT INTO migrations (filename) VALUES ('pool_check.sql')")
+                except sqlite3.OperationalError:
+                    pass
+                else:
+                    raise AssertionError("a readonly connection accepted a write")
+            with get_conn(readonly=True) as conn:
+                assert id(conn) in seen, "the connection should go back to the pool"
+                assert conn.execute("SELECT COUNT(1) FROM migrations WHERE filename = 'pool_check.sql'").fetchone()[0] == 0
+            with get_conn() as conn:
+                assert conn.execute("PRAGMA query_only").fetchone()[0] == 0, "write connections must not be query_only"
+
+            # concurrent borrows open up to the pool size, then wait and time out
+            with get_conn(readonly=True) as a, get_conn(readonly=True) as b:
+                assert a is not b
+                try:
+                    with get_conn(readonly=True):
+                        pass
+                except TimeoutError:
+                    pass
+                else:
+                    raise AssertionError("a third borrow should time out with DB_READ_POOL_SIZE=2")
+            read = db_pool_stats()["read"]
+            assert (read["open"], read["idle"], read["waits"], read["timeouts"]) == (2, 2, 0, 1), f"read pool stats: {read}"
+            # run_migrations and the query_only check above
+            assert db_pool_stats()["write"]["acquires"] == 2
+    finally:
+        settings.DB_PATH, settings.DB_READ_POOL_SIZE, settings.DB_POOL_TIMEOUT_SECONDS = original
+
+    print(f"✅ pooled SQLite connections are reused and read connections are query_only ({BORROWS} borrows)")
+
+
+if __name__ == "__main__":
+    main()
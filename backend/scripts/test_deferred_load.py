@@ -0,0 +1,94 @@
+import tempfile
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.db import bulk_write, deferred_indexes, deferred_triggers, get_conn
+from scripts import run_migrations
+
+# what rebuild_chunks defers on a full rebuild
+INDEX_TABLES = ("chunks", "tables", "table_rows")
+TRIGGER_TABLES = ("chunks",)
+ROWS = 50
+
+
+def _schema() -> list[tuple]:
+    with get_conn(readonly=True) as conn:
+        return [
+            tuple(r)
+            for r in conn.execute(
+                "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') ORDER BY type, name"
+            )
+        ]
+
+
+def _chunk_count() -> int:
+    with get_conn(readonly=True) as conn:
+        return int(conn.execute("SELECT COUNT(1) FROM chunks").fetchone()[0])
+
+
+def _load(conn, doc_id: int, fail_after: int | None = None) -> None:
+    deferred = {name for _type, name, tbl, sql in _schema() if sql and tbl in INDEX_TABLES + TRIGGER_TABLES}
+    with deferred_indexes(conn, *INDEX_TABLES), deferred_triggers(conn, *TRIGGER_TABLES):
+        present = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')")}
+        assert not present & deferred, f"still present during the load: {present & deferred}"
+        for i in range(ROWS):
+            if i == fail_after:
+                raise RuntimeError("load failed")
+            conn.execute(
+                "INSERT INTO chunks (document_id, chunk_index, section_id, page_start, page_end, text) VALUES (?, ?, ?, 1, 1, ?)",
+                (doc_id, i, f"701.{i:02d}", f"asphalt row {i}"),
+            )
+        # the triggers were off: bring chunks_fts up to date in one pass, like rebuild_chunks
+        conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild')")
+
+
+def main() -> None:
+    original = settings.DB_PATH
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            settings.DB_PATH = Path(tmp) / "nj.sqlite3"
+            run_migrations.main()
+            with get_conn() as conn:
+                doc_id = conn.execute(
+                    """
+                    INSERT INTO documents (filename, display_name, doc_type, file_path, file_hash, page_count, ingested_at)
+                    VALUES ('a.pdf', 'A', 'standspec', 'a.pdf', 'h', 1, 'now')
+                    """
+                ).lastrowid
+            schema = _schema()
+            assert {"index", "trigger"} <= {t for t, *_ in schema}, f"expected indexes and triggers: {schema}"
+
+            # a completed load recreates every index and trigger as it was
+            with bulk_write() as conn:
+                _load(conn, doc_id)
+            assert _schema() == schema, "index/trigger SQL changed after a load"
+            assert _chunk_count() == ROWS
+
+            # a load that raises halfway leaves both the rows and the schema as they were
+            try:
+                with bulk_write() as conn:
+                    _load(conn, doc_id, fail_after=ROWS // 2)
+            except RuntimeError:
+                pass
+            else:
+                raise AssertionError("the failing load should raise")
+            assert _schema() == schema, "index/trigger SQL changed after a failed load"
+            assert _chunk_count() == ROWS, "the failed load's rows should be rolled back"
+
+            # the restored triggers keep chunks_fts in step again
+            with get_conn() as conn:
+                conn.execute(
+                    "INSERT INTO chunks (document_id, chunk_index, page_start, page_end, text) VALUES (?, ?, 1, 1, 'bitumen')",
+                    (doc_id, ROWS),
+                )
+                n = conn.execute("SELECT COUNT(1) FROM chunks_fts WHERE chunks_fts MATCH 'bitumen'").fetchone()[0]
+                assert n == 1, "chunks_fts_ai did not fire after the load"
+                conn.execute("INSERT INTO chunks_fts (chunks_fts, rank) VALUES ('integrity-check', 1)")
+    finally:
+        settings.DB_PATH = original
+
+    print(f"✅ deferred indexes and triggers are restored after a load and a failed load ({len(schema)} objects)")
+
+
+if __name__ == "__main__":
+    main()
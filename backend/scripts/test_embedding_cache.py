@@ -0,0 +1,78 @@
+import numpy as np
+
+from app.services import embeddings
+from app.services.embeddings import _EmbeddingCache, clear_embedding_cache, embed_texts, embedding_cache_stats
+
+
+def _fake_encode(calls: list[list[str]]):
+    def encode(texts: list[str]) -> np.ndarray:
+        calls.append(list(texts))
+        return np.array([[float(len(t)), float(sum(map(ord, t)) % 97)] for t in texts], dtype="float32")
+
+    return encode
+
+
+def _check_embed_texts() -> None:
+    calls: list[list[str]] = []
+    original = embeddings._encode
+    embeddings._encode = _fake_encode(calls)
+    clear_embedding_cache()
+    try:
+        first = embed_texts(["What is 701.02?", "asphalt  binder", "What is 701.02?"])
+        assert calls == [["What is 701.02?", "asphalt binder"]], f"expected one encode of the unique texts, got {calls}"
+        assert np.array_equal(first[0], first[2])
+
+        # whitespace variants hit the cache; only the new text is encoded
+        second = embed_texts(["  What is   701.02? ", "concrete"])
+        assert calls[-1] == ["concrete"], f"expected only the new text encoded, got {calls[-1]}"
+        assert np.array_equal(second[0], first[0])
+        assert second.dtype == np.float32 and second.shape == (2, 2)
+        stats = embedding_cache_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 3, f"unexpected stats {stats}"
+
+        # cached vectors are read-only, so no caller can corrupt them
+        try:
+            embeddings._cache.get((embeddings.settings.EMBED_MODEL_NAME, "concrete"))[0] = 0.0
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("cached vectors must be read-only")
+
+        # index builders bypass the cache
+        n = len(calls)
+        embed_texts(["concrete"], use_cache=False)
+        assert len(calls) == n + 1, "use_cache=False must always encode"
+    finally:
+        embeddings._encode = original
+        clear_embedding_cache()
+
+
+def _check_lru_and_ttl() -> None:
+    def vec() -> np.ndarray:
+        return np.zeros(2, dtype="float32")
+
+    cache = _EmbeddingCache(2, 0)
+    cache.put(("m", "a"), vec())
+    cache.put(("m", "b"), vec())
+    assert cache.get(("m", "a")) is not None
+    cache.put(("m", "c"), vec())
+    assert cache.get(("m", "b")) is None, "the least recently used key should be evicted"
+    assert cache.get(("m", "a")) is not None and cache.get(("m", "c")) is not None
+    assert cache.get(("other-model", "a")) is None, "the model name is part of the key"
+
+    expiring = _EmbeddingCache(2, 60)
+    expiring.put(("m", "a"), vec())
+    created, v = expiring._data[("m", "a")]
+    expiring._data[("m", "a")] = (created - 61, v)
+    assert expiring.get(("m", "a")) is None, "expired entries must miss"
+    assert expiring.stats()["size"] == 0
+
+
+def main() -> None:
+    _check_embed_texts()
+    _check_lru_and_ttl()
+    print("✅ query embedding cache dedup, normalization, LRU and TTL ok")
+
+
+if __name__ == "__main__":
+    main()
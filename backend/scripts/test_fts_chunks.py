@@ -0,0 +1,73 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.chunk_ingestion import rebuild_chunks
+from app.services.db import get_conn
+from app.services.fts_chunks import fts_chunks_search
+
+QUERIES = ["asphalt", "aggregate gradation", "701.02", "Table 901.03-1", "schedule"]
+
+
+def _copy_db(dest: Path) -> None:
+    src = sqlite3.connect(settings.DB_PATH)
+    dst = sqlite3.connect(dest)
+    src.backup(dst)
+    src.close()
+    dst.close()
+
+
+def _check_index() -> None:
+    with get_conn() as conn:
+        triggers = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        assert {"chunks_fts_ai", "chunks_fts_ad", "chunks_fts_au"} <= triggers, f"triggers missing: {triggers}"
+        # raises SQLITE_CORRUPT_VTAB when the index does not match the chunks rows
+        conn.execute("INSERT INTO chunks_fts (chunks_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def _check_restriction() -> None:
+    with get_conn(readonly=True) as conn:
+        all_ids = [int(r[0]) for r in conn.execute("SELECT id FROM chunks ORDER BY id")]
+    allowed = set(all_ids[::2])
+    for q in QUERIES:
+        matched = [h.chunk_id for h in fts_chunks_search(q, k=len(all_ids)) if h.score > 0]
+        hits = fts_chunks_search(q, k=5, chunk_ids=allowed)
+        assert {h.chunk_id for h in hits} <= allowed, f"{q!r}: hits outside chunk_ids"
+        # same ranking with only the allowed ids, still up to k of them
+        want = [cid for cid in matched if cid in allowed][:5]
+        if want:
+            assert [h.chunk_id for h in hits] == want, f"{q!r}: restricted ranking differs"
+        else:
+            # no allowed match: allowed chunks in corpus order, like bm25_chunks_rank
+            assert hits and all(h.score == 0 for h in hits), f"{q!r}: expected the corpus-order fallback"
+    assert fts_chunks_search(QUERIES[0], k=5, chunk_ids=set()) == []
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        # work on a copy: the rebuilds below rewrite chunks
+        db_path = Path(tmp) / "nj.sqlite3"
+        _copy_db(db_path)
+        settings.DB_PATH = db_path
+
+        # a full rebuild loads without the triggers and rebuilds chunks_fts once
+        out = rebuild_chunks(incremental=False)
+        assert out["chunks"] > 0, "expected chunks (run ingest_docs)"
+        _check_index()
+        _check_restriction()
+
+        # an incremental rebuild goes through the triggers
+        with get_conn() as conn:
+            doc_id = int(conn.execute("SELECT document_id FROM chunk_builds ORDER BY document_id LIMIT 1").fetchone()[0])
+            conn.execute("UPDATE documents SET file_hash = file_hash || '-edited' WHERE id = ?", (doc_id,))
+        out = rebuild_chunks(incremental=True)
+        assert out["rebuilt_documents"] == 1
+        _check_index()
+        _check_restriction()
+
+    print(f"✅ chunks_fts stays in step with chunks across rebuilds ({len(QUERIES)} queries)")
+
+
+if __name__ == "__main__":
+    main()
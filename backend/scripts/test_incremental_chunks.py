@@ -0,0 +1,84 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.chunk_ingestion import rebuild_chunks
+from app.services.db import get_conn
+
+
+def _copy_db(dest: Path) -> None:
+    src = sqlite3.connect(settings.DB_PATH)
+    dst = sqlite3.connect(dest)
+    src.backup(dst)
+    src.close()
+    dst.close()
+
+
+def _chunk_ids(document_id: int | None = None) -> list[int]:
+    sql = "SELECT id FROM chunks" + (" WHERE document_id = ?" if document_id is not None else "") + " ORDER BY id"
+    with get_conn(readonly=True) as conn:
+        return [int(r[0]) for r in conn.execute(sql, () if document_id is None else (document_id,))]
+
+
+def _contents() -> list[tuple]:
+    # what a rebuild produces, independent of the chunk ids it assigned
+    with get_conn(readonly=True) as conn:
+        chunks = conn.execute(
+            "SELECT document_id, chunk_index, section_id, chunk_kind, text FROM chunks ORDER BY document_id, chunk_index"
+        ).fetchall()
+        sections = conn.execute(
+            "SELECT document_id, section_id, ordinal, chunk_count FROM sections ORDER BY document_id, section_id"
+        ).fetchall()
+        tokens = conn.execute(
+            "SELECT t.token, c.document_id, c.chunk_index FROM table_tokens t JOIN chunks c ON c.id = t.chunk_id "
+            "ORDER BY 1, 2, 3"
+        ).fetchall()
+    return [tuple(r) for r in chunks] + [tuple(r) for r in sections] + [tuple(r) for r in tokens]
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        # work on a copy: the rebuilds below rewrite chunks
+        db_path = Path(tmp) / "nj.sqlite3"
+        _copy_db(db_path)
+        settings.DB_PATH = db_path
+
+        out = rebuild_chunks(incremental=False)
+        full = _contents()
+        assert out["documents"] > 1, "expected at least two ingested documents"
+
+        # nothing changed -> nothing re-chunked
+        out = rebuild_chunks(incremental=True)
+        assert out["rebuilt_documents"] == 0, f"expected no work, got {out['rebuilt_documents']} documents"
+        assert not out["added_chunk_ids"] and not out["removed_chunk_ids"]
+
+        # one changed document -> only its chunks are replaced
+        with get_conn() as conn:
+            doc_id = int(conn.execute("SELECT document_id FROM chunk_builds ORDER BY document_id LIMIT 1").fetchone()[0])
+            conn.execute("UPDATE documents SET file_hash = file_hash || '-edited' WHERE id = ?", (doc_id,))
+        old_ids = _chunk_ids(doc_id)
+        others = sorted(set(_chunk_ids()) - set(old_ids))
+
+        out = rebuild_chunks(incremental=True)
+        assert out["rebuilt_documents"] == 1, f"expected 1 document re-chunked, got {out['rebuilt_documents']}"
+        assert out["removed_chunk_ids"] == old_ids
+        assert out["added_chunk_ids"] == _chunk_ids(doc_id)
+        assert sorted(set(_chunk_ids()) - set(_chunk_ids(doc_id))) == others, "other documents were re-chunked"
+        with get_conn(readonly=True) as conn:
+            built = conn.execute("SELECT file_hash FROM chunk_builds WHERE document_id = ?", (doc_id,)).fetchone()[0]
+        assert built.endswith("-edited"), "ledger not updated"
+        assert _contents() == full, "incremental rebuild differs from a full rebuild"
+
+        # an empty ledger (chunks from before migration 009) re-chunks every document
+        with get_conn() as conn:
+            conn.execute("DELETE FROM chunk_builds")
+        out = rebuild_chunks(incremental=True)
+        assert out["rebuilt_documents"] == out["documents"]
+        assert _contents() == full
+
+    print(f"✅ incremental chunk rebuild matches a full rebuild ({out['documents']} documents)")
+
+
+if __name__ == "__main__":
+    main()
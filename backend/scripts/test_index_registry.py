@@ -0,0 +1,38 @@
+import dataclasses
+
+from app.services import index_registry
+from app.services.index_registry import get_registry
+
+
+def main() -> None:
+    registry = get_registry()
+    gen = registry.current()
+    assert not gen.errors, f"index load errors: {gen.errors}"
+
+    # fused lexical/dense pairs come from the same rows
+    for a, b in index_registry._PAIRS:
+        assert gen.indexes[a].fingerprint == gen.indexes[b].fingerprint, f"{a}/{b} fingerprints differ"
+
+    # unchanged artifacts: reload keeps the generation, force swaps in a new one
+    assert registry.reload() is gen, "reload without changes should keep the generation"
+    forced = registry.reload(force=True)
+    assert forced.number == gen.number + 1, f"expected generation {gen.number + 1}, got {forced.number}"
+    assert registry.current() is forced
+    assert gen.get("faiss_chunks") is not None, "the previous generation stays usable for in-flight requests"
+
+    # a lexical index rebuilt from other rows keeps serving the previous pair
+    for a, b in index_registry._PAIRS:
+        spec = index_registry._SPECS[a]
+        index_registry._SPECS[a] = dataclasses.replace(spec, fingerprint=lambda _value: "other-build")
+        try:
+            candidate = registry._build_generation(previous=forced, reuse=False)
+        finally:
+            index_registry._SPECS[a] = spec
+        assert candidate.indexes[a] is forced.indexes[a], f"{a} swapped without its pair"
+        assert candidate.indexes[b] is forced.indexes[b], f"{b} swapped without its pair"
+
+    print(f"✅ index registry reload, generation swap and pair fingerprints ok (generation {forced.number})")
+
+
+if __name__ == "__main__":
+    main()
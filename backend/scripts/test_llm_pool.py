@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services.llm import LLMError, LLMMessage, get_llm, llm_latency_stats, reset_llm
+
+# above LLM_CACHE_MAX_TEMPERATURE, so every call reaches the server
+UNCACHED = 0.9
+
+
+class _OllamaStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    client_ports: list[int] = []
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        _OllamaStub.client_ports.append(self.client_address[1])
+        if "fail" in body["prompt"]:
+            self._send(500, b"boom")
+        elif body.get("stream"):
+            lines = [{"response": "hel"}, {"response": "lo"}, {"response": "", "done": True}]
+            self._send(200, b"".join(json.dumps(x).encode("utf-8") + b"\n" for x in lines))
+        else:
+            self._send(200, json.dumps({"response": " hello "}).encode("utf-8"))
+
+    def _send(self, status: int, payload: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *_args) -> None:
+        pass
+
+
+def _count(key: str, field: str = "count") -> int:
+    return int(llm_latency_stats().get(key, {}).get(field, 0))
+
+
+def main() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update(
+        LLM_PROVIDER="ollama",
+        OLLAMA_BASE_URL=f"http://127.0.0.1:{server.server_address[1]}",
+        LLM_HTTP2="0",
+    )
+    reset_llm()
+    messages = [LLMMessage("user", "hi")]
+    try:
+        client = get_llm()
+        assert get_llm() is client, "get_llm should return the shared client"
+
+        # sync calls reuse one keep-alive connection from the pooled client
+        before = _count("ollama.chat")
+        _OllamaStub.client_ports.clear()
+        for _ in range(3):
+            assert client.chat(messages, temperature=UNCACHED) == "hello"
+        assert len(set(_OllamaStub.client_ports)) == 1, f"expected one connection, got {_OllamaStub.client_ports}"
+        assert _count("ollama.chat") == before + 3
+
+        # failures are counted in the histogram too
+        errors = _count("ollama.chat", "errors")
+        try:
+            client.chat([LLMMessage("user", "fail")], temperature=UNCACHED)
+        except LLMError:
+            pass
+        else:
+            raise AssertionError("a 500 from the provider should raise LLMError")
+        assert _count("ollama.chat", "errors") == errors + 1
+
+        async def run_async() -> None:
+            _OllamaStub.client_ports.clear()
+            for _ in range(3):
+                assert await client.achat(messages, temperature=UNCACHED) == "hello"
+            deltas = [d async for d in client.astream(messages, temperature=UNCACHED)]
+            assert "".join(deltas) == "hello", f"unexpected stream {deltas}"
+            assert len(set(_OllamaStub.client_ports)) == 1, f"expected one connection, got {_OllamaStub.client_ports}"
+            await client.aclose()
+
+        before = _count("ollama.achat"), _count("ollama.astream.first_token")
+        asyncio.run(run_async())
+        assert (_count("ollama.achat"), _count("ollama.astream.first_token")) == (before[0] + 3, before[1] + 1)
+        buckets = llm_latency_stats()["ollama.achat"]["buckets"]
+        assert sum(buckets.values()) == _count("ollama.achat"), "every call lands in one bucket"
+
+        # replacing the client closes both of its pools
+        fresh = get_llm(force_reload=True)
+        assert fresh is not client and not fresh._http.is_closed
+        replacement = get_llm(force_reload=True)
+        assert replacement is not fresh and fresh._http.is_closed and fresh._ahttp.is_closed
+    finally:
+        reset_llm()
+        server.shutdown()
+
+    print("✅ pooled LLM clients reuse connections and record latency")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from app.services.bm25 import (
+    BM25Index,
+    PageFeatures,
+    bm25_search_filtered,
+    looks_like_toc,
+    page_features,
+    page_snippet,
+    parse_section_intent,
+    section_content_bonus,
+    tokenize,
+    toc_entry_count,
+)
+from app.services.rerank import toc_penalty, toc_penalty_for_count
+
+TOC = "\n".join(
+    ["SECTION 701 – GENERAL ITEMS .......... 339"]
+    + [f"701.{i:02d} {name} .......... {339 + i}" for i, name in enumerate(["Description", "Materials", "Equipment"] * 6, 1)]
+)
+PROSE = "The Contractor shall furnish all labor, materials and equipment for the work described herein. " * 5
+
+PAGES = [
+    TOC,
+    f"SECTION 701 – GENERAL ITEMS\n701.02 DESCRIPTION\nThis Section shall consist of asphalt work.\n{PROSE}",
+    f"701.02 DESCRIPTION\n{PROSE}\nSee also 701.02 Description .......... 12",
+    f"section 701\n701.02 description\nthe contractor shall apply asphalt.\n{PROSE.lower()}",
+    # ids that only look like 701 / 701.02
+    "1701.02 DESCRIPTION\nSECTION 7010 asphalt\n701.021 curing",
+    # two ids in a row: only the second is followed by DESCRIPTION
+    "701.02 701.03 DESCRIPTION asphalt curing",
+    # TOC lines in the snippet, prose after it
+    f"{TOC[:300]}\n{PROSE}",
+    f"SECTION 105 – CONTROL OF WORK\n105.03 DESCRIPTION\n{PROSE}",
+    "",
+    "   \n  ",
+]
+QUERIES = [
+    "701.02",
+    "Section 701",
+    "701",
+    "701.02 description asphalt",
+    "SECTION 105.03 scope",
+    "999.99",
+    "curing time for asphalt",
+    "contractor shall furnish",
+    "",
+]
+
+
+def _old_final_score(query: str, text: str, raw: float) -> float:
+    # bm25_search_filtered's per-page score before the features were precomputed
+    if raw <= 0:
+        return 0.0
+    sec3, secdot = parse_section_intent(query)
+    toc_n = toc_entry_count(text)
+    penalty = 1.0 / (1.0 + (3.0 if sec3 or secdot else 0.5) * toc_n)
+    return raw * penalty * section_content_bonus(query, text)
+
+
+def _check_columns(features: PageFeatures) -> None:
+    assert features.toc_entries.tolist() == [toc_entry_count(t) for t in PAGES]
+    assert features.looks_like_toc.tolist() == [looks_like_toc(t) for t in PAGES]
+    assert features.looks_like_toc[0] and features.toc_entries[0] > 6, "the TOC page should look like one"
+
+    # artifacts without stored features get the same columns on load
+    legacy = PageFeatures.from_meta([{"text": t} for t in PAGES])
+    assert legacy.toc_entries.tolist() == features.toc_entries.tolist()
+    assert legacy.snippet_toc_entries.tolist() == features.snippet_toc_entries.tolist()
+
+    # hybrid_search: penalty and TOC post-filter from the snippet count instead of the snippet text
+    for strong in (False, True):
+        for i, text in enumerate(PAGES):
+            snippet = page_snippet(text)
+            got = toc_penalty_for_count(int(features.snippet_toc_entries[i]), strong=strong)
+            assert got == toc_penalty(snippet, strong=strong), f"page {i}: snippet penalty differs"
+            assert (features.snippet_toc_entries[i] >= 6) == (toc_entry_count(snippet) >= 6)
+
+
+def _check_scores(features: PageFeatures) -> None:
+    for q in QUERIES:
+        sec3, secdot = parse_section_intent(q)
+        got = features.toc_penalty(bool(sec3 or secdot)) * features.section_bonus(sec3, secdot)
+        want = np.array([_old_final_score(q, text, 1.0) for text in PAGES])
+        assert np.allclose(got, want, rtol=1e-12, atol=0), f"{q!r}: {got.tolist()} != {want.tolist()}"
+
+
+def _check_ranking(tmp: Path) -> None:
+    meta = [
+        dict(
+            document_id=1,
+            filename="StandSpec2019.pdf",
+            display_name="Standard Specifications",
+            doc_type="standspec",
+            mp_id=None,
+            page_number=i + 1,
+            text=text,
+            **page_features(text),
+        )
+        for i, text in enumerate(PAGES)
+    ]
+    okapi = BM25Okapi([tokenize(t) for t in PAGES])
+    path = tmp / "bm25.pkl"
+    BM25Index(okapi, meta).save(path)
+
+    for q in QUERIES:
+        raw = okapi.get_scores(tokenize(q))
+        old = {i: _old_final_score(q, PAGES[i], float(raw[i])) for i in range(len(PAGES)) if raw[i] > 0}
+        want = sorted(old, key=old.__getitem__, reverse=True) or list(range(len(PAGES)))
+        hits = bm25_search_filtered(q, k=len(PAGES), index_path=path)
+        assert [h.page_number - 1 for h in hits] == want, f"{q!r}: ranking differs"
+        assert np.allclose([h.score for h in hits], [old.get(i, 0.0) for i in want], rtol=1e-12, atol=0)
+
+
+def main() -> None:
+    features = PageFeatures([page_features(t) for t in PAGES])
+    _check_columns(features)
+    _check_scores(features)
+    with tempfile.TemporaryDirectory() as tmp:
+        _check_ranking(Path(tmp))
+    print(f"✅ precomputed page features match the per-page TOC/section scorers ({len(PAGES)} pages, {len(QUERIES)} queries)")
+
+
+if __name__ == "__main__":
+    main()
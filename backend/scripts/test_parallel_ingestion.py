@@ -0,0 +1,64 @@
+import tempfile
+from pathlib import Path
+
+import fitz
+
+from app.core.config import settings
+from app.services.db import get_conn
+from app.services.ingestion import ingest_all_pdfs
+from scripts import run_migrations
+
+# page counts of the generated PDFs; the large one is split into several page ranges
+PDF_PAGES = {"MP1-25.pdf": 3, "StandSpec2019.pdf": 23, "scheduling_manual.pdf": 1}
+PAGES_PER_TASK = 5
+
+
+def _write_pdfs(pdf_dir: Path) -> None:
+    pdf_dir.mkdir()
+    for name, n in PDF_PAGES.items():
+        doc = fitz.open()
+        for i in range(n):
+            doc.new_page().insert_text((72, 72), f"{name} page {i + 1}\n701.0{i % 10} Section text {i}")
+        doc.save(pdf_dir / name)
+        doc.close()
+
+
+def _ingest(db_path: Path, pdf_dir: Path, workers: int):
+    settings.DB_PATH = db_path
+    run_migrations.main()
+    result = ingest_all_pdfs(pdf_dir, workers=workers)
+    with get_conn(readonly=True) as conn:
+        docs = [tuple(r) for r in conn.execute("SELECT id, filename, doc_type, page_count FROM documents ORDER BY id")]
+        pages = [
+            tuple(r)
+            for r in conn.execute("SELECT document_id, page_number, text FROM pages ORDER BY document_id, page_number")
+        ]
+    return result, docs, pages
+
+
+def main() -> None:
+    original = settings.DB_PATH, settings.INGEST_PAGES_PER_TASK
+    settings.INGEST_PAGES_PER_TASK = PAGES_PER_TASK
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_dir = Path(tmp) / "pdfs"
+            _write_pdfs(pdf_dir)
+
+            seq, seq_docs, seq_pages = _ingest(Path(tmp) / "sequential.sqlite3", pdf_dir, workers=1)
+            par, par_docs, par_pages = _ingest(Path(tmp) / "parallel.sqlite3", pdf_dir, workers=3)
+
+            assert seq.ingested == par.ingested == len(PDF_PAGES), f"{seq.ingested} / {par.ingested} ingested"
+            assert par_docs == seq_docs, f"document rows differ: {par_docs} != {seq_docs}"
+            assert par_pages == seq_pages, "page rows differ between sequential and parallel extraction"
+            assert [t.filename for t in par.timings] == sorted(PDF_PAGES), "timings should follow file order"
+            assert [t.pages for t in par.timings] == [t.pages for t in seq.timings]
+            big = next(t for t in par.timings if t.filename == "StandSpec2019.pdf")
+            assert big.pages == PDF_PAGES["StandSpec2019.pdf"], f"split document lost pages: {big.pages}"
+    finally:
+        settings.DB_PATH, settings.INGEST_PAGES_PER_TASK = original
+
+    print(f"✅ parallel ingestion matches sequential ({sum(PDF_PAGES.values())} pages, {PAGES_PER_TASK} per task)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+from app.services.bm25_chunks import tokenize
+from app.services.query_analysis import (
+    analyze_query,
+    asks_for_section_or_page,
+    extract_exact_section_id,
+    extract_lookup_prefix,
+    extract_section_dot,
+    extract_section_prefix,
+    extract_table_token,
+    is_bare_section_id_query,
+    is_equation_query,
+    is_table_query,
+    looks_like_table_query,
+    plan_query,
+)
+from app.services.rerank import is_section_intent
+
+QUERIES = [
+    "701.02",
+    " 701.02.01 ",
+    "701.02 materials for asphalt",
+    "What does Section 701 say about curing?",
+    "§105 scope",
+    "701",
+    "Table 701.03.15-1",
+    "Show table 901.03-1 coarse aggregate",
+    "what are the values in the gradation chart",
+    "how to compute the pay adjustment",
+    "which page covers the progress schedule",
+    "payment within 10 days of receipt",
+    "",
+]
+
+
+def _check_fields() -> None:
+    # the shared analysis matches the standalone parsers it replaced
+    for q in QUERIES:
+        a = analyze_query(q)
+        expected = dict(
+            text=q,
+            chunk_tokens=tokenize(q),
+            section_intent=is_section_intent(q),
+            section_dot=extract_section_dot(q),
+            section_prefix=extract_section_prefix(q),
+            exact_section_id=extract_exact_section_id(q),
+            lookup_prefix=extract_lookup_prefix(q),
+            bare_section_id=is_bare_section_id_query(q),
+            asks_for_location=asks_for_section_or_page(q),
+            equation_intent=is_equation_query(q),
+            table_query=is_table_query(q),
+            table_wording=looks_like_table_query(q),
+            table_token=extract_table_token(q),
+        )
+        for name, want in expected.items():
+            assert getattr(a, name) == want, f"{q!r}: {name}={getattr(a, name)!r}, expected {want!r}"
+
+    a = analyze_query("Show table 901.03-1 coarse aggregate")
+    assert a.table_ref == "901.03-1" and not a.explicit_table_token
+    assert analyze_query("Table 701.03.15-1").explicit_table_token
+    assert any(p.search("payment within 10 days") for p in analyze_query("within 10 days").focus)
+
+
+def _check_plans() -> None:
+    def plan(q: str, mode: str = "answer") -> dict:
+        return vars(plan_query(analyze_query(q), mode))
+
+    bare = plan("701.02")
+    assert bare["exact_section"] and not bare["dense"], f"bare section id: {bare}"
+    assert plan("701.02 materials for asphalt")["dense"]
+
+    prefix = plan("What does Section 701 say about curing?")
+    assert prefix["prefix_sections"] and not prefix["exact_section"] and prefix["dense"], f"prefix: {prefix}"
+    assert plan("701")["prefix_sections"]
+    assert not plan("701.02.01")["prefix_sections"], "an exact section id takes precedence over its prefix"
+
+    assert plan("Table 701.03.15-1")["table_prelookup"]
+    assert not plan("Table 701.03.15-1", "sources_only")["table_prelookup"]
+    assert not plan("Show table 901.03-1 coarse aggregate")["table_prelookup"], "short table refs are searched"
+
+    assert plan("how to compute the pay adjustment")["equation_pools"]
+    plain = plan("which page covers the progress schedule")
+    assert plain == dict(
+        table_prelookup=False, exact_section=False, prefix_sections=False, dense=True, equation_pools=False
+    ), f"plain question: {plain}"
+
+
+def _check_lazy_vector() -> None:
+    from app.services import embeddings
+
+    calls: list[list[str]] = []
+    original = embeddings.embed_texts
+
+    def embed_texts(texts: list[str]):
+        calls.append(list(texts))
+        return original(texts)
+
+    embeddings.embed_texts = embed_texts
+    try:
+        a = analyze_query("curing time for concrete")
+        assert calls == [], "analyze_query must not embed"
+        vec = a.query_vector
+        assert a.query_vector is vec and calls == [["curing time for concrete"]], f"expected one embed, got {calls}"
+        assert vec.shape[0] == 1
+    finally:
+        embeddings.embed_texts = original
+
+
+def main() -> None:
+    _check_fields()
+    _check_plans()
+    _check_lazy_vector()
+    print(f"✅ query analysis fields and retrieval plans ok ({len(QUERIES)} queries)")
+
+
+if __name__ == "__main__":
+    main()
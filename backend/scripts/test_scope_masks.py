@@ -0,0 +1,39 @@
+import numpy as np
+
+from app.services.index_registry import get_registry
+
+SCOPES = [("all", None), ("standspec", None), ("scheduling", None), ("mp", None), ("mp_only", ["mp1-25", "MP3-25"])]
+
+
+def _allowed(record: dict, scope: str, mp_ids: list[str] | None) -> bool:
+    # the per-record filter the masks replaced
+    doc_type = (record["doc_type"] or "").lower()
+    if scope in ("standspec", "scheduling", "mp"):
+        return doc_type == scope
+    if scope == "mp_only":
+        return doc_type == "mp" and (record["mp_id"] or "").upper() in {m.upper() for m in mp_ids or []}
+    return True
+
+
+def main() -> None:
+    index = get_registry().get("bm25_chunks")
+    records = [index.store.record(i) for i in range(len(index.store))]
+
+    for scope, mp_ids in SCOPES:
+        mask = index.columns.scope_mask(scope, mp_ids)
+        expected = np.array([_allowed(r, scope, mp_ids) for r in records])
+        if mask is None:
+            assert expected.all(), f"{scope}: no mask but some rows are filtered"
+        else:
+            assert np.array_equal(mask, expected), f"{scope}: mask differs from the record filter"
+            assert index.columns.scope_mask(scope, mp_ids) is mask, f"{scope}: mask was not cached"
+
+        eq = index.columns.filter_mask(scope, mp_ids, min_equation_score=0.45)
+        want_eq = expected & np.array([r["equation_score"] >= 0.45 for r in records])
+        assert np.array_equal(eq, want_eq), f"{scope}: equation filter differs"
+
+    print(f"✅ scope masks match the per-record filters on {len(records)} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from app.core.config import settings
+from app.services import ask
+from app.services.chunk_ingestion import rebuild_chunks
+from app.services.db import get_conn
+from app.services.index_registry import get_registry
+from scripts import run_migrations
+
+UPGRADE_MIGRATIONS = ("009_add_chunk_builds.sql", "010_add_sections.sql", "011_add_table_tokens.sql")
+
+
+def _copy_db(dest: Path) -> None:
+    src = sqlite3.connect(settings.DB_PATH)
+    dst = sqlite3.connect(dest)
+    src.backup(dst)
+    src.close()
+    dst.close()
+
+
+def _keys(hits) -> list[tuple]:
+    # chunk ids change when chunks are rebuilt; compare what the chunks are
+    return [(h.document_id, h.section_id, h.page_start, h.text) for h in hits]
+
+
+def _lookups(section_ids: list[str], tokens: list[str]) -> dict[str, list[tuple]]:
+    f = dict(scope="all", mp_ids=None, limit=50)
+    out: dict[str, list[tuple]] = {}
+    for sid in section_ids:
+        out[f"exact {sid}"] = _keys(ask._db_fetch_exact_section(sid, **f))
+        out[f"children {sid}"] = _keys(ask._db_fetch_exact_or_children(sid, **f))
+    for sid in section_ids:
+        if "." not in sid:
+            out[f"prefix {sid}"] = _keys(ask._db_fetch_prefix_sections(sid, **f))
+    for token in tokens:
+        out[f"table {token}"] = _keys(ask._db_fetch_table_token_hits(token, **f))
+    return out
+
+
+def _map_used(section_id: str) -> bool:
+    return ask._section_map_hits(section_id, children=True, scope="all", mp_ids=None, limit=5) is not None
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        # work on a copy: the upgrade and rebuild below rewrite chunks
+        db_path = Path(tmp) / "nj.sqlite3"
+        _copy_db(db_path)
+        settings.DB_PATH = db_path
+
+        with get_conn(readonly=True) as conn:
+            orphans = conn.execute(
+                """
+                SELECT COUNT(1) FROM sections s
+                WHERE s.parent_section_id IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM sections p WHERE p.document_id = s.document_id AND p.section_id = s.parent_section_id
+                )
+                """
+            ).fetchone()[0]
+            section_ids = [
+                r[0]
+                for depth in (0, 1)
+                for r in conn.execute(
+                    "SELECT DISTINCT section_id FROM sections WHERE depth = ? ORDER BY section_id LIMIT 3", (depth,)
+                )
+            ]
+            tokens = [r[0] for r in conn.execute("SELECT DISTINCT token FROM table_tokens ORDER BY token LIMIT 3")]
+            n_docs = conn.execute("SELECT COUNT(1) FROM chunk_builds").fetchone()[0]
+        assert orphans == 0, f"{orphans} sections point at a missing parent row"
+        assert section_ids and tokens, "expected a built sections/table_tokens table (run build_chunks)"
+
+        get_registry().reload(force=True)
+        assert _map_used(section_ids[0]), "expected the section map path on a built database"
+        baseline = _lookups(section_ids, tokens)
+        empty = [k for k, v in baseline.items() if not v and not k.startswith("exact")]
+        assert not empty, f"expected hits for {empty}"
+
+        # A database chunked before migrations 009-011: the new tables exist but are empty.
+        with get_conn() as conn:
+            for table in ("chunk_builds", "sections", "table_tokens"):
+                conn.execute(f"DROP TABLE {table}")
+            conn.executemany("DELETE FROM migrations WHERE filename = ?", [(f,) for f in UPGRADE_MIGRATIONS])
+        run_migrations.main()
+        get_registry().reload(force=True)
+        assert not _map_used(section_ids[0]), "expected the SQL fallback before build_chunks"
+        upgraded = _lookups(section_ids, tokens)
+        for key, want in baseline.items():
+            assert upgraded[key] == want, f"{key} changed after upgrading: {len(upgraded[key])} != {len(want)} hits"
+
+        # The first incremental build after the upgrade re-chunks everything.
+        out = rebuild_chunks(incremental=True)
+        assert out["rebuilt_documents"] == n_docs, f"expected {n_docs} documents re-chunked, got {out['rebuilt_documents']}"
+        get_registry().reload()
+        assert _map_used(section_ids[0]), "expected the section map path after build_chunks"
+        rebuilt = _lookups(section_ids, tokens)
+        for key, want in baseline.items():
+            assert rebuilt[key] == want, f"{key} changed after build_chunks: {len(rebuilt[key])} != {len(want)} hits"
+
+    print(f"✅ section/table lookups unchanged across upgrade and rebuild ({len(baseline)} lookups)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from app.services import ask
+from app.services.chunk_ingestion import table_tokens_in
+from app.services.db import get_conn
+
+SCOPES = [("all", None), ("standspec", None), ("mp", None), ("mp_only", ["MP1-25"])]
+LIMIT = 1000
+
+
+def main() -> None:
+    with get_conn(readonly=True) as conn:
+        tokens = [r[0] for r in conn.execute("SELECT DISTINCT token FROM table_tokens ORDER BY token LIMIT 50")]
+        plan = " ".join(
+            r["detail"]
+            for r in conn.execute("EXPLAIN QUERY PLAN SELECT chunk_id FROM table_tokens WHERE token = ?", ("x",))
+        )
+    assert tokens, "expected a built table_tokens table (run build_chunks)"
+    assert "USING" in plan and "INDEX" in plan, f"token lookups should seek an index: {plan}"
+
+    checked = 0
+    for token in tokens:
+        for scope, mp_ids in SCOPES:
+            indexed = [h.chunk_id for h in ask._db_fetch_table_token_hits(token, scope=scope, mp_ids=mp_ids, limit=LIMIT)]
+            with get_conn(readonly=True) as conn:
+                rows = ask._db_scan_table_token_rows(conn, token, scope=scope, mp_ids=mp_ids, limit=LIMIT)
+            scanned = [int(r["chunk_id"]) for r in rows]
+            assert all(token in table_tokens_in(r["text"], r["heading"], r["table_label"]) for r in rows), (
+                f"{token} ({scope}): the scan returned rows of a longer token"
+            )
+            assert indexed == scanned, f"{token} ({scope}): indexed {indexed[:5]}... != scanned {scanned[:5]}..."
+            checked += 1
+
+    # a query token with an en dash and mixed case finds the same rows
+    token = tokens[0]
+    variant = token.replace("-", "–").upper()
+    same = ask._db_fetch_table_token_hits(variant, scope="all", mp_ids=None, limit=LIMIT)
+    assert [h.chunk_id for h in same] == [
+        h.chunk_id for h in ask._db_fetch_table_token_hits(token, scope="all", mp_ids=None, limit=LIMIT)
+    ], f"{variant!r} should normalize to {token!r}"
+
+    print(f"✅ table token lookups match the LIKE scan ({len(tokens)} tokens, {checked} lookups)")
+
+
+if __name__ == "__main__":
+    main()
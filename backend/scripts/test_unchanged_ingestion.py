@@ -0,0 +1,114 @@
+import os
+import tempfile
+from pathlib import Path
+
+import fitz
+
+from app.core.config import settings
+from app.services import ingestion
+from app.services.db import get_conn
+from app.services.ingestion import ingest_all_pdfs
+from scripts import run_migrations
+
+
+def _write_pdf(path: Path, text: str) -> None:
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    doc.save(path)
+    doc.close()
+
+
+class _Calls:
+    """
+    Counts hashing and text extraction per file name.
+    """
+
+    def __init__(self) -> None:
+        self.hashed: list[str] = []
+        self.extracted: list[str] = []
+        self._hash = ingestion.sha256_file
+        self._extract = ingestion.extract_pages_text
+
+    def __enter__(self) -> "_Calls":
+        def sha256_file(path: Path) -> str:
+            self.hashed.append(path.name)
+            return self._hash(path)
+
+        def extract_pages_text(path: Path, *args) -> list[str]:
+            self.extracted.append(path.name)
+            return self._extract(path, *args)
+
+        ingestion.sha256_file = sha256_file
+        ingestion.extract_pages_text = extract_pages_text
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        ingestion.sha256_file = self._hash
+        ingestion.extract_pages_text = self._extract
+
+
+def _stat_row(name: str) -> tuple:
+    with get_conn(readonly=True) as conn:
+        r = conn.execute("SELECT file_mtime_ns, file_size FROM documents WHERE filename = ?", (name,)).fetchone()
+    return tuple(r)
+
+
+def main() -> None:
+    original = settings.DB_PATH
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            settings.DB_PATH = Path(tmp) / "nj.sqlite3"
+            run_migrations.main()
+            pdf_dir = Path(tmp) / "pdfs"
+            pdf_dir.mkdir()
+            names = ["MP1-25.pdf", "MP2-25.pdf", "StandSpec2019.pdf"]
+            for name in names:
+                _write_pdf(pdf_dir / name, f"{name} 701.02 text")
+
+            with _Calls() as calls:
+                first = ingest_all_pdfs(pdf_dir)
+            assert first.ingested == 3 and sorted(calls.extracted) == names
+
+            # untouched files: no hashing, no extraction
+            with _Calls() as calls:
+                second = ingest_all_pdfs(pdf_dir)
+            assert second.skipped_unchanged == 3 and second.ingested == 0
+            assert calls.hashed == [] and calls.extracted == [], f"hashed {calls.hashed}, extracted {calls.extracted}"
+            assert all(not t.ingested and t.pages == 1 for t in second.timings)
+
+            # touched but identical: hashed once, not extracted, new stat recorded
+            touched = pdf_dir / "MP2-25.pdf"
+            st = touched.stat()
+            os.utime(touched, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            with _Calls() as calls:
+                third = ingest_all_pdfs(pdf_dir)
+            assert third.skipped_unchanged == 3 and calls.hashed == ["MP2-25.pdf"] and calls.extracted == []
+            assert _stat_row("MP2-25.pdf") == (touched.stat().st_mtime_ns, touched.stat().st_size)
+            with _Calls() as calls:
+                ingest_all_pdfs(pdf_dir)
+            assert calls.hashed == [], "the recorded stat should skip hashing on the next run"
+
+            # changed contents: re-extracted and rewritten
+            _write_pdf(pdf_dir / "MP1-25.pdf", "MP1-25 revised 701.03 text")
+            with _Calls() as calls:
+                fourth = ingest_all_pdfs(pdf_dir)
+            assert fourth.ingested == 1 and calls.extracted == ["MP1-25.pdf"]
+            with get_conn(readonly=True) as conn:
+                text = conn.execute(
+                    "SELECT p.text FROM pages p JOIN documents d ON d.id = p.document_id WHERE d.filename = ?",
+                    ("MP1-25.pdf",),
+                ).fetchone()[0]
+            assert "revised" in text, f"stale page text: {text!r}"
+
+            # single-file path
+            with _Calls() as calls:
+                did_ingest, _doc_id, written = ingestion.upsert_document_and_pages(pdf_dir / "StandSpec2019.pdf")
+            assert not did_ingest and written == 0 and calls.hashed == [] and calls.extracted == []
+    finally:
+        settings.DB_PATH = original
+
+    print("✅ unchanged PDFs skip hashing and extraction; touched and changed files are handled")
+
+
+if __name__ == "__main__":
+    main()